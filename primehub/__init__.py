@@ -3,13 +3,15 @@ import importlib
 import json
 import os
 import sys
-from typing import Union, Callable, Any, Optional
+from typing import Union, Callable, Any, BinaryIO, Iterable, Optional, List, Tuple
 
 from primehub.utils import group_required, create_logger, PrimeHubException
 from primehub.utils.core import CommandContainer
 from primehub.utils.decorators import cmd  # noqa: F401
 from primehub.utils.display import Display, HumanFriendlyDisplay, Displayable
-from primehub.utils.http_client import Client
+from primehub.utils.cache import ResponseCache
+from primehub.utils.http_client import Client, HttpTransport, GraphQLBatch
+from primehub.utils.retry import CircuitBreaker, RetryPolicy
 
 logger = create_logger('primehub-config')
 
@@ -46,6 +48,17 @@ class PrimeHubConfig(object):
     * set property for api_token, endpoint and group
 
     PrimeHubConfig evaluates a property in the above order and the last updates take effect
+
+    The HTTP connection pool could be tuned by the constructor arguments:
+    * pool_connections: the number of hosts to keep connection pools for
+    * pool_maxsize: the maximum number of keep-alive connections for each host
+
+    The resilience of GraphQL requests could be tuned by the constructor arguments:
+    * timeout: the default timeout in seconds
+    * timeouts: the per-operation timeouts by root field, e.g., {'files': 60}
+    * retry_policy: a RetryPolicy for transient failures
+    * circuit_breaker_threshold: fail fast after the number of consecutive failures, 0 to disable
+    * circuit_breaker_reset: the seconds before trying again after the circuit opened
     """
 
     def __init__(self, **kwargs):
@@ -59,6 +72,17 @@ class PrimeHubConfig(object):
         self.config_from_user_input = {}
         self.group_info = {}
 
+        # HTTP connection pool
+        self.pool_connections = kwargs.get('pool_connections', 10)
+        self.pool_maxsize = kwargs.get('pool_maxsize', 10)
+
+        # GraphQL request resilience
+        self.timeout = kwargs.get('timeout', 10)
+        self.timeouts = kwargs.get('timeouts', {})
+        self.retry_policy = kwargs.get('retry_policy', RetryPolicy())
+        self.circuit_breaker_threshold = kwargs.get('circuit_breaker_threshold', 5)
+        self.circuit_breaker_reset = kwargs.get('circuit_breaker_reset', 30)
+
         self.load_config()
         self.load_config_from_env()
         self.set_properties(**kwargs)
@@ -189,15 +213,27 @@ class Helpful(metaclass=abc.ABCMeta):
 
 
 class PrimeHub(object):
+    """
+    PrimeHub is the entry point of the SDK.
+
+    It owns a pooled HTTP transport shared by all command modules, release it by `close()`
+    or use the PrimeHub as a context manager:
+
+    with PrimeHub(PrimeHubConfig()) as ph:
+        ph.jobs.list()
+    """
 
     def __init__(self, config: PrimeHubConfig):
         self.primehub_config = config
+        self._transport: Optional[HttpTransport] = None
+        self.response_cache: Optional[ResponseCache] = None
         self.json_output = True
         self.usage_role = 'user'
         self.commands: CommandContainer = CommandContainer()
         self.admin_commands: CommandContainer = CommandContainer()
         self._stderr = sys.stderr
         self._stdout = sys.stdout
+        self._stdin = sys.stdin
 
         # register commands
         self.register_command('config', 'Config')
@@ -243,17 +279,109 @@ class PrimeHub(object):
         except BaseException:
             pass
 
+    @property
+    def transport(self) -> HttpTransport:
+        if self._transport is None:
+            self._transport = self._create_transport()
+        return self._transport
+
+    def _create_transport(self, pool_maxsize: Optional[int] = None) -> HttpTransport:
+        cfg = self.primehub_config
+        return HttpTransport(pool_connections=cfg.pool_connections, pool_maxsize=pool_maxsize or cfg.pool_maxsize,
+                             circuit_breaker=CircuitBreaker(cfg.circuit_breaker_threshold, cfg.circuit_breaker_reset))
+
+    def close(self):
+        """
+        Close the pooled connections, the next request will open a new pool
+        """
+        if self._transport is not None:
+            self._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def enable_response_cache(self, ttls: Optional[dict] = None, default_ttl: float = 0, stale_ttl: float = 0,
+                              max_entries: int = 256, cache_dir: Optional[str] = None) -> ResponseCache:
+        """
+        Cache the results of read-only queries, the `me` query is cached for 5 minutes by default
+
+        :type ttls: dict
+        :param ttls: The TTL in seconds by root field, e.g., {'me': 300, 'phJob': 5}
+
+        :type default_ttl: float
+        :param default_ttl: The TTL for the root fields not in ttls, 0 means no caching
+
+        :type stale_ttl: float
+        :param stale_ttl: Serve an expired result within the seconds while refreshing it in the background
+
+        :type max_entries: int
+        :param max_entries: The size of the in-memory LRU
+
+        :type cache_dir: str
+        :param cache_dir: The directory of the on-disk cache shared by processes, no disk cache when it is None
+
+        :rtype ResponseCache
+        :return The cache, `stats` gives the hit and miss counters
+        """
+        self.response_cache = ResponseCache(ttls=ttls, default_ttl=default_ttl, stale_ttl=stale_ttl,
+                                            max_entries=max_entries, cache_dir=cache_dir)
+        return self.response_cache
+
+    def disable_response_cache(self):
+        self.response_cache = None
+
+    def _client(self) -> Client:
+        return Client(self.primehub_config, self.transport, self.response_cache)
+
     def request(self, variables: dict, query: str, error_handler: Optional[Callable] = None):
-        return Client(self.primehub_config).request(variables, query, error_handler)
+        return self._client().request(variables, query, error_handler)
+
+    def batch(self, max_size: int = 50) -> GraphQLBatch:
+        """
+        Collect GraphQL operations and send them in batched requests when leaving the `with` block
+
+        with primehub.batch() as batch:
+            results = [batch.request(variables, query) for variables in many_variables]
+        [x.result() for x in results]
+
+        Only the operations requested by `batch.request` are batched. The module methods, e.g., jobs.get,
+        use their results right away, so they are sent immediately even inside the `with` block.
+        """
+        return GraphQLBatch(self._client, max_size)
+
+    def batch_request(self, operations: List[Tuple], max_size: int = 50) -> list:
+        """
+        Send (variables, query) or (variables, query, error_handler) operations in batched requests
+
+        :return the results in the same order of the operations, it raises the first error if any operation failed
+        """
+        with self.batch(max_size) as batch:
+            pending = [batch.request(*x) for x in operations]
+        return [x.result() for x in pending]
 
     def request_logs(self, endpint: str, follow: bool, tail: int):
-        return Client(self.primehub_config).request_logs(endpint, follow, tail)
+        return self._client().request_logs(endpint, follow, tail)
+
+    def request_file(self, endpint: str, dest: str, **kwargs):
+        return self._client().request_file(endpint, dest, **kwargs)
+
+    def request_range(self, endpoint: str, start: int, end: int) -> bytes:
+        return self._client().request_range(endpoint, start, end)
 
-    def request_file(self, endpint: str, dest: str):
-        return Client(self.primehub_config).request_file(endpint, dest)
+    def request_range_into(self, endpoint: str, start: int, buffer) -> int:
+        return self._client().request_range_into(endpoint, start, buffer)
+
+    def stream_file(self, endpoint: str, out: BinaryIO) -> int:
+        return self._client().stream_file(endpoint, out)
+
+    def upload_stream(self, endpoint: str, chunks: Iterable[bytes]):
+        return self._client().upload_stream(endpoint, chunks)
 
     def upload_file(self, endpoint: str, src: str):
-        return Client(self.primehub_config).upload_file(endpoint, src)
+        return self._client().upload_file(endpoint, src)
 
     def _find_command_class(self, command_class, module_name):
         # create command instance
@@ -293,6 +421,8 @@ class PrimeHub(object):
     def admin(self):
         admin_primehub = PrimeHub(self.primehub_config)
         admin_primehub.commands = self.admin_commands
+        admin_primehub._transport = self.transport
+        admin_primehub.response_cache = self.response_cache
         return admin_primehub
 
     def __getattr__(self, item):
@@ -316,6 +446,14 @@ class PrimeHub(object):
     def stdout(self, out):
         self._stdout = out
 
+    @property
+    def stdin(self):
+        return self._stdin
+
+    @stdin.setter
+    def stdin(self, stream):
+        self._stdin = stream
+
     def get_all_commands(self):
         return sorted(self.commands.keys())
 
@@ -1,9 +1,10 @@
 import json
 import re
-from typing import Iterator, Union, Any
+from typing import Iterator, Union, Any, List
 
 from primehub import Helpful, Module, cmd, primehub_load_config
 from primehub.utils import PrimeHubException
+from primehub.utils.graphql import AliasedQuery, raise_for_partial_errors
 from primehub.utils.optionals import file_flag, toggle_flag
 from primehub.utils.validator import validate_groups, validate_group_exists
 
@@ -13,6 +14,27 @@ USERNAME_FORMAT_ERROR = r'''[username] Only lower case alphanumeric characters,
 USERNAME_FORMAT_ERROR += r'''and underscores ("_") are allowed, and must start with a letter or numeric.'''
 
 
+_fragment_user_info = """
+fragment UserInfo on User {
+  id
+  username
+  email
+  firstName
+  lastName
+  enabled
+  isAdmin
+  volumeCapacity
+  groups {
+    id
+    name
+    displayName
+    quotaCpu
+    quotaGpu
+  }
+}
+"""
+
+
 def invalid_config(message: str):
     example = """
     {"username":"user1","groups":{"connect":[{"id":"fc620866-91e6-4a7e-a576-7cdfbb5e2ea7"}]}}
@@ -329,26 +351,12 @@ class AdminUsers(Helpful, Module):
         query = """
         query User($where: UserWhereUniqueInput!) {
           user(where: $where) {
-            id
-            username
-            email
-            firstName
-            lastName
-            enabled
-            isAdmin
-            volumeCapacity
-            groups {
-              id
-              name
-              displayName
-              quotaCpu
-              quotaGpu
-            }
+            ...UserInfo
           }
         }
         """
 
-        results = self.request({'where': {'id': id}}, query)
+        results = self.request({'where': {'id': id}}, query + _fragment_user_info)
         if 'data' not in results:
             return results
         user = results['data']['user']
@@ -360,6 +368,34 @@ class AdminUsers(Helpful, Module):
         user['groups'] = [x for x in groups if x['name'] != 'everyone']
         return user
 
+    def get_many(self, ids: List[str], batch_size: int = 50) -> dict:
+        """
+        Get many users by id, a request fetches up to batch_size users
+
+        :type ids: list
+        :param ids: the ids of users
+
+        :type batch_size: int
+        :param batch_size: the maximum number of users in a request
+
+        :rtype dict
+        :return the users by id, it raises PartialResultException(users, {id: [messages]}) when some users failed
+        """
+        query = AliasedQuery('query', 'user', 'where', 'UserWhereUniqueInput!', '{ ...UserInfo }', prefix='u',
+                             fragments=_fragment_user_info)
+        users, errors = query.execute(self.request, list(ids), [{'id': x} for x in ids], batch_size)
+
+        for user_id, user in list(users.items()):
+            if not user:
+                users.pop(user_id)
+                errors[user_id] = [{'message': f'Cannot find the user [{user_id}]'}]
+                continue
+            # hide the everyone group
+            user['groups'] = [x for x in user['groups'] if x['name'] != 'everyone']
+
+        raise_for_partial_errors(users, errors)
+        return users
+
     @cmd(name='delete', description='Delete an user by id', return_required=True)
     def delete(self, id: str) -> dict:
         """
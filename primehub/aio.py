@@ -0,0 +1,140 @@
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from types import GeneratorType
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Union
+
+from primehub import PrimeHub, PrimeHubConfig
+from primehub.utils import create_logger
+
+logger = create_logger('aio')
+
+
+class AsyncPrimeHub(object):
+    """
+    AsyncPrimeHub exposes the command modules of PrimeHub as awaitable methods.
+
+    The SDK calls run on a bounded worker pool which shares the pooled transport of the wrapped PrimeHub,
+    so the event loop is never blocked and at most `max_concurrency` requests are in flight.
+    A PrimeHub given by the caller should have a pool_maxsize of at least `max_concurrency`:
+
+    async with AsyncPrimeHub(PrimeHubConfig(), max_concurrency=32) as ph:
+        jobs = await asyncio.gather(*[ph.jobs.get(x) for x in job_ids])
+        async for job in ph.jobs.list():
+            print(job['id'])
+
+    Methods returning a generator (e.g., the paginated `list` calls) become async generators.
+    """
+
+    def __init__(self, config: Optional[PrimeHubConfig] = None, max_concurrency: int = 16,
+                 primehub: Optional[PrimeHub] = None):
+        # a PrimeHub given by the caller is left open by close()
+        self._owns_primehub = primehub is None
+        if primehub is None:
+            primehub = PrimeHub(config if config is not None else PrimeHubConfig())
+        self.primehub = primehub
+        self.max_concurrency = max_concurrency
+
+        # keep a connection for each worker, otherwise the pool discards the extra connections
+        cfg = self.primehub.primehub_config
+        if cfg.pool_maxsize < max_concurrency:
+            if self._owns_primehub:
+                self.primehub._transport = self.primehub._create_transport(pool_maxsize=max_concurrency)
+            else:
+                # the transport of the caller's PrimeHub is left as it is
+                logger.warning(f'[Warning] pool_maxsize {cfg.pool_maxsize} is less than max_concurrency '
+                               f'{max_concurrency}, the extra connections are not kept alive')
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='primehub-async')
+
+    def register_command(self, module_name: str, command_class: Union[str, Callable], command_name=None):
+        self.primehub.register_command(module_name, command_class, command_name)
+
+    def register_admin_command(self, module_name: str, command_class: Union[str, Callable], command_name=None):
+        self.primehub.register_admin_command(module_name, command_class, command_name)
+
+    @property
+    def admin(self) -> 'AsyncPrimeHub':
+        admin = AsyncPrimeHub.__new__(AsyncPrimeHub)
+        admin.primehub = self.primehub.admin
+        admin.max_concurrency = self.max_concurrency
+        admin._owns_primehub = False
+        admin._executor = self._executor
+        return admin
+
+    def get_all_commands(self):
+        return self.primehub.get_all_commands()
+
+    async def request(self, variables: dict, query: str, error_handler: Optional[Callable] = None):
+        return await self.run(self.primehub.request, variables, query, error_handler)
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking SDK call in the worker pool
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def iterate(self, generator: Iterator) -> AsyncIterator:
+        """
+        Consume a blocking generator in the worker pool, one item per step
+        """
+        loop = asyncio.get_running_loop()
+        end_of_iteration = object()
+        try:
+            while True:
+                item = await loop.run_in_executor(self._executor, next, generator, end_of_iteration)
+                if item is end_of_iteration:
+                    return
+                yield item
+        finally:
+            if isinstance(generator, GeneratorType):
+                generator.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._owns_primehub:
+            self.primehub.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getattr__(self, item):
+        if item in self.primehub.commands:
+            return AsyncModule(self, self.primehub.commands[item])
+        raise AttributeError("Cannot find a command [{}]".format(item))
+
+
+class AsyncModule(object):
+    """
+    AsyncModule wraps a command module, a method becomes a coroutine function
+    and a generator function becomes an async generator function.
+    """
+
+    def __init__(self, async_primehub: AsyncPrimeHub, module: Any):
+        self._async_primehub = async_primehub
+        self._module = module
+
+    def __getattr__(self, item):
+        attr = getattr(self._module, item)
+        if not callable(attr):
+            return attr
+
+        if inspect.isgeneratorfunction(inspect.unwrap(attr)):
+            def async_generator(*args, **kwargs):
+                return self._async_primehub.iterate(attr(*args, **kwargs))
+
+            return async_generator
+
+        async def coroutine(*args, **kwargs):
+            result = await self._async_primehub.run(attr, *args, **kwargs)
+            if isinstance(result, GeneratorType):
+                return self._async_primehub.iterate(result)
+            return result
+
+        return coroutine
+
+    def __repr__(self):
+        return f'<AsyncModule {self._module!r}>'
@@ -1,10 +1,11 @@
 import json
-from typing import Iterator, Any
+from typing import Iterator, Any, List
 
 from primehub import Helpful, cmd, Module, primehub_load_config
 from primehub.utils import resource_not_found, PrimeHubException
 from primehub.utils.core import auto_gen_id
 from primehub.utils.display import display_tree_like_format
+from primehub.utils.graphql import AliasedQuery, raise_for_partial_errors
 from primehub.utils.optionals import toggle_flag, file_flag
 from primehub.utils.validator import ValidationSpec
 
@@ -76,6 +77,7 @@ _query_ph_applications = query = """
             }
           }
         """
+_fragment_ph_application_info = _query_ph_applications[_query_ph_applications.index('fragment PhApplicationInfo'):]
 scope_list = ['public', 'primehub', 'group']
 
 
@@ -293,6 +295,37 @@ class Apps(Helpful, Module):
         edges = results['data']['phApplicationsConnection']['edges']
         return edges[0]['node']
 
+    def get_many(self, ids: List[str], batch_size: int = 50) -> dict:
+        """
+        Get many PrimeHub applications, a request fetches up to batch_size applications
+
+        :type ids: list
+        :param ids: The application ids
+
+        :type batch_size: int
+        :param batch_size: The maximum number of applications in a request
+
+        :rtype: dict
+        :returns: PrimeHub applications by id,
+                  it raises PartialResultException(apps, {id: [messages]}) when some applications failed
+        """
+
+        query = AliasedQuery('query', 'phApplicationsConnection', 'where', 'PhApplicationWhereInput',
+                             '{ edges { node { ...PhApplicationInfo } } }', prefix='a',
+                             fragments=_fragment_ph_application_info, extra_arguments='first: 1')
+        arguments = [{'groupName_in': [self.group_name], 'id': x} for x in ids]
+        connections, errors = query.execute(self.request, list(ids), arguments, batch_size)
+
+        apps = dict()
+        for app_id, connection in connections.items():
+            if connection and connection['edges']:
+                apps[app_id] = connection['edges'][0]['node']
+            else:
+                errors[app_id] = [{'message': f'Cannot find the application [{app_id}]'}]
+
+        raise_for_partial_errors(apps, errors)
+        return apps
+
     @cmd(name='stop', description='Stop the PrimeHub Application', return_required=True)
     def stop(self, id) -> dict:
         """
@@ -19,6 +19,13 @@ def attach_dev_lab(p):
         p.register_command('extras.e2e', 'E2EForBasicFunction', 'e2e')
 
 
+def attach_response_cache(p):
+    import os
+    cache_dir = os.environ.get('PRIMEHUB_SDK_CACHE_DIR')
+    if cache_dir:
+        p.enable_response_cache(cache_dir=cache_dir, stale_ttl=float(os.environ.get('PRIMEHUB_SDK_CACHE_STALE_TTL', 0)))
+
+
 def create_sdk():
     cfg = ph.PrimeHubConfig()
     sdk = ph.PrimeHub(cfg)
@@ -27,6 +34,7 @@ def create_sdk():
     sdk.register_command('info', 'CliInformation')
 
     attach_dev_lab(sdk)
+    attach_response_cache(sdk)
     return sdk
 
 
@@ -1,16 +1,32 @@
+import io
 import json
 import os.path
-from typing import Iterator, Optional
+import shutil
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from primehub import Helpful, cmd, Module, primehub_load_config
-from primehub.files import _normalize_user_input_path
+from primehub import Helpful, cmd, Module, PrimeHub, primehub_load_config
+from primehub.files import _normalize_user_input_path, _raise_for_failures
 from primehub.utils import PrimeHubException, SharedFileException, DatasetsException
-from primehub.utils.optionals import file_flag, toggle_flag
+from primehub.utils.dataset_cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE, DatasetCache, link_or_copy, version_key
+from primehub.utils.globs import GlobMatcher
+from primehub.utils.optionals import file_flag, size_flag, toggle_flag
+from primehub.utils.prefetch import DEFAULT_PREFETCH, prefetched, shard, shuffled
+from primehub.utils.remote_file import DEFAULT_READAHEAD, open_reader
+from primehub.utils.shards import ShardReader
+from primehub.utils.snapshot import ADDED, MODIFIED, REMOVED, SNAPSHOT_SUFFIX, diff_entries, read_snapshot, \
+    write_snapshot
+from primehub.utils.sync import FileMeta, local_files, parse_last_modified
+from primehub.utils.transfer import TransferManager, TransferTask
 from primehub.utils.validator import ValidationSpec
 
 DATASETS_ROOT = '/datasets'
 METADATA_NAME = '.dataset'
 
+# the datasets known to exist are cached for the session to skip the existence checks,
+# create, update and delete keep the cache coherent
+DATASET_CACHE_TTL = 60
+
 
 def invalid_config(message: str):
     example = """
@@ -46,6 +62,11 @@ def is_dataset_root(dataset_id: str, path: str) -> bool:
 
 class Datasets(Helpful, Module):
 
+    def __init__(self, primehub: PrimeHub, **kwargs):
+        super(Datasets, self).__init__(primehub, **kwargs)
+        # (group name, dataset id) => the expiry time
+        self._dataset_cache: Dict[Tuple[str, str], float] = dict()
+
     @cmd(name='create', description='Create a datasets', optionals=[('file', file_flag)])
     def _create(self, **kwargs) -> dict:
         """
@@ -91,7 +112,7 @@ class Datasets(Helpful, Module):
         validate_creation(config)
         results = self.request({'payload': config}, query)
         if 'data' in results:
-            return results['data']['createDatasetV2']
+            return self._cache_dataset(results['data']['createDatasetV2'])
         return results
 
     @cmd(name='update', description='Update a dataset', optionals=[('file', file_flag)])
@@ -148,7 +169,7 @@ class Datasets(Helpful, Module):
         variables = {'payload': config, 'where': {'id': dataset_id, 'groupName': self.group_name}}
         results = self.request(variables, query)
         if 'data' in results:
-            return results['data']['updateDatasetV2']
+            return self._cache_dataset(results['data']['updateDatasetV2'])
         return results
 
     @cmd(name='list', description='List datasets', return_required=True, optionals=[('page', int)])
@@ -232,7 +253,10 @@ class Datasets(Helpful, Module):
         """
         variables = {'where': {'id': dataset_id, 'groupName': self.group_name}}
         result = self.request(variables, query)
-        return result['data']['datasetV2']
+        dataset = result['data']['datasetV2']
+        if dataset is None:
+            self._dataset_cache.pop((self.group_name, dataset_id), None)
+        return self._cache_dataset(dataset)
 
     @cmd(name='delete', description='Delete the dataset', return_required=True)
     def delete(self, dataset_id) -> dict:
@@ -254,7 +278,10 @@ class Datasets(Helpful, Module):
         }
         """
         variables = {'where': {'id': dataset_id, 'groupName': self.group_name}}
-        result = self.request(variables, query)
+        try:
+            result = self.request(variables, query)
+        finally:
+            self._dataset_cache.pop((self.group_name, dataset_id), None)
         if 'data' in result and 'deleteDatasetV2' in result['data']:
             return result['data']['deleteDatasetV2']
         return result
@@ -291,7 +318,10 @@ class Datasets(Helpful, Module):
             message = message.replace(phfs_path, path)
             raise SharedFileException(message)
 
-    @cmd(name='files-upload', description='upload files to the dataset', optionals=[('recursive', toggle_flag)])
+    @cmd(name='files-upload', description='upload files to the dataset',
+         optionals=[('recursive', toggle_flag), ('parallel', int), ('skip_unchanged', toggle_flag),
+                    ('resume', toggle_flag), ('include', str), ('exclude', str), ('symlinks', str),
+                    ('shard_size', size_flag)])
     def files_upload(self, dataset_id: str, src: str, path: str, **kwargs):
         """
         Upload files to the dataset by path
@@ -307,6 +337,27 @@ class Datasets(Helpful, Module):
 
         :type recursive: bool
         :param recursive: copy recursively, set it when the source is a directory
+
+        :type parallel: int
+        :param parallel: the number of files to upload concurrently
+
+        :type skip_unchanged: bool
+        :param skip_unchanged: skip the files unchanged since their last uploads
+
+        :type resume: bool
+        :param resume: resume an interrupted upload
+
+        :type include: str
+        :param include: upload only the files matching the comma-separated glob patterns
+
+        :type exclude: str
+        :param exclude: skip the files and directories matching the comma-separated glob patterns
+
+        :type symlinks: str
+        :param symlinks: the policy of symbolic links, 'files' (default), 'follow' or 'skip'
+
+        :type shard_size: str
+        :param shard_size: pack the files into tar shards of the size, e.g., '256MB', read them with open_shards
         """
 
         self._check_dataset_existed(dataset_id)
@@ -324,7 +375,8 @@ class Datasets(Helpful, Module):
             message = message.replace(phfs_path, path)
             raise SharedFileException(message)
 
-    @cmd(name='files-download', description='download files from the dataset', optionals=[('recursive', toggle_flag)])
+    @cmd(name='files-download', description='download files from the dataset',
+         optionals=[('recursive', toggle_flag), ('parallel', int), ('resume', toggle_flag)])
     def files_download(self, dataset_id: str, path: str, dest: str, **kwargs) -> dict:
         """
         Download files of the dataset by path
@@ -340,6 +392,12 @@ class Datasets(Helpful, Module):
 
         :type recursive: bool
         :param recursive: copy recursively, set it when the path is a directory
+
+        :type parallel: int
+        :param parallel: the number of files to download concurrently
+
+        :type resume: bool
+        :param resume: resume an interrupted download
         """
 
         self._check_dataset_existed(dataset_id)
@@ -382,19 +440,12 @@ class Datasets(Helpful, Module):
                 if not kwargs.get('recursive', False):
                     invalid(f'{path} is a directory, please delete it recursively')
 
+                # the entries are deleted in batched mutations, the directories recursively
                 files = self.files_list(dataset_id, path)
-                total_deleted_files = 0
-
-                for file in files:
-                    phfs_path = get_phfs_path(dataset_id, file['name'])
-                    if file['name'].endswith('/'):
-                        result = self.primehub.files.delete(phfs_path, recursive=True)
-                        total_deleted_files += result.get('deleteFiles', 0)
-                    else:
-                        result = self.primehub.files.delete(phfs_path)
-                        total_deleted_files += result.get('deleteFiles', 0)
-
-                return {'deleteFiles': total_deleted_files}
+                prefixes = [get_phfs_path(dataset_id, f['name'])[1:] for f in files]
+                if not prefixes:
+                    return {'deleteFiles': 0}
+                return self.primehub.files._execute_delete_many([(x, x.endswith('/')) for x in prefixes])
             else:
                 result = self.primehub.files.delete(phfs_path, **kwargs)
                 return result
@@ -403,9 +454,241 @@ class Datasets(Helpful, Module):
             message = message.replace(phfs_path, path)
             raise SharedFileException(message)
 
+    @cmd(name='materialize', description='materialize the dataset into the local cache',
+         optionals=[('cache_dir', str), ('cache_size', int), ('parallel', int)])
+    def materialize(self, dataset_id: str, **kwargs) -> str:
+        """
+        Materialize the dataset into a local cache shared by the processes on the node
+
+        The cached copy is keyed on the updatedAt, the size and the file listing of the dataset,
+        it is reused until the dataset is changed. The unchanged files of a previous copy are reused
+        and the others are downloaded. The least recently used copies are evicted to keep the cache in the budget,
+        the copy returned to a process is not evicted until the process uses another copy of the dataset or exits.
+
+        :type dataset_id: str
+        :param dataset_id: the name of the dataset
+
+        :type cache_dir: str
+        :param cache_dir: the cache directory, default is ~/.primehub/datasets
+
+        :type cache_size: int
+        :param cache_size: the budget of the cache in bytes, default is 100 GiB
+
+        :type parallel: int
+        :param parallel: the number of files to download concurrently
+
+        :rtype str
+        :return the local path of the dataset
+        """
+
+        dataset = self.get(dataset_id)
+        if not dataset:
+            invalid(f'No such dataset: {dataset_id}')
+
+        files = self.primehub.files
+        parallel = kwargs.get('parallel', None) or 1
+        phfs_root = get_phfs_path(dataset_id, '/')
+        listing = [x for x in files._walk(phfs_root, parallel) if x['name'] != METADATA_NAME]
+
+        cache = DatasetCache(kwargs.get('cache_dir', None) or DEFAULT_CACHE_DIR,
+                             kwargs.get('cache_size', None) or DEFAULT_CACHE_SIZE)
+        dataset_dir = cache.dataset_dir(files._upload_index_scope(), dataset_id)
+        version_dir = os.path.join(dataset_dir, version_key(dataset, listing))
+
+        with cache.lock(dataset_dir):
+            if cache.lookup(version_dir) is None:
+                temp_dir = cache.prepare(dataset_dir, os.path.basename(version_dir))
+                try:
+                    self._build_version(phfs_root, temp_dir, listing, cache.reusable(dataset_dir), parallel)
+                    cache.commit(temp_dir, version_dir, dataset_id, listing)
+                except BaseException:
+                    shutil.rmtree(temp_dir, ignore_errors=True)
+                    raise
+            cache.use(version_dir)
+
+        cache.evict(keep=version_dir)
+        return version_dir
+
+    def _build_version(self, phfs_root: str, temp_dir: str, listing: List[dict], reusable: dict, parallel: int):
+        endpoint = self.primehub.files._primehub_store_endpoint()
+
+        def tasks():
+            for item in listing:
+                dst = os.path.join(temp_dir, item['name'])
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                cached = reusable.get(item['name'])
+                if cached and cached[1:] == (item['size'], item['lastModified']) and os.path.exists(cached[0]):
+                    link_or_copy(cached[0], dst)
+                    continue
+                yield TransferTask(phfs_root + item['name'], dst, item['size'])
+
+        def download_file(task: TransferTask):
+            self.primehub.request_file(endpoint + task.src, task.dst, expected_size=task.size)
+
+        _raise_for_failures(TransferManager(parallel).run(tasks(), download_file))
+
+    def iter_files(self, dataset_id: str, pattern: Optional[str] = None, prefetch: int = DEFAULT_PREFETCH,
+                   rank: int = 0, world_size: int = 1, shuffle: int = 0, seed: Optional[int] = None,
+                   stream: bool = False) -> Iterator[Tuple[str, Any]]:
+        """
+        Iterate the files of the dataset while the next files are downloaded in the background
+
+        for name, content in primehub.datasets.iter_files('mnist', 'train/**/*.png', rank=rank, world_size=size):
+            train(decode(content))
+
+        :type dataset_id: str
+        :param dataset_id: the name of the dataset
+
+        :type pattern: str
+        :param pattern: iterate the files matching the glob pattern only, e.g., 'train/**/*.png'
+
+        :type prefetch: int
+        :param prefetch: the number of files to download ahead of the consumer
+
+        :type rank: int
+        :param rank: the rank of the worker, the i-th file goes to the worker of rank i % world_size
+
+        :type world_size: int
+        :param world_size: the number of workers sharing the dataset
+
+        :type shuffle: int
+        :param shuffle: shuffle the files of the worker with a buffer of the number of files
+
+        :type seed: int
+        :param seed: the seed of the shuffle
+
+        :type stream: bool
+        :param stream: yield seekable file objects reading with HTTP Range requests instead of the contents
+
+        :rtype Iterator[Tuple[str, Any]]
+        :return the names relative to the dataset and the contents in bytes or file objects
+        """
+
+        dataset = self.get(dataset_id)
+        if not dataset:
+            invalid(f'No such dataset: {dataset_id}')
+
+        files = self.primehub.files
+        endpoint = files._primehub_store_endpoint()
+        phfs_root = get_phfs_path(dataset_id, '/')
+        matcher = GlobMatcher(pattern) if pattern else None
+
+        # the single-threaded walk keeps the order stable for sharding
+        walked = (x for x in files._walk(phfs_root, matcher=matcher) if x['name'] != METADATA_NAME)
+        listing = shuffled(shard(walked, rank, world_size), shuffle, seed)
+
+        def fetch(item: dict) -> Any:
+            url = endpoint + phfs_root + item['name']
+            if stream:
+                def read_into(position: int, buffer: memoryview) -> int:
+                    return self.primehub.request_range_into(url, position, buffer)
+
+                return open_reader(item['name'], item['size'], read_into, DEFAULT_READAHEAD)
+
+            buffer = io.BytesIO()
+            self.primehub.stream_file(url, buffer)
+            return buffer.getvalue()
+
+        for item, content in prefetched(listing, fetch, prefetch):
+            yield item['name'], content
+
+    def open_shards(self, dataset_id: str, path: str = '/') -> ShardReader:
+        """
+        Open the tar shards uploaded to the dataset with the shard_size option
+
+        :type dataset_id: str
+        :param dataset_id: the name of the dataset
+
+        :type path: str
+        :param path: the directory of the shards in the dataset
+
+        :rtype ShardReader
+        :return the reader iterating the members shard by shard or reading a member by name
+        """
+
+        self._check_dataset_existed(dataset_id)
+        phfs_path = get_phfs_path(dataset_id, path)
+        protect_metadata(dataset_id, phfs_path)
+
+        try:
+            return self.primehub.files.open_shards(phfs_path)
+        except SharedFileException as e:
+            message = e.args[0]
+            message = message.replace(phfs_path, path)
+            raise SharedFileException(message)
+
+    @cmd(name='snapshot', description='save a snapshot of the dataset files',
+         optionals=[('output', str), ('parallel', int)])
+    def snapshot(self, dataset_id: str, **kwargs) -> dict:
+        """
+        Save the path, size and lastModified of the files in the dataset to a local snapshot file,
+        the snapshot is a gzip-compressed JSON Lines file sorted by path
+
+        :type dataset_id: str
+        :param dataset_id: the name of the dataset
+
+        :type output: str
+        :param output: the path of the snapshot file, default is <dataset_id>.snapshot.gz
+
+        :type parallel: int
+        :param parallel: the number of concurrent listing queries
+
+        :rtype dict
+        :return the dataset information, the snapshot path and the number of files
+        """
+
+        dataset = self.get(dataset_id)
+        if not dataset:
+            invalid(f'No such dataset: {dataset_id}')
+
+        output = kwargs.get('output', None) or f'{dataset_id}{SNAPSHOT_SUFFIX}'
+        phfs_root = get_phfs_path(dataset_id, '/')
+        listing = self.primehub.files._walk(phfs_root, kwargs.get('parallel', None) or 1)
+        entries = ((x['name'], FileMeta(x['size'], parse_last_modified(x.get('lastModified'))))
+                   for x in listing if x['name'] != METADATA_NAME)
+
+        header = dict(dataset=dataset_id, updatedAt=dataset.get('updatedAt'), size=dataset.get('size'))
+        files = write_snapshot(output, header, entries)
+        return dict(header, path=output, files=files)
+
+    @cmd(name='diff', description='compare two snapshots or a snapshot and a local directory')
+    def diff(self, base: str, target: str) -> dict:
+        """
+        Compare the files of two snapshots, or a snapshot and a local directory in one pass.
+        A file is modified when its size is changed or the target is newer.
+
+        :type base: str
+        :param base: the path of a snapshot file or a local directory
+
+        :type target: str
+        :param target: the path of a snapshot file or a local directory
+
+        :rtype dict
+        :return the added, removed and modified paths from the base to the target
+        """
+
+        def entries(path: str):
+            if os.path.isdir(path):
+                return iter(sorted(local_files(path), key=lambda x: x[0]))
+            if os.path.isfile(path):
+                return read_snapshot(path)
+            invalid(f'No such snapshot or directory: {path}')
+
+        result: Dict[str, List[str]] = {ADDED: [], REMOVED: [], MODIFIED: []}
+        for name, status in diff_entries(entries(base), entries(target)):
+            result[status].append(name)
+        return result
+
     def _check_dataset_existed(self, dataset_id: str):
+        if self._dataset_cache.get((self.group_name, dataset_id), 0) > time.time():
+            return
         self.get(dataset_id)
 
+    def _cache_dataset(self, dataset: Optional[dict]) -> Optional[dict]:
+        if dataset and dataset.get('id'):
+            self._dataset_cache[(self.group_name, dataset['id'])] = time.time() + DATASET_CACHE_TTL
+        return dataset
+
     def help_description(self):
         return "Manage datasets"
 
@@ -1,9 +1,10 @@
 import json
 import time
-from typing import Iterator
+from typing import Iterator, List
 
 from primehub import Helpful, cmd, Module, primehub_load_config
 from primehub.utils import resource_not_found, PrimeHubException
+from primehub.utils.graphql import AliasedQuery, raise_for_partial_errors
 from primehub.utils.optionals import toggle_flag, file_flag
 from primehub.utils.permission import ask_for_permission
 from primehub.utils.core import auto_gen_id
@@ -43,6 +44,44 @@ def invalid_config(message: str):
     raise PrimeHubException(explain)
 
 
+_fragment_ph_deployment_info = """
+fragment PhDeploymentInfo on PhDeployment {
+  id
+  status
+  message
+  name
+  description
+  updateMessage
+  metadata
+  stop
+  userName
+  groupName
+  endpoint
+  modelImage
+  modelURI
+  replicas
+  availableReplicas
+  imagePullSecret
+  instanceType {
+    name
+  }
+  creationTime
+  lastUpdatedTime
+  pods {
+    name
+  }
+  env {
+    name
+    value
+  }
+  endpointAccessType
+  endpointClients {
+    name
+  }
+}
+"""
+
+
 def auto_fill(config: dict):
     if 'id' not in config:
         config['id'] = auto_gen_id(config['name'])
@@ -131,44 +170,38 @@ class Deployments(Helpful, Module):
         query = """
         query ($where: PhDeploymentWhereUniqueInput!) {
           phDeployment(where: $where) {
-            id
-            status
-            message
-            name
-            description
-            updateMessage
-            metadata
-            stop
-            userName
-            groupName
-            endpoint
-            modelImage
-            modelURI
-            replicas
-            availableReplicas
-            imagePullSecret
-            instanceType {
-              name
-            }
-            creationTime
-            lastUpdatedTime
-            pods {
-              name
-            }
-            env {
-              name
-              value
-            }
-            endpointAccessType
-            endpointClients {
-              name
-            }
+            ...PhDeploymentInfo
           }
         }
         """
-        results = self.request({'where': {'id': id}}, query, _error_handler)
+        results = self.request({'where': {'id': id}}, query + _fragment_ph_deployment_info, _error_handler)
         return results['data']['phDeployment']
 
+    def get_many(self, ids: List[str], batch_size: int = 50) -> dict:
+        """
+        Get detail information of many deployments, a request fetches up to batch_size deployments
+
+        :type ids: list
+        :param ids: The deployment ids
+
+        :type batch_size: int
+        :param batch_size: The maximum number of deployments in a request
+
+        :rtype dict
+        :return The detail information of deployments by id,
+                it raises PartialResultException(deployments, {id: [messages]}) when some deployments failed
+        """
+        query = AliasedQuery('query', 'phDeployment', 'where', 'PhDeploymentWhereUniqueInput!',
+                             '{ ...PhDeploymentInfo }', prefix='d', fragments=_fragment_ph_deployment_info)
+        deployments, errors = query.execute(self.request, list(ids), [{'id': x} for x in ids], batch_size)
+        for deployment_id, deployment in list(deployments.items()):
+            if not deployment:
+                deployments.pop(deployment_id)
+                errors[deployment_id] = [{'message': f'Cannot find the deployment [{deployment_id}]'}]
+
+        raise_for_partial_errors(deployments, errors)
+        return deployments
+
     @cmd(name='get-history', description='Get history of a deployment by id')
     def get_history(self, id):
         """
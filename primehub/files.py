@@ -1,18 +1,60 @@
-from primehub import Helpful, cmd, Module
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from primehub import Helpful, cmd, Module, PrimeHub
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from urllib.parse import urlparse
+import io
+import json
 import os
 import sys
-
-from primehub.utils.optionals import toggle_flag
-from primehub.utils import create_logger, SharedFileException
+import tempfile
+import time
+
+from primehub.utils.optionals import size_flag, toggle_flag
+from primehub.utils import create_logger, SharedFileException, PartialResultException
+from primehub.utils.download import DEFAULT_CHUNK_SIZE, file_hasher
+from primehub.utils.globs import GlobMatcher
+from primehub.utils.graphql import AliasedQuery, raise_for_partial_errors
+from primehub.utils.remote_file import DEFAULT_READAHEAD, open_reader, open_writer
+from primehub.utils.shards import SHARD_MANIFEST_NAME, SHARD_NAME_FORMAT, SHARD_READAHEAD, ShardMember, ShardReader, \
+    parse_size, plan_shards, write_shard
+from primehub.utils.journal import DOWNLOAD_JOURNAL_NAME, TransferJournal, upload_journal_path
+from primehub.utils.sync import PHFS_SCHEME, FileMeta, is_phfs_uri, local_files, parse_last_modified, plan_sync
+from primehub.utils.transfer import TransferManager, TransferReport, TransferTask
+from primehub.utils.upload_index import UploadIndex
+from primehub.utils.walker import SYMLINK_POLICIES, SYMLINKS_FILES, walk_files
+from primehub.utils.watcher import DEFAULT_DEBOUNCE, DEFAULT_INTERVAL, UploadWatcher
 
 logger = create_logger('cmd-files')
 
+# the page size of a listing, a listing returns less items than the limit when it is not truncated
+LIST_PAGE_SIZE = 1000
+
+# a truncated listing is partitioned by the next character of the names, the printable ASCII characters
+# and the other characters found in the names are probed
+PARTITION_ALPHABET = ''.join([chr(x) for x in range(32, 127)])
+
+# the path classification is cached for a short time, uploads and deletes invalidate it
+METADATA_CACHE_TTL = 10
+METADATA_CACHE_SIZE = 1024
+
 
 def invalid(message):
     raise SharedFileException(message)
 
 
+def _raise_for_failures(report: TransferReport) -> dict:
+    """
+    Return the report when all transfers succeeded, otherwise raise the error of a sole failed transfer
+    or PartialResultException(report, {src: [message]})
+    """
+    if not report.failures:
+        return report.to_dict()
+    if len(report.failures) == 1 and report.files == 0:
+        raise report.failures[0][1]
+    raise PartialResultException(report.to_dict(), {t.src: [str(e)] for t, e in report.failures})
+
+
 def _normalize_dest_path(path):
     if path is None:
         raise ValueError('path is required')
@@ -76,6 +118,202 @@ class Files(Helpful, Module):
     The files module provides functions to manage Primehub Shared Files
     """
 
+    def __init__(self, primehub: PrimeHub, **kwargs):
+        super(Files, self).__init__(primehub, **kwargs)
+        self._metadata_cache: Dict[Tuple[str, str], Tuple[float, Tuple[bool, Optional[dict]]]] = dict()
+        self.upload_index = UploadIndex()
+
+    @cmd(name='stat', description='Get the type, size and last modified time of a path')
+    def stat(self, path):
+        """
+        Get the type, size and last modified time of a path
+
+        :type path: str
+        :param path: The path of file or folder
+
+        :rtype dict
+        :return The type (file or directory), size and lastModified of the path
+        """
+        path_norm = os.path.normpath(_normalize_user_input_path(path))
+        is_directory, file = self._probe(path_norm)
+        if is_directory:
+            return dict(path=path_norm, type='directory', phfsUri=f'phfs://{path_norm}')
+        if file is None:
+            invalid(f'No such file or directory: {path}')
+        return dict(path=path_norm, type='file', size=file.get('size'), lastModified=file.get('lastModified'),
+                    phfsUri=f'phfs://{path_norm}')
+
+    def open(self, path: str, mode: str = 'rb', readahead: int = DEFAULT_READAHEAD, encoding: Optional[str] = None):
+        """
+        Open a shared file as a file object
+
+        A reader is seekable, the reads are HTTP Range requests, so reading the header or footer of a large file
+        transfers only the needed bytes. A writer pipes the written bytes into the upload request without
+        a temporary file, the file is uploaded when the writer is closed.
+
+        with primehub.files.open('/data/large.parquet') as fh:
+            fh.seek(-8, os.SEEK_END)
+            footer = fh.read(8)
+
+        :type path: str
+        :param path: The path of the file
+
+        :type mode: str
+        :param mode: 'rb' or 'r' to read, 'wb' or 'w' to write
+
+        :type readahead: int
+        :param readahead: The bytes to read ahead of a read, a larger read goes into the caller's buffer directly
+
+        :type encoding: str
+        :param encoding: The encoding of the text modes
+
+        :rtype io.IOBase
+        :return The file object
+        """
+        if mode not in ('r', 'rb', 'w', 'wb'):
+            raise ValueError(f'Unsupported mode: {mode}')
+
+        path_norm = os.path.normpath(_normalize_user_input_path(path))
+        endpoint = self._primehub_store_endpoint() + path_norm
+        if mode.startswith('r'):
+            is_directory, file = self._probe(path_norm)
+            if file is None:
+                invalid(f'Is a directory: {path}' if is_directory else f'No such file: {path}')
+                return None
+
+            def read_into(position: int, buffer: memoryview) -> int:
+                return self.primehub.request_range_into(endpoint, position, buffer)
+
+            fh: Any = open_reader(path_norm, file['size'], read_into, readahead)
+        else:
+            if path.endswith('/'):
+                invalid(f'Is a directory: {path}')
+
+            def upload(chunks: Iterable[bytes]) -> dict:
+                try:
+                    return self.primehub.upload_stream(endpoint, chunks)
+                finally:
+                    self._invalidate_metadata()
+                    self.upload_index.forget(self._upload_index_scope(), path_norm)
+
+            fh = open_writer(path_norm, upload)
+
+        if 'b' not in mode:
+            fh = io.TextIOWrapper(fh, encoding=encoding)
+        return fh
+
+    @cmd(name='cat', description='Write the content of a shared file to stdout')
+    def cat(self, path, **kwargs):
+        """
+        Write the content of a shared file to stdout as it arrives, e.g., primehub files cat /logs/app.gz | zcat
+
+        :type path: str
+        :param path: The path of the file
+        """
+        path_norm = os.path.normpath(_normalize_user_input_path(path))
+        is_directory, file = self._probe(path_norm)
+        if file is None:
+            invalid(f'Is a directory: {path}' if is_directory else f'No such file: {path}')
+
+        stdout = self.primehub.stdout
+        stdout.flush()
+        out = getattr(stdout, 'buffer', stdout)
+        try:
+            self.primehub.stream_file(self._primehub_store_endpoint() + path_norm, out)
+            out.flush()
+        except BrokenPipeError:
+            # the reader has gone, e.g., head
+            pass
+
+    @cmd(name='put', description='Upload the content of stdin or a local file to a shared file')
+    def put(self, path, src, **kwargs):
+        """
+        Upload the content of stdin or a local file to a shared file in chunks without a temporary file,
+        e.g., tar cz ./logs | primehub files put /backups/logs.tgz -
+
+        :type path: str
+        :param path: The path of the shared file
+
+        :type src: str
+        :param src: '-' for stdin, or the path of a local file
+
+        :rtype dict
+        :return The path and the size of the uploaded file
+        """
+        if src == '-':
+            stdin = self.primehub.stdin
+            source = getattr(stdin, 'buffer', stdin)
+        elif os.path.isfile(src):
+            source = open(src, 'rb')
+        else:
+            invalid(f'{src} is not a file')
+            return None
+
+        size = 0
+        try:
+            with self.open(path, 'wb') as fh:
+                read = getattr(source, 'read1', source.read)
+                while True:
+                    chunk = read(DEFAULT_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    fh.write(chunk)
+                    size += len(chunk)
+        finally:
+            if src != '-':
+                source.close()
+        return dict(fh.raw.response or {}, phfs=os.path.normpath(_normalize_user_input_path(path)), size=size)
+
+    def _probe(self, path: str) -> Tuple[bool, Optional[dict]]:
+        """
+        Classify a normalized path with one aliased query, the result is cached for METADATA_CACHE_TTL seconds
+
+        :rtype tuple
+        :return (is_directory, the file item or None)
+        """
+        key = (self.group_name, path)
+        cached = self._metadata_cache.get(key)
+        if cached is not None and cached[0] > time.time():
+            return cached[1]
+
+        query = """
+        query stat($where: StoreFileWhereInput!, $directory: StoreFileListOptionInput,
+                   $file: StoreFileListOptionInput) {
+          directory: files(where: $where, options: $directory) {
+            items {
+              name
+            }
+          }
+          file: files(where: $where, options: $file) {
+            items {
+              name
+              size
+              lastModified
+            }
+          }
+        }
+        """
+        results = self.request(
+            {'where': {'phfsPrefix': path, 'groupName': self.group_name},
+             'directory': {'recursive': False, 'limit': 1},
+             'file': {'recursive': True, 'limit': 1}},
+            query)
+        data = results['data']
+        is_directory = len(data['directory']['items']) > 0
+        items = data['file']['items']
+        file = items[0] if items and not items[0]['name'] else None
+
+        if len(self._metadata_cache) >= METADATA_CACHE_SIZE:
+            self._metadata_cache.clear()
+        self._metadata_cache[key] = (time.time() + METADATA_CACHE_TTL, (is_directory, file))
+        return is_directory, file
+
+    def _invalidate_metadata(self):
+        self._metadata_cache.clear()
+
+    def _upload_index_scope(self) -> str:
+        return f'{self.endpoint}|{self.group_name}'
+
     @cmd(name='get-phfs-uri', description='Get PHFS URI')
     def get_phfs_uri(self, path):
         """
@@ -90,20 +328,26 @@ class Files(Helpful, Module):
         path_norm = _normalize_user_input_path(path)
         path_norm = os.path.normpath(path_norm)
 
-        items = self._execute_list(path_norm, limit=0)
-        if items:
+        is_directory, file = self._probe(path_norm)
+        if is_directory or file is not None:
             return f"phfs://{path_norm}"
         else:
             raise SharedFileException(f"PHFS path not found: {path}")
 
-    @cmd(name='list', description='List shared files')
-    def list(self, path):
+    @cmd(name='list', description='List shared files', optionals=[('glob', str), ('parallel', int)])
+    def list(self, path, **kwargs):
         """
         The cmd to list all files and folders in the path
 
         :type path: str
         :param path: The path to list
 
+        :type glob: str
+        :param glob: List the files under the path recursively which match the glob pattern, e.g., 'runs/**/*.json'
+
+        :type parallel: int
+        :param parallel: The number of concurrent listings to match the glob pattern.
+
         :rtype dict
         :return The detail information of files in the path
         """
@@ -111,12 +355,17 @@ class Files(Helpful, Module):
         path_norm = _normalize_user_input_path(path)
         path_norm = os.path.normpath(path_norm)
 
-        items = self._execute_list(path_norm, limit=1)
-        if items:  # directory
-            return self._execute_list(path_norm)
+        is_directory, file = self._probe(path_norm)
+        if kwargs.get('glob', None):
+            if not is_directory:
+                invalid(f'Not a directory: {path}')
+            return [x for x in self._walk(os.path.join(path_norm, ''), kwargs.get('parallel', None) or 1,
+                                          GlobMatcher(kwargs['glob']))]
+
+        if is_directory:
+            return self._list_directory(path_norm)
 
-        items = self._execute_list(path_norm, recursive=True, limit=1)
-        if not items or items[0]['name']:
+        if file is None:
             invalid(f'No such file or directory: {path}')
             return []
 
@@ -125,8 +374,7 @@ class Files(Helpful, Module):
             invalid(f'Not a directory: {path}')
             return []
 
-        items[0]['name'] = os.path.basename(path)
-        return items
+        return [dict(file, name=os.path.basename(path), phfsUri=f'phfs://{path_norm}')]
 
     def _execute_list(self, path, **kwargs):
         """
@@ -172,6 +420,164 @@ class Files(Helpful, Module):
                 x['phfsUri'] = f"phfs://{path}/{x['name']}"
         return items
 
+    def _list_directory(self, path: str) -> List[dict]:
+        """
+        List all files and folders in the directory with pages of LIST_PAGE_SIZE.
+
+        A truncated listing is partitioned by name prefixes, a partition is listed recursively
+        and the names under a sub-directory are folded into the sub-directory.
+
+        The files query has neither a continuation nor a count, so the partitions are verified by a listing
+        of one more child than found. A name with a character which was not probed fails the verification,
+        then its characters are probed as well.
+        """
+        items = self._execute_list(path, limit=LIST_PAGE_SIZE)
+        if len(items) < LIST_PAGE_SIZE:
+            return items
+
+        alphabet = set(PARTITION_ALPHABET)
+        while True:
+            children = self._list_partitions(os.path.join(path, ''), alphabet)
+            listed = self._execute_list(path, limit=len(children) + 1)
+            if len(listed) <= len(children):
+                return children
+            characters = set(''.join([x['name'] for x in listed])) - alphabet
+            if not characters:
+                # the directory is changed while listing
+                return children
+            alphabet.update(characters)
+
+    def _list_partitions(self, prefix: str, alphabet: Set[str]) -> List[dict]:
+        """
+        List the children of the directory prefix by the name partitions of the characters in the alphabet
+        """
+        children: List[dict] = []
+        directories = set()
+
+        def add(name: str, item: dict):
+            if '/' not in name:
+                children.append(dict(item, name=name, phfsUri=f'phfs://{prefix}{name}'))
+                return
+            name = name[:name.index('/') + 1]
+            if name not in directories:
+                directories.add(name)
+                children.append(dict(name=name, size=0, lastModified=None, phfsUri=f'phfs://{prefix}{name}'))
+
+        pending = ['']
+        while pending:
+            partition = pending.pop()
+            if partition.endswith('/'):
+                # the whole partition is a sub-directory
+                add(partition, {})
+                continue
+            page = self._execute_list(prefix + partition, recursive=True, limit=LIST_PAGE_SIZE)
+            partitions: List[str] = []
+            if len(page) >= LIST_PAGE_SIZE:
+                page, partitions = self._split_page(prefix + partition, page, alphabet)
+            for x in page:
+                add(partition + x['name'], x)
+            pending.extend(reversed([partition + x for x in partitions]))
+        return children
+
+    def _list_prefix(self, prefix: str, relative: str) -> Tuple[List[dict], List[Tuple[str, str]]]:
+        """
+        List a directory prefix recursively with one query, or list its children when the listing is truncated
+
+        :type prefix: str
+        :param prefix: The directory prefix with a trailing slash
+
+        :type relative: str
+        :param relative: The path of the prefix relative to the walked directory
+
+        :return (files, [(sub-directory prefix, relative path)]),
+                the names of files are relative to the walked directory
+        """
+        items = self._execute_list(prefix, recursive=True, limit=LIST_PAGE_SIZE)
+        if len(items) < LIST_PAGE_SIZE:
+            return [dict(x, name=relative + x['name']) for x in items], []
+
+        children = self._list_directory(prefix.rstrip('/') or '/')
+        files = [dict(x, name=relative + x['name']) for x in children if not x['name'].endswith('/')]
+        directories = [(prefix + x['name'], relative + x['name']) for x in children if x['name'].endswith('/')]
+        return files, directories
+
+    def _split_page(self, prefix: str, items: List[dict], alphabet: Set[str]) -> Tuple[List[dict], List[str]]:
+        """
+        Split a truncated recursive listing of a prefix by the first character of the names.
+
+        The listing is sorted by names, so the names before the first character of the last item are complete.
+        The rest is left to the partitions of the last character and the following characters
+        of the alphabet which are not empty.
+
+        :return (the complete items, [the partition characters])
+        """
+        first = items[-1]['name'][:1]
+        complete = [x for x in items if not first or x['name'][:1] < first]
+        candidates = sorted([x for x in alphabet if x > first])
+
+        query = AliasedQuery('query', 'files', 'where', 'StoreFileWhereInput!', '{ items { name } }', prefix='p',
+                             extra_arguments='options: {recursive: true, limit: 1}')
+        arguments = [{'phfsPrefix': prefix + x, 'groupName': self.group_name} for x in candidates]
+        values, errors = query.execute(self.request, candidates, arguments)
+        raise_for_partial_errors(values, errors)
+        found = [x for x in candidates if values[x] and values[x]['items']]
+        return complete, ([first] if first else []) + found
+
+    def _walk(self, path: str, parallel: int = 1, matcher: Optional[GlobMatcher] = None) -> Iterator[dict]:
+        """
+        List all files under the directory prefix recursively without the limit of a single query.
+
+        A directory is listed recursively with one query when it fits in a page,
+        otherwise its sub-directories are walked one by one, or breadth-first with at most `parallel` listings
+        in flight. The items are yielded lazily with names relative to the path.
+
+        :type path: str
+        :param path: The directory prefix with a trailing slash
+
+        :type matcher: GlobMatcher
+        :param matcher: Yield the files matching the glob only, the walk starts from the literal prefix of the glob
+                        and skips the sub-directories which could not contain a match
+        """
+
+        def patch(item: dict) -> dict:
+            item['phfsUri'] = f"phfs://{path}{item['name']}"
+            return item
+
+        def list_prefix(prefix: str, relative: str) -> Tuple[List[dict], List[Tuple[str, str]]]:
+            files, directories = self._list_prefix(prefix, relative)
+            if matcher is None:
+                return files, directories
+            return [x for x in files if matcher.match(x['name'])], \
+                   [x for x in directories if matcher.could_contain(x[1])]
+
+        root = (path + matcher.prefix, matcher.prefix) if matcher is not None else (path, '')
+        if parallel <= 1:
+            pending = [root]
+            while pending:
+                files, directories = list_prefix(*pending.pop())
+                for x in files:
+                    yield patch(x)
+                pending.extend(reversed(directories))
+            return
+
+        # the directories wait in a queue, a listing is submitted when another one is finished
+        directories_queue: Deque[Tuple[str, str]] = deque([root])
+        futures: Set[Future] = set()
+        with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix='primehub-list') as executor:
+            try:
+                while directories_queue or futures:
+                    while directories_queue and len(futures) < parallel:
+                        futures.add(executor.submit(list_prefix, *directories_queue.popleft()))
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        files, directories = f.result()
+                        directories_queue.extend(directories)
+                        for x in files:
+                            yield patch(x)
+            finally:
+                for f in futures:
+                    f.cancel()
+
     def _primehub_store_endpoint(self):
         def to_group_path(group_name: str):
             if not group_name:
@@ -183,7 +589,9 @@ class Files(Helpful, Module):
 
         return endpoint
 
-    @cmd(name='download', description='Download shared files', optionals=[('recursive', toggle_flag)])
+    @cmd(name='download', description='Download shared files',
+         optionals=[('recursive', toggle_flag), ('connections', int), ('parallel', int),
+                    ('resume', toggle_flag), ('glob', str)])
     def download(self, path, dest, **kwargs):
         """
         Download files
@@ -196,21 +604,88 @@ class Files(Helpful, Module):
 
         :type recusive: bool
         :param recusive: Copy recursively, it works when a path is a directory.
+
+        :type connections: int
+        :param connections: Download a large file in byte ranges over the number of connections concurrently.
+
+        :type parallel: int
+        :param parallel: The number of files to download concurrently.
+
+        :type resume: bool
+        :param resume: Resume an interrupted recursive download, the done files are skipped.
+
+        :type glob: str
+        :param glob: Download the files under the directory recursively which match the glob pattern,
+                     e.g., 'runs/**/metrics/*.json'
+
+        :rtype: dict
+        :return: The report of the transfers
         """
+        if kwargs.get('glob', None):
+            kwargs['recursive'] = True
 
         endpoint = self._primehub_store_endpoint()
         filter_func = kwargs.get('filter_func', None)
+        progress = kwargs.get('progress', None)
+        connections = kwargs.get('connections', None) or 1
+        src_dst_pairs = self._generate_download_list(path, dest, **kwargs)
+
+        journal = None
+        # a single file is downloaded without a journal, the journal directory would take the file's path
+        is_directory, _ = self._probe(os.path.normpath(_normalize_user_input_path(path)))
+        if kwargs.get('recursive', False) and is_directory:
+            journal_path = os.path.join(_normalize_dest_path(dest), DOWNLOAD_JOURNAL_NAME)
+            journal = TransferJournal(journal_path).open(kwargs.get('resume', False))
+
+        def tasks():
+            for src, dst in src_dst_pairs:
+                if filter_func and filter_func(src):
+                    self._warning_skip(src)
+                    continue
+                yield TransferTask(src, dst)
+
+        def download_file(task: TransferTask):
+            dir = os.path.dirname(task.dst)
+            if dir:
+                os.makedirs(dir, exist_ok=True)
+            self.request_file(endpoint + task.src, task.dst, progress=progress, connections=connections)
+            task.size = os.path.getsize(task.dst)
+            if journal is not None:
+                journal.finish(task.src, task.dst)
 
         # start download
-        src_dst_list = self._generate_download_list(path, dest, **kwargs)
-        for src, dst in src_dst_list:
-            if filter_func and filter_func(src):
-                self._warning_skip(src)
-                continue
-            dir = os.path.dirname(dst)
-            if dir and not os.path.isdir(dir):
-                os.makedirs(dir)
-            self.request_file(endpoint + src, dst)
+        report = self._run_journaled(journal, tasks, download_file, kwargs.get('parallel', None) or 1)
+        return _raise_for_failures(report)
+
+    def _run_journaled(self, journal: Optional[TransferJournal], tasks: Callable[[], Iterator[TransferTask]],
+                       func: Callable[[TransferTask], Any], parallel: int, keep_results: bool = False) \
+            -> TransferReport:
+        """
+        Run the transfers and record them in the journal, a resumed journal skips the done files
+        """
+        if journal is None:
+            return TransferManager(parallel).run(tasks(), func, keep_results)
+
+        def journaled_tasks():
+            if journal.planned:
+                for src, dst in journal.pending():
+                    yield TransferTask(src, dst)
+                return
+
+            for task in tasks():
+                if journal.is_done(task.src, task.dst):
+                    continue
+                journal.plan(task.src, task.dst)
+                yield task
+            journal.finish_plan()
+
+        completed = False
+        try:
+            report = TransferManager(parallel).run(journaled_tasks(), func, keep_results)
+            completed = not report.failures
+            return report
+        finally:
+            journal.close(completed)
 
     def _generate_download_list(self, path, dest, **kwargs):
         """
@@ -225,8 +700,11 @@ class Files(Helpful, Module):
         :type recusive: bool
         :param recusive: Copy recursively, it works when a path is a directory.
 
-        :type list
-        :return List of tuple of download source and destination
+        :type glob: str
+        :param glob: The glob pattern of the files to download, the path should be a directory
+
+        :type Iterator
+        :return Tuples of download source and destination, the paths are validated before iterating
         """
         path = _normalize_user_input_path(path)
         path_norm = os.path.normpath(path)
@@ -243,17 +721,20 @@ class Files(Helpful, Module):
             invalid(f'No such file or directory: {dest_dir}')
             return []
 
+        is_directory, file = self._probe(path_norm)
         if not path_isprefix and not recursive:
             # to download a file
-            items = self._execute_list(path_norm, recursive=True, limit=1)
-            if not items or items[0]['name']:
+            if file is None:
                 invalid(f'No such file: {path}')
 
             download_single_file = True
         else:
             # to download directory
-            items = self._execute_list(path_norm, limit=1)
-            if items:
+            if kwargs.get('glob', None) and not is_directory:
+                invalid(f'Not a directory: {path}')
+                return []
+
+            if is_directory:
                 if dest_isfile:
                     invalid(f'Not a directory: {dest}')
                     return []
@@ -263,8 +744,7 @@ class Files(Helpful, Module):
                     return []
 
             else:  # directory not exist
-                items = self._execute_list(path_norm, recursive=True, limit=1)
-                if not items or items[0]['name']:
+                if file is None:
                     invalid(f'No such file or directory: {path}')
                     return []
 
@@ -274,44 +754,49 @@ class Files(Helpful, Module):
 
                 download_single_file = True
 
-        src_dst_list = []
         prefix = os.path.dirname(path_norm)
         prefix_len = len(os.path.join(prefix, ''))
 
         if download_single_file:
-            files_phfs = [path_norm]
+            files_phfs: Iterable[str] = [path_norm]
             if not os.path.isdir(dest):
                 prefix_len = len(os.path.join(path_norm, ''))
         else:
             if not path_norm.endswith('/'):
                 path_norm += '/'
-            files_phfs = [path_norm + f['name'] for f in self._execute_list(path_norm, recursive=True)]
-
-        for src in files_phfs:
-            dst = os.path.normpath(os.path.join(dest_norm, src[prefix_len:]))
-            if os.path.isdir(dst):
-                logger.warning(f'cannot overwrite directory {dst} with non-directory {src}')
-                continue
+            matcher = GlobMatcher(kwargs['glob']) if kwargs.get('glob', None) else None
+            files_phfs = (path_norm + f['name']
+                          for f in self._walk(path_norm, kwargs.get('parallel', None) or 1, matcher))
+
+        def src_dst_pairs():
+            for src in files_phfs:
+                dst = os.path.normpath(os.path.join(dest_norm, src[prefix_len:]))
+                if os.path.isdir(dst):
+                    logger.warning(f'cannot overwrite directory {dst} with non-directory {src}')
+                    continue
 
-            is_file = False
-            sub_dst = dest_norm
-            dirs = src[prefix_len:].split('/')
-            for dir in dirs[:-1]:
-                sub_dst = os.path.join(sub_dst, dir)
-                if os.path.isfile(sub_dst):
-                    is_file = True
-                    break
-                if not os.path.exists(sub_dst):
-                    break
-            if is_file:
-                logger.warning(f'{dest} Not a directory')
-                continue
+                is_file = False
+                sub_dst = dest_norm
+                dirs = src[prefix_len:].split('/')
+                for dir in dirs[:-1]:
+                    sub_dst = os.path.join(sub_dst, dir)
+                    if os.path.isfile(sub_dst):
+                        is_file = True
+                        break
+                    if not os.path.exists(sub_dst):
+                        break
+                if is_file:
+                    logger.warning(f'{dest} Not a directory')
+                    continue
 
-            src_dst_list.append((src, dst))
+                yield src, dst
 
-        return src_dst_list
+        return src_dst_pairs()
 
-    @cmd(name='upload', description='Upload shared files', optionals=[('recursive', toggle_flag)])
+    @cmd(name='upload', description='Upload shared files',
+         optionals=[('recursive', toggle_flag), ('parallel', int), ('skip_unchanged', toggle_flag),
+                    ('resume', toggle_flag), ('include', str), ('exclude', str), ('symlinks', str),
+                    ('shard_size', size_flag)])
     def upload(self, src, path, **kwargs):
         """
         Upload files
@@ -324,38 +809,80 @@ class Files(Helpful, Module):
 
         :type recusive: bool
         :param recusive: Upload recursively, it works when a src is a directory.
+
+        :type parallel: int
+        :param parallel: The number of files to upload concurrently.
+
+        :type skip_unchanged: bool
+        :param skip_unchanged: Skip the files unchanged since their last uploads, it is tracked by a local index.
+
+        :type resume: bool
+        :param resume: Resume an interrupted recursive upload, the done files are skipped.
+
+        :type include: str
+        :param include: Upload only the files matching the comma-separated glob patterns, e.g., '*.csv,*.json'
+
+        :type exclude: str
+        :param exclude: Skip the files and directories matching the comma-separated glob patterns
+
+        :type symlinks: str
+        :param symlinks: The policy of symbolic links, 'files' follows links to files only (default),
+                         'follow' follows all links and 'skip' ignores them
+
+        :type shard_size: str
+        :param shard_size: Pack the files of a directory into tar shards of the size, e.g., '256MB',
+                           with a shards.jsonl index beside them. Read them with open_shards.
         """
         path = _normalize_user_input_path(path)
         recursive = kwargs.get('recursive', False)
         filter_func = kwargs.get('filter_func', None)
+        index = self.upload_index if kwargs.get('skip_unchanged', False) else None
+        scope = self._upload_index_scope()
 
         # check src
         if not os.path.exists(src):
             invalid(f'No such file or directory: {src}')
             return []
 
-        file_paths = []
-        if recursive is True:
-            if os.path.isfile(src):
-                file_paths.append(os.path.abspath(src))
-            else:
-                for (dirpath, dirnames, filenames) in os.walk(src):
-                    for filename in filenames:
-                        file_paths.append(os.path.join(dirpath, filename))
-            pass
-        else:
+        symlinks = kwargs.get('symlinks', None) or SYMLINKS_FILES
+        if symlinks not in SYMLINK_POLICIES:
+            invalid(f'symlinks should be one of {", ".join(SYMLINK_POLICIES)}, but it is {symlinks}')
+
+        def file_paths():
             if os.path.isfile(src):
-                filename = os.path.abspath(src)
-                file_paths.append(filename)
-            else:
-                invalid(f'{src} is not a file')
-                return []
-            pass
+                yield os.path.abspath(src)
+                return
+            # the files are uploaded while the walk continues
+            for filepath, relative, st in walk_files(src, kwargs.get('include', None), kwargs.get('exclude', None),
+                                                     symlinks):
+                yield filepath
+
+        if not recursive and not os.path.isfile(src):
+            invalid(f'{src} is not a file')
+            return []
+
+        if kwargs.get('shard_size', None):
+            if not os.path.isdir(src):
+                invalid(f'{src} is not a directory')
+            shard_path = os.path.join(path, os.path.basename(os.path.abspath(src)))
+            members = []
+            for filepath, relative, st in walk_files(src, kwargs.get('include', None), kwargs.get('exclude', None),
+                                                     symlinks):
+                if filter_func and filter_func(os.path.join(shard_path, relative)):
+                    self._warning_skip(os.path.join(shard_path, relative))
+                    continue
+                members.append((filepath, relative, st.st_size))
+            return self._upload_shards(members, shard_path, parse_size(kwargs['shard_size']),
+                                       kwargs.get('parallel', None) or 1)
 
         endpoint = self._primehub_store_endpoint()
-        result = []
-        for filepath in file_paths:
-            try:
+
+        journal = None
+        if recursive and os.path.isdir(src):
+            journal = TransferJournal(upload_journal_path(scope, src, path)).open(kwargs.get('resume', False))
+
+        def tasks():
+            for filepath in file_paths():
                 phfs_path = path
                 if os.path.isfile(src):
                     if not recursive and not path.endswith('/'):
@@ -369,24 +896,218 @@ class Files(Helpful, Module):
                 if filter_func and filter_func(phfs_path):
                     self._warning_skip(phfs_path)
                     continue
-                print(f'[Uploading] {filepath} -> phfs://{phfs_path}', file=self.primehub.stderr)
-                response = self._execute_upload(endpoint, filepath, phfs_path)
-                response['phfs'] = phfs_path
-                response['file'] = filepath
-                result.append(response)
-            except Exception as e:
-                print(e, file=sys.stderr)
-                result.append({
-                    'success': False,
-                    'message': e
-                })
+                yield TransferTask(filepath, phfs_path)
+
+        def upload_file(task: TransferTask):
+            digest = None
+            if index is not None:
+                unchanged, digest = index.is_unchanged(scope, task.dst, task.src)
+                if unchanged:
+                    print(f'[Skipped] {task.src} is unchanged', file=self.primehub.stderr)
+                    return {'success': True, 'skipped': True, 'phfs': task.dst, 'file': task.src}
+                st = os.stat(task.src)
+                digest = digest or index.hash(task.src)
+
+            print(f'[Uploading] {task.src} -> phfs://{task.dst}', file=self.primehub.stderr)
+            response = self._execute_upload(endpoint, task.src, task.dst)
+            response['phfs'] = task.dst
+            response['file'] = task.src
+            task.size = os.path.getsize(task.src)
+            if index is not None and digest and response.get('success', True) is not False:
+                index.record(scope, task.dst, digest, st.st_size, st.st_mtime)
+            if journal is not None and response.get('success', True) is not False:
+                journal.finish(task.src, task.dst)
+            return response
+
+        try:
+            report = self._run_journaled(journal, tasks, upload_file, kwargs.get('parallel', None) or 1,
+                                         keep_results=True)
+        finally:
+            if index is not None:
+                index.close()
+        result = []
+        for response in report.ordered_results():
+            if isinstance(response, BaseException):
+                print(response, file=sys.stderr)
+                response = {'success': False, 'message': response}
+            result.append(response)
         return result
 
+    def _upload_shards(self, members: List[ShardMember], path: str, shard_size: int, parallel: int) -> List[dict]:
+        """
+        Upload the members in tar shards under the path, the manifest is uploaded after all shards
+        """
+        shards = {SHARD_NAME_FORMAT.format(i): x for i, x in enumerate(plan_shards(members, shard_size))}
+        names = list(shards.keys())
+
+        def upload_shard(task: TransferTask):
+            shard = shards[task.src]
+            print(f'[Uploading] {len(shard)} files -> phfs://{task.dst}', file=self.primehub.stderr)
+            with self.open(task.dst, 'wb') as fh:
+                index = write_shard(fh, shard)
+            task.size = sum([x[2] for x in shard])
+            return dict(fh.raw.response or {}, phfs=task.dst, files=len(shard), size=task.size,
+                        members=index)
+
+        tasks = [TransferTask(name, os.path.join(path, name)) for name in names]
+        report = TransferManager(parallel).run(tasks, upload_shard, keep_results=True)
+        _raise_for_failures(report)
+
+        result = report.ordered_results()
+        manifest_path = os.path.join(path, SHARD_MANIFEST_NAME)
+        with self.open(manifest_path, 'wb') as fh:
+            for name, response in zip(names, result):
+                line = dict(name=name, size=response['size'], members=response.pop('members'))
+                fh.write(json.dumps(line).encode('utf-8') + b'\n')
+        result.append(dict(fh.raw.response or {}, phfs=manifest_path, shards=len(names)))
+        return result
+
+    def open_shards(self, path: str, readahead: int = SHARD_READAHEAD) -> ShardReader:
+        """
+        Open the tar shards uploaded with the shard_size option
+
+        reader = primehub.files.open_shards('/datasets/mnist/train')
+        for name, content in reader:
+            ...
+
+        :type path: str
+        :param path: The directory of the shards
+
+        :type readahead: int
+        :param readahead: The bytes of a request while reading a shard sequentially
+
+        :rtype ShardReader
+        :return The reader iterating the members shard by shard or reading a member by name
+        """
+        path_norm = os.path.normpath(_normalize_user_input_path(path))
+        manifest_path = os.path.join(path_norm, SHARD_MANIFEST_NAME)
+        _, file = self._probe(manifest_path)
+        if file is None:
+            invalid(f'No shards in {path}')
+        with self.open(manifest_path) as fh:
+            manifest = ShardReader.parse_manifest(fh.read())
+
+        endpoint = self._primehub_store_endpoint() + path_norm + '/'
+
+        def open_file(name: str):
+            return self.open(os.path.join(path_norm, name), readahead=readahead)
+
+        def read_range(name: str, start: int, end: int) -> bytes:
+            return self.primehub.request_range(endpoint + name, start, end - 1)
+
+        return ShardReader(manifest, open_file, read_range)
+
+    def watch(self, src: str, path: str, **kwargs) -> UploadWatcher:
+        """
+        Watch a local directory and upload the new or modified files in the background,
+        call `flush()` of the watcher to wait for the uploads of the changes up to now.
+
+        watcher = primehub.files.watch('./checkpoints', '/checkpoints')
+        ...
+        watcher.flush()
+        watcher.stop()
+
+        :type src: str
+        :param src: The local directory, the files under it are uploaded to the same relative paths under the path
+
+        :type path: str
+        :param path: The path of the folder
+
+        :type interval: float
+        :param interval: The seconds between polls
+
+        :type debounce: float
+        :param debounce: The seconds a file should be unchanged before it is uploaded
+
+        :type parallel: int
+        :param parallel: The number of concurrent uploads
+
+        :type skip_unchanged: bool
+        :param skip_unchanged: Skip the files unchanged since their last uploads, it is tracked by a local index.
+
+        :rtype UploadWatcher
+        :return The started watcher
+        """
+        if not os.path.isdir(src):
+            invalid(f'{src} is not a directory')
+
+        path = _normalize_user_input_path(path)
+        endpoint = self._primehub_store_endpoint()
+        index = self.upload_index if kwargs.get('skip_unchanged', False) else None
+        scope = self._upload_index_scope()
+
+        def upload(local_path: str, relative: str):
+            phfs_path = os.path.join(path, relative)
+            digest = None
+            if index is not None:
+                unchanged, digest = index.is_unchanged(scope, phfs_path, local_path)
+                if unchanged:
+                    return
+                digest = digest or index.hash(local_path)
+            st = os.stat(local_path)
+
+            print(f'[Uploading] {local_path} -> phfs://{phfs_path}', file=self.primehub.stderr)
+            response = self._execute_upload(endpoint, local_path, phfs_path)
+            if response.get('success', True) is False:
+                raise SharedFileException(f'Failed to upload {local_path}: {response}')
+            if index is not None and digest:
+                index.record(scope, phfs_path, digest, st.st_size, st.st_mtime)
+
+        watcher = UploadWatcher(src, upload, interval=kwargs.get('interval', None) or DEFAULT_INTERVAL,
+                                debounce=kwargs.get('debounce', None) or DEFAULT_DEBOUNCE,
+                                parallel=kwargs.get('parallel', None) or 2,
+                                include=kwargs.get('include', None), exclude=kwargs.get('exclude', None))
+        return watcher.start()
+
+    @cmd(name='watch-upload', description='Watch a local directory and upload the changed files continuously',
+         optionals=[('interval', float), ('debounce', float), ('parallel', int), ('skip_unchanged', toggle_flag),
+                    ('include', str), ('exclude', str)])
+    def watch_upload(self, src, path, **kwargs):
+        """
+        Watch a local directory and upload the new or modified files until it is interrupted,
+        the pending changes are uploaded before exiting
+
+        :type src: str
+        :param src: The local directory, the files under it are uploaded to the same relative paths under the path
+
+        :type path: str
+        :param path: The path of the folder
+
+        :type interval: float
+        :param interval: The seconds between polls, the default is 2 seconds
+
+        :type debounce: float
+        :param debounce: The seconds a file should be unchanged before it is uploaded, the default is 1 second
+
+        :type parallel: int
+        :param parallel: The number of concurrent uploads
+
+        :type skip_unchanged: bool
+        :param skip_unchanged: Skip the files unchanged since their last uploads, it is tracked by a local index.
+
+        :type include: str
+        :param include: Upload only the files matching the comma-separated glob patterns
+
+        :type exclude: str
+        :param exclude: Skip the files and directories matching the comma-separated glob patterns
+        """
+        watcher = self.watch(src, path, **kwargs)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print('[Stopping] uploading the pending changes', file=self.primehub.stderr)
+        finally:
+            watcher.stop()
+
     def _warning_skip(self, path):
         logger.warning(f'[Warning] skip path: {path}')
 
     def _execute_upload(self, endpoint, src, path):
-        return self.upload_file(endpoint + path, src)
+        try:
+            return self.upload_file(endpoint + path, src)
+        finally:
+            self._invalidate_metadata()
 
     @cmd(name='delete', description='delete shared files', optionals=[('recursive', toggle_flag)])
     def delete(self, path, **kwargs):
@@ -400,6 +1121,11 @@ class Files(Helpful, Module):
         :param recursive: Delete recursively, it works when a path is a directory.
         """
 
+        recursive = kwargs.get('recursive', False)
+        phfs_prefix = self._generate_prefix(path, recursive)
+        return self._execute_delete(phfs_prefix, recursive)
+
+    def _execute_delete(self, phfs_prefix: str, recursive: bool) -> dict:
         query = """
         mutation deleteFiles(
           $where: StoreFileWhereInput!
@@ -408,39 +1134,177 @@ class Files(Helpful, Module):
           deleteFiles(where: $where, options: $options)
         }
         """
-        recursive = kwargs.get('recursive', False)
-        phfs_prefix = self._generate_prefix(path, recursive)
-
         variables = {'options': {'recursive': recursive},
                      'where': {'phfsPrefix': phfs_prefix, 'groupName': self.group_name}}
 
-        result = self.request(variables, query)
+        try:
+            result = self.request(variables, query)
+        finally:
+            self._invalidate_metadata()
+        self.upload_index.forget(self._upload_index_scope(), '/' + phfs_prefix)
         if 'data' in result:
             return result['data']
         return result
 
+    @cmd(name='sync', description='Sync files between a local directory and PHFS',
+         optionals=[('delete', toggle_flag), ('dry_run', toggle_flag), ('checksum', toggle_flag), ('parallel', int)])
+    def sync(self, src, dst, **kwargs):
+        """
+        Sync files from the source directory to the destination directory, only the changed files are transferred.
+        One of them is a PHFS URI, e.g., phfs:///checkpoints
+
+        :type src: str
+        :param src: The source directory, a local path or a PHFS URI
+
+        :type dst: str
+        :param dst: The destination directory, a local path or a PHFS URI
+
+        :type delete: bool
+        :param delete: Delete the files which are not in the source.
+
+        :type dry_run: bool
+        :param dry_run: Show the files to transfer and to delete without changing anything.
+
+        :type checksum: bool
+        :param checksum: Compare files of the same size by their content instead of their modification times.
+
+        :type parallel: int
+        :param parallel: The number of files to transfer concurrently.
+
+        :rtype dict
+        :return The plan and the report of the transfers
+        """
+        if is_phfs_uri(src) == is_phfs_uri(dst):
+            invalid('One of the source and the destination should be a PHFS URI, e.g., phfs:///path')
+            return {}
+
+        upload = is_phfs_uri(dst)
+        local_root = src if upload else dst
+        remote_root = os.path.normpath(_normalize_user_input_path((dst if upload else src)[len(PHFS_SCHEME):]))
+        remote_prefix = os.path.join(remote_root, '')
+
+        if upload and not os.path.isdir(local_root):
+            invalid(f'Not a directory: {local_root}')
+        if not upload and os.path.isfile(local_root):
+            invalid(f'Not a directory: {local_root}')
+
+        is_directory, file = self._probe(remote_root)
+        if file is not None and not is_directory:
+            invalid(f'Not a directory: {PHFS_SCHEME}{remote_root}')
+        if not upload and not is_directory:
+            invalid(f'No such file or directory: {PHFS_SCHEME}{remote_root}')
+
+        remote = dict()
+        if is_directory:
+            for x in self._walk(remote_prefix, kwargs.get('parallel', None) or 1):
+                if not x['name'].endswith('/'):
+                    remote[x['name']] = FileMeta(x.get('size'), parse_last_modified(x.get('lastModified')))
+        local = dict(local_files(local_root)) if os.path.isdir(local_root) else dict()
+
+        endpoint = self._primehub_store_endpoint()
+        same_content = None
+        if kwargs.get('checksum', False):
+            def same_content(path: str) -> bool:
+                return self._remote_digest(endpoint + remote_prefix + path) == \
+                    file_hasher(os.path.join(local_root, path), 'sha256').hexdigest()
+
+        plan = plan_sync(local, remote, kwargs.get('delete', False), same_content) if upload else \
+            plan_sync(remote, local, kwargs.get('delete', False), same_content)
+        result = dict(plan.to_dict(), dryRun=bool(kwargs.get('dry_run', False)))
+        if result['dryRun']:
+            return result
+
+        def transfer(task: TransferTask):
+            if upload:
+                print(f'[Uploading] {task.src} -> phfs://{task.dst}', file=self.primehub.stderr)
+                self._execute_upload(endpoint, task.src, task.dst)
+                task.size = os.path.getsize(task.src)
+                return
+
+            dir = os.path.dirname(task.dst)
+            if dir:
+                os.makedirs(dir, exist_ok=True)
+            self.request_file(endpoint + task.src, task.dst)
+            task.size = os.path.getsize(task.dst)
+            # keep the remote modification time to detect the changes in the next sync
+            mtime = remote[task.src[len(remote_prefix):]].mtime
+            if mtime is not None:
+                os.utime(task.dst, (mtime, mtime))
+
+        def tasks():
+            for path, _ in plan.transfers:
+                local_path = os.path.join(local_root, *path.split('/'))
+                if upload:
+                    yield TransferTask(local_path, remote_prefix + path)
+                else:
+                    yield TransferTask(remote_prefix + path, local_path)
+
+        report = TransferManager(kwargs.get('parallel', None) or 1).run(tasks(), transfer)
+
+        if upload and plan.deletes:
+            self._execute_delete_many([((remote_prefix + path).lstrip('/'), False) for path in plan.deletes])
+        elif not upload:
+            for path in plan.deletes:
+                os.remove(os.path.join(local_root, *path.split('/')))
+
+        result.update(_raise_for_failures(report))
+        return result
+
+    def _remote_digest(self, url: str) -> str:
+        """
+        The sha256 hexdigest of a remote file, it is streamed to a temporary file and hashed
+        """
+        fd, path = tempfile.mkstemp('.download')
+        os.close(fd)
+        try:
+            self.request_file(url, path, resume=False)
+            return file_hasher(path, 'sha256').hexdigest()
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _execute_delete_many(self, targets: List[Tuple[str, bool]], batch_size: int = 50) -> dict:
+        """
+        Delete the (prefix, recursive) targets with aliased deleteFiles fields,
+        a mutation deletes up to batch_size prefixes with their own options
+
+        :return {'deleteFiles': the number of the deleted files},
+                it raises PartialResultException(deleted, {prefix: [messages]}) when some prefixes failed
+        """
+        query = AliasedQuery('mutation', 'deleteFiles', 'where', 'StoreFileWhereInput!', '', prefix='d',
+                             extra_variables={'options': 'StoreFileDeleteOptionInput'})
+        phfs_prefixes = [x for x, _ in targets]
+        arguments = [{'where': {'phfsPrefix': x, 'groupName': self.group_name}, 'options': {'recursive': recursive}}
+                     for x, recursive in targets]
+        try:
+            deleted, errors = query.execute(self.request, phfs_prefixes, arguments, batch_size)
+        finally:
+            self._invalidate_metadata()
+        for x in phfs_prefixes:
+            self.upload_index.forget(self._upload_index_scope(), '/' + x)
+        raise_for_partial_errors(deleted, errors)
+        return {'deleteFiles': sum([x or 0 for x in deleted.values()])}
+
     def _generate_prefix(self, path, recursive) -> str:
         path = _normalize_user_input_path(path)
         path_norm = os.path.normpath(path)
         path_isprefix = path.endswith('/')
         delete_single_file = False
 
+        is_directory, file = self._probe(path_norm)
         if not path_isprefix and not recursive:
             # to delete a file
-            items = self._execute_list(path_norm, recursive=True, limit=1)
-            if not items or items[0]['name']:
+            if file is None:
                 invalid(f'No such file: {path}')
 
             delete_single_file = True
         else:
-            items = self._execute_list(path_norm, limit=1)
-            if items:  # directory
+            if is_directory:
                 if not recursive:
                     invalid(f'{path} is a directory, please delete it recursively')
 
             else:  # file or not exist
-                items = self._execute_list(path_norm, recursive=True, limit=1)
-                if not items or items[0]['name']:
+                if file is None:
                     invalid(f'No such file or directory: {path}')
 
                 if not os.path.basename(path):  # trailing slash
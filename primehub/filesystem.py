@@ -0,0 +1,217 @@
+"""
+An fsspec filesystem for PrimeHub Shared Files, the phfs:// URIs could be opened by pandas and pyarrow:
+
+    pd.read_parquet('phfs:///datasets/events.parquet')
+
+It requires the fsspec extra: pip install primehub-python-sdk[fsspec]
+"""
+import posixpath
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+try:
+    from fsspec import AbstractFileSystem
+    from fsspec.caching import BaseCache, caches
+    from fsspec.spec import AbstractBufferedFile
+except ImportError:
+    raise ImportError('fsspec is required for the phfs filesystem, '
+                      'install it by "pip install primehub-python-sdk[fsspec]"')
+
+from primehub import PrimeHub, PrimeHubConfig
+from primehub.utils.sync import parse_last_modified
+
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+DEFAULT_CACHE_BLOCKS = 32
+DEFAULT_READAHEAD_BLOCKS = 2
+
+
+class ReadaheadBlockCache(BaseCache):
+    """
+    An LRU cache of fixed-size blocks, each block is read by a ranged request.
+
+    A miss right after the previous block, i.e., a sequential read, fetches the following `readahead` blocks
+    in the same request. Random reads, e.g., the column chunks of a parquet file, fetch the needed blocks only.
+    """
+
+    name = 'phfs-blocks'
+
+    def __init__(self, blocksize: int, fetcher, size: int, maxblocks: int = DEFAULT_CACHE_BLOCKS,
+                 readahead: int = DEFAULT_READAHEAD_BLOCKS):
+        super(ReadaheadBlockCache, self).__init__(blocksize, fetcher, size)
+        self.maxblocks = max(maxblocks, 1)
+        self.readahead = readahead
+        self.nblocks = (size + blocksize - 1) // blocksize if size else 0
+        self.blocks: OrderedDict = OrderedDict()
+        self._last_block = -2
+        self._lock = threading.Lock()
+        # the statistics are not defined by the BaseCache of older fsspec versions
+        self.hit_count = 0
+        self.miss_count = 0
+        self.total_requested_bytes = 0
+
+    def _fetch(self, start: Optional[int], stop: Optional[int]) -> bytes:
+        if start is None:
+            start = 0
+        if stop is None:
+            stop = self.size
+        if start >= self.size or start >= stop:
+            return b''
+        stop = min(stop, self.size)
+
+        first = start // self.blocksize
+        last = (stop - 1) // self.blocksize
+        data = b''.join([self._block(x) for x in range(first, last + 1)])
+        offset = first * self.blocksize
+        return data[start - offset:stop - offset]
+
+    def _block(self, index: int) -> bytes:
+        with self._lock:
+            block = self.blocks.get(index)
+            if block is not None:
+                self.hit_count += 1
+                self.blocks.move_to_end(index)
+                self._last_block = index
+                return block
+
+            self.miss_count += 1
+            count = 1 + (self.readahead if index == self._last_block + 1 else 0)
+            count = min(count, self.nblocks - index)
+            # read ahead until a cached block
+            n = 1
+            while n < count and index + n not in self.blocks:
+                n += 1
+
+            start = index * self.blocksize
+            data = self.fetcher(start, min(start + n * self.blocksize, self.size))
+            self.total_requested_bytes += len(data)
+            for x in range(n):
+                self.blocks[index + x] = data[x * self.blocksize:(x + 1) * self.blocksize]
+            while len(self.blocks) > self.maxblocks:
+                self.blocks.popitem(last=False)
+            self._last_block = index
+            return data[:self.blocksize]
+
+
+caches.setdefault(ReadaheadBlockCache.name, ReadaheadBlockCache)
+
+
+class PrimeHubFile(AbstractBufferedFile):
+    """
+    A read-only file of PrimeHub Shared Files, the content is read in byte ranges through the block cache
+    """
+
+    def _fetch_range(self, start: int, end: int) -> bytes:
+        return self.fs.read_range(self.path, start, end)
+
+
+class PrimeHubFileSystem(AbstractFileSystem):
+    """
+    PrimeHubFileSystem is an fsspec filesystem of the phfs protocol, the paths are absolute in the current group.
+
+    The listings are built on Files, the reads are ranged requests to the shared files endpoint.
+    """
+
+    protocol = 'phfs'
+    root_marker = '/'
+
+    def __init__(self, primehub: Optional[PrimeHub] = None, config: Optional[str] = None,
+                 group: Optional[str] = None, block_size: int = DEFAULT_BLOCK_SIZE,
+                 cache_blocks: int = DEFAULT_CACHE_BLOCKS, readahead: int = DEFAULT_READAHEAD_BLOCKS,
+                 **storage_options):
+        """
+        :type primehub: PrimeHub
+        :param primehub: The PrimeHub to access, it is created from the config and the group when it is None
+
+        :type config: str
+        :param config: The path of the config file, the default is ~/.primehub/config.json
+
+        :type group: str
+        :param group: The group name, it overrides the group in the config
+
+        :type block_size: int
+        :param block_size: The size of a cached block in bytes
+
+        :type cache_blocks: int
+        :param cache_blocks: The maximum number of cached blocks of an opened file
+
+        :type readahead: int
+        :param readahead: The number of blocks to read ahead on a sequential read
+        """
+        super(PrimeHubFileSystem, self).__init__(**storage_options)
+        if primehub is None:
+            primehub = PrimeHub(PrimeHubConfig(config=config, group=group))
+        self.primehub = primehub
+        self.blocksize = block_size
+        self.cache_blocks = cache_blocks
+        self.readahead = readahead
+
+    @property
+    def files(self):
+        return self.primehub.files
+
+    @classmethod
+    def _strip_protocol(cls, path):
+        if isinstance(path, list):
+            return [cls._strip_protocol(x) for x in path]
+        path = super(PrimeHubFileSystem, cls)._strip_protocol(path)
+        return posixpath.normpath('/' + path.lstrip('/'))
+
+    @staticmethod
+    def _entry(directory: str, item: dict) -> dict:
+        name = posixpath.join(directory, item['name'].rstrip('/'))
+        if item['name'].endswith('/'):
+            return dict(name=name, size=0, type='directory')
+        return dict(name=name, size=item.get('size'), type='file',
+                    mtime=parse_last_modified(item.get('lastModified')))
+
+    def ls(self, path, detail=True, refresh=False, **kwargs):
+        path = self._strip_protocol(path)
+        entries = None if refresh else self.dircache.get(path)
+        if entries is None:
+            if path != '/':
+                is_directory, file = self.files._probe(path)
+                if not is_directory:
+                    if file is None:
+                        raise FileNotFoundError(path)
+                    entries = [dict(self._entry(posixpath.dirname(path), file), name=path)]
+                    return entries if detail else [path]
+            entries = [self._entry(path, x) for x in self.files._list_directory(path)]
+            self.dircache[path] = entries
+        return entries if detail else [x['name'] for x in entries]
+
+    def info(self, path, **kwargs):
+        path = self._strip_protocol(path)
+        if path == '/':
+            return dict(name=path, size=0, type='directory')
+        is_directory, file = self.files._probe(path)
+        if is_directory:
+            return dict(name=path, size=0, type='directory')
+        if file is None:
+            raise FileNotFoundError(path)
+        return dict(self._entry(posixpath.dirname(path), file), name=path)
+
+    def modified(self, path):
+        mtime = self.info(path).get('mtime')
+        if mtime is None:
+            raise IsADirectoryError(path)
+        return datetime.fromtimestamp(mtime, tz=timezone.utc)
+
+    def read_range(self, path: str, start: int, end: int) -> bytes:
+        """
+        Read the bytes of a file from `start` to `end` (exclusive)
+        """
+        endpoint = self.files._primehub_store_endpoint() + self._strip_protocol(path)
+        return self.primehub.request_range(endpoint, start, end - 1)
+
+    def _open(self, path, mode='rb', block_size=None, autocommit=True, cache_options=None, **kwargs):
+        if mode != 'rb':
+            raise NotImplementedError(f'phfs files are read-only, the mode {mode} is not supported')
+        cache_type = kwargs.pop('cache_type', ReadaheadBlockCache.name)
+        options = dict(cache_options or {})
+        if cache_type == ReadaheadBlockCache.name:
+            options.setdefault('maxblocks', self.cache_blocks)
+            options.setdefault('readahead', self.readahead)
+        return PrimeHubFile(self, path, mode, block_size or self.blocksize, autocommit, cache_type=cache_type,
+                            cache_options=options, **kwargs)
@@ -1,10 +1,11 @@
 import json
 import os
 import time
-from typing import Iterator, Any
+from typing import Iterator, Any, List
 
 from primehub import Helpful, cmd, Module, primehub_load_config
-from primehub.utils import resource_not_found, PrimeHubException
+from primehub.utils import resource_not_found, PrimeHubException, PartialResultException
+from primehub.utils.graphql import AliasedQuery, raise_for_partial_errors
 from primehub.utils.optionals import toggle_flag, file_flag
 
 
@@ -61,6 +62,36 @@ def verify_timeout(config: dict):
         invalid_field(f'{field_name} should be int value')
 
 
+_fragment_ph_job_info = """
+fragment PhJobInfo on PhJob {
+  id
+  displayName
+  cancel
+  command
+  groupId
+  groupName
+  schedule
+  image
+  instanceType {
+    id
+    name
+    displayName
+    cpuLimit
+    memoryLimit
+    gpuLimit
+  }
+  userId
+  userName
+  phase
+  reason
+  message
+  createTime
+  startTime
+  finishTime
+}
+"""
+
+
 def rename_schedule_to_recurrence(message: dict):
     message['recurrence'] = message.pop('schedule', '')
 
@@ -168,38 +199,42 @@ class Jobs(Helpful, Module):
         query = """
         query ($where: PhJobWhereUniqueInput!) {
           phJob(where: $where) {
-            id
-            displayName
-            cancel
-            command
-            groupId
-            groupName
-            schedule
-            image
-            instanceType {
-              id
-              name
-              displayName
-              cpuLimit
-              memoryLimit
-              gpuLimit
-            }
-            userId
-            userName
-            phase
-            reason
-            message
-            createTime
-            startTime
-            finishTime
+            ...PhJobInfo
           }
         }
         """
-        results = self.request({'where': {'id': id}}, query, _error_handler)
+        results = self.request({'where': {'id': id}}, query + _fragment_ph_job_info, _error_handler)
         rename_schedule_to_recurrence(results['data']['phJob'])
 
         return results['data']['phJob']
 
+    def get_many(self, ids: List[str], batch_size: int = 50) -> dict:
+        """
+        Get detail information of many jobs, a request fetches up to batch_size jobs
+
+        :type ids: list
+        :param ids: The job ids
+
+        :type batch_size: int
+        :param batch_size: The maximum number of jobs in a request
+
+        :rtype dict
+        :return The detail information of jobs by id,
+                it raises PartialResultException(jobs, {id: [messages]}) when some jobs failed
+        """
+        query = AliasedQuery('query', 'phJob', 'where', 'PhJobWhereUniqueInput!', '{ ...PhJobInfo }', prefix='j',
+                             fragments=_fragment_ph_job_info)
+        jobs, errors = query.execute(self.request, list(ids), [{'id': x} for x in ids], batch_size)
+        for job_id, job in list(jobs.items()):
+            if not job:
+                jobs.pop(job_id)
+                errors[job_id] = [{'message': f'Cannot find the job [{job_id}]'}]
+                continue
+            rename_schedule_to_recurrence(job)
+
+        raise_for_partial_errors(jobs, errors)
+        return jobs
+
     @cmd(name='submit', description='Submit a job', optionals=[('file', file_flag), ('from', str)])
     def _submit_cmd(self, **kwargs):
         """
@@ -366,6 +401,35 @@ class Jobs(Helpful, Module):
         self.request({'where': {'id': id}}, query, _error_handler)
         return self.get(id)
 
+    def cancel_many(self, ids: List[str], batch_size: int = 50) -> dict:
+        """
+        Cancel many jobs, a request cancels up to batch_size jobs
+
+        :type ids: list
+        :param ids: The job ids
+
+        :type batch_size: int
+        :param batch_size: The maximum number of jobs in a request
+
+        :rtype dict
+        :return The detail information of the canceled jobs by id,
+                it raises PartialResultException(jobs, {id: [messages]}) when some jobs failed
+        """
+        query = AliasedQuery('mutation', 'cancelPhJob', 'where', 'PhJobWhereUniqueInput!', '{ id }', prefix='c')
+        canceled, errors = query.execute(self.request, list(ids), [{'id': x} for x in ids], batch_size)
+
+        jobs: dict = dict()
+        canceled_ids = [x for x in ids if x in canceled]
+        if canceled_ids:
+            try:
+                jobs = self.get_many(canceled_ids, batch_size)
+            except PartialResultException as e:
+                jobs, get_errors = e.args
+                errors.update({k: [{'message': m} for m in v] for k, v in get_errors.items()})
+
+        raise_for_partial_errors(jobs, errors)
+        return jobs
+
     @cmd(name='wait', description='Wait a job by id', optionals=[('timeout', int)])
     def wait(self, id, **kwargs):
         """
@@ -458,7 +522,8 @@ class Jobs(Helpful, Module):
         results = self.request({'where': {'id': id}}, query, _error_handler)
         return results['data']['phJob']['artifact']['items']
 
-    @cmd(name='download-artifacts', description='Download artifacts', optionals=[('recursive', toggle_flag)])
+    @cmd(name='download-artifacts', description='Download artifacts',
+         optionals=[('recursive', toggle_flag), ('parallel', int), ('resume', toggle_flag)])
     def download_artifacts(self, id, path, dest, **kwargs):
         """
         Download job artifacts
@@ -474,6 +539,15 @@ class Jobs(Helpful, Module):
 
         :type recursive: bool
         :param recursive: Copy recursively
+
+        :type parallel: int
+        :param parallel: The number of files to download concurrently
+
+        :type resume: bool
+        :param resume: Resume an interrupted download
+
+        :rtype: dict
+        :return: The report of the transfers
         """
 
         if path in ['.', '', './']:
@@ -482,8 +556,7 @@ class Jobs(Helpful, Module):
 
         # get id to verify existing
         self.get(id)
-        self.primehub.files.download(path, dest, **kwargs)
-        return
+        return self.primehub.files.download(path, dest, **kwargs)
 
     def display(self, action: dict, value: Any):
         if action['func'] == 'list_artifacts' and isinstance(value, dict) and self.get_display().name != 'json':
@@ -23,6 +23,10 @@ class RequestException(PrimeHubException):
     pass
 
 
+class CircuitBreakerOpenException(RequestException):
+    pass
+
+
 class ResponseException(PrimeHubException):
     pass
 
@@ -31,6 +35,10 @@ class PrimeHubReturnsRequiredException(PrimeHubException):
     pass
 
 
+class PartialResultException(PrimeHubException):
+    pass
+
+
 class ResourceNotFoundException(PrimeHubException):
     pass
 
@@ -39,6 +47,10 @@ class SharedFileException(PrimeHubException):
     pass
 
 
+class TransferVerificationException(PrimeHubException):
+    pass
+
+
 class DatasetsException(PrimeHubException):
     pass
 
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from primehub.utils import create_logger
+from primehub.utils.graphql import root_fields
+
+logger = create_logger('cache')
+
+# the entities embedded in an aggregated root field, a mutation on them invalidates the field
+EMBEDDED_ENTITIES: Dict[str, List[str]] = {
+    'me': ['user', 'group', 'image', 'instancetype', 'volume', 'dataset'],
+}
+
+DEFAULT_TTLS: Dict[str, float] = {
+    'me': 300,
+}
+
+
+def _normalize_entity(name: str) -> str:
+    return name.lower().rstrip('s')
+
+
+def mutation_entity(field: str) -> Optional[str]:
+    """
+    The entity changed by a mutation field, e.g., createPhJob => phjob, deleteFiles => file
+    """
+    matched = re.match(r'^[a-z]+([A-Z]\w*)$', field)
+    if not matched:
+        return None
+    return _normalize_entity(matched.group(1))
+
+
+def is_affected(fields: List[str], entity: Optional[str]) -> bool:
+    if entity is None:
+        return True
+    for field in fields:
+        if entity in field.lower():
+            return True
+        if [x for x in EMBEDDED_ENTITIES.get(field, []) if x in entity]:
+            return True
+    return False
+
+
+class CacheEntry(object):
+
+    def __init__(self, content: str, fields: List[str], ttl: float, stale_ttl: float, created: float):
+        self.content = content
+        self.fields = fields
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.created = created
+
+    def age(self) -> float:
+        return time.time() - self.created
+
+    def is_fresh(self) -> bool:
+        return self.age() <= self.ttl
+
+    def is_usable(self) -> bool:
+        return self.age() <= self.ttl + self.stale_ttl
+
+    def to_json(self) -> str:
+        return json.dumps(dict(content=self.content, fields=self.fields, ttl=self.ttl, stale_ttl=self.stale_ttl,
+                               created=self.created))
+
+    @staticmethod
+    def from_json(text: str) -> 'CacheEntry':
+        data = json.loads(text)
+        return CacheEntry(data['content'], data['fields'], data['ttl'], data['stale_ttl'], data['created'])
+
+
+class ResponseCache(object):
+    """
+    ResponseCache keeps the results of read-only GraphQL queries.
+
+    Only the queries whose root fields have a TTL are cached, `ttls` maps a root field to its TTL in seconds
+    and `default_ttl` applies to the other root fields (0 means no caching).
+
+    * the memory tier is a LRU with at most `max_entries` entries
+    * the disk tier in `cache_dir` is optional, it is shared by processes (e.g., CLI invocations)
+    * an expired entry is still returned within `stale_ttl` seconds while it is refreshed in the background
+    * a mutation invalidates the entries selecting the entity changed by it
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 0, stale_ttl: float = 0,
+                 max_entries: int = 256, cache_dir: Optional[str] = None):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._revalidating: set = set()
+        self._lock = threading.RLock()
+        self._stats = dict(hits=0, stale_hits=0, misses=0, evictions=0, invalidations=0)
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._stats[name] += value
+
+    def ttl_of(self, fields: List[str]) -> float:
+        if not fields:
+            return 0
+        return min([self.ttls.get(x, self.default_ttl) for x in fields])
+
+    @staticmethod
+    def key(scope: str, variables: dict, query: str) -> str:
+        normalized_query = ' '.join(query.split())
+        text = json.dumps(dict(scope=scope, variables=variables, query=normalized_query), sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def lookup(self, key: str) -> Tuple[Optional[dict], bool]:
+        """
+        Find a usable entry
+
+        :return (result, is_fresh), the result is None when there is no usable entry
+        """
+        entry = self._get_entry(key)
+        if entry is None or not entry.is_usable():
+            self._count('misses')
+            return None, False
+
+        if entry.is_fresh():
+            self._count('hits')
+        else:
+            self._count('stale_hits')
+        return json.loads(entry.content), entry.is_fresh()
+
+    def store(self, key: str, result: dict, fields: List[str]):
+        entry = CacheEntry(json.dumps(result), fields, self.ttl_of(fields), self.stale_ttl, time.time())
+        self._put_entry(key, entry)
+
+    def revalidate(self, key: str, fetch: Callable[[], dict], fields: List[str]):
+        """
+        Refresh an entry in the background, at most one refresh for a key at the same time
+        """
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def refresh():
+            try:
+                self.store(key, fetch(), fields)
+            except BaseException as e:
+                logger.debug('failed to revalidate %s: %s', key, e)
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def invalidate(self, mutation: str):
+        """
+        Invalidate the entries affected by the mutation document
+        """
+        entities = [mutation_entity(x) for x in root_fields(mutation)] or [None]
+
+        def affected(entry: CacheEntry):
+            return [x for x in entities if is_affected(entry.fields, x)]
+
+        with self._lock:
+            for key in [k for k, v in self._entries.items() if affected(v)]:
+                del self._entries[key]
+                self._stats['invalidations'] += 1
+
+        for path, entry in self._disk_entries():
+            if affected(entry):
+                self._remove_file(path)
+                self._count('invalidations')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        for path, _ in self._disk_entries():
+            self._remove_file(path)
+
+    def _get_entry(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._read_file(key)
+        if entry is not None:
+            self._put_memory(key, entry)
+        return entry
+
+    def _put_entry(self, key: str, entry: CacheEntry):
+        self._put_memory(key, entry)
+        self._write_file(key, entry)
+
+    def _put_memory(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir or '', f'{key}.json')
+
+    def _read_file(self, key: str) -> Optional[CacheEntry]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key)) as fh:
+                return CacheEntry.from_json(fh.read())
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_file(self, key: str, entry: CacheEntry):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp('.tmp', '.entry-', self.cache_dir)
+            with os.fdopen(fd, 'w') as fh:
+                fh.write(entry.to_json())
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.debug('failed to write the cache entry %s: %s', key, e)
+
+    def _disk_entries(self):
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            entry = self._read_file(name[:-len('.json')])
+            path = os.path.join(self.cache_dir, name)
+            if entry is None or not entry.is_usable():
+                self._remove_file(path)
+                continue
+            yield path, entry
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
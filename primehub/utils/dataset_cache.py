@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from primehub.utils import create_logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+logger = create_logger('dataset-cache')
+
+DEFAULT_CACHE_DIR = os.path.join('~', '.primehub', 'datasets')
+DEFAULT_CACHE_SIZE = 100 * 1024 * 1024 * 1024
+
+MANIFEST_NAME = '.primehub-manifest.json'
+TEMP_PREFIX = '.tmp-'
+
+
+class FileLock(object):
+    """
+    A lock of a file shared by the processes on a node, it is a no-op on platforms without fcntl.
+    It is exclusive by default, or shared with other shared holders.
+    """
+
+    def __init__(self, path: str, shared: bool = False):
+        self.path = path
+        self.shared = shared
+        self._fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        :return False when the lock is held by others and blocking is False
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            operation = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+            try:
+                fcntl.flock(fd, operation if blocking else operation | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            # the lock is released when the last descriptor is closed, a forked child keeps an inherited lock
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+# the versions used by this process, {dataset directory: the shared lock of the version}
+_in_use: Dict[str, FileLock] = dict()
+_in_use_lock = threading.Lock()
+
+
+def version_key(dataset: dict, files: List[dict]) -> str:
+    """
+    The key of a dataset version, it changes when the dataset or any file is changed
+    """
+    listing = sorted([[x['name'], x.get('size'), x.get('lastModified')] for x in files])
+    content = json.dumps([dataset.get('updatedAt'), dataset.get('size'), listing])
+    return hashlib.sha1(content.encode()).hexdigest()[:16]
+
+
+def link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class DatasetCache(object):
+    """
+    DatasetCache keeps the materialized versions of datasets in a directory shared by the processes on a node:
+
+    <root>/<scope>/<dataset id>/<version key>/...files
+
+    A version is complete when its manifest exists, it is built in a temporary directory and renamed.
+    The files unchanged since another cached version of the dataset are linked instead of downloaded.
+    The least recently used versions are evicted when the total size exceeds `max_size`,
+    except the versions in use: a process holds a shared lock of <version>.lock on the version it uses,
+    and a dataset is skipped while another process holds its lock to build a version.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_size: int = DEFAULT_CACHE_SIZE):
+        self.root = os.path.expanduser(root)
+        self.max_size = max_size
+
+    def dataset_dir(self, scope: str, dataset_id: str) -> str:
+        return os.path.join(self.root, hashlib.sha1(scope.encode()).hexdigest()[:12], dataset_id)
+
+    def lock(self, directory: str) -> FileLock:
+        """
+        The lock of a dataset directory, or the whole cache when the directory is the root
+        """
+        if directory == self.root:
+            return FileLock(os.path.join(self.root, '.lock'))
+        return FileLock(directory + '.lock')
+
+    @staticmethod
+    def manifest(version_dir: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(version_dir, MANIFEST_NAME)) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def lookup(self, version_dir: str) -> Optional[dict]:
+        """
+        The manifest of a complete version, the version is marked as recently used
+        """
+        manifest = self.manifest(version_dir)
+        if manifest is not None:
+            os.utime(os.path.join(version_dir, MANIFEST_NAME))
+        return manifest
+
+    def prepare(self, dataset_dir: str, key: str) -> str:
+        """
+        Create the temporary directory to build a version, the caller should hold the lock of the dataset
+        """
+        os.makedirs(dataset_dir, exist_ok=True)
+        for name in os.listdir(dataset_dir):
+            if name.startswith(TEMP_PREFIX):
+                # left by an interrupted process
+                shutil.rmtree(os.path.join(dataset_dir, name), ignore_errors=True)
+        temp_dir = os.path.join(dataset_dir, f'{TEMP_PREFIX}{key}-{os.getpid()}')
+        os.makedirs(temp_dir)
+        return temp_dir
+
+    def reusable(self, dataset_dir: str) -> Dict[str, Tuple[str, int, Optional[str]]]:
+        """
+        The files of the cached versions of a dataset, the most recently used one wins
+
+        :return {name: (local path, size, lastModified)}
+        """
+        versions = []
+        for name in os.listdir(dataset_dir) if os.path.isdir(dataset_dir) else []:
+            manifest_path = os.path.join(dataset_dir, name, MANIFEST_NAME)
+            if not name.startswith(TEMP_PREFIX) and os.path.exists(manifest_path):
+                versions.append((os.path.getmtime(manifest_path), os.path.join(dataset_dir, name)))
+
+        files: Dict[str, Tuple[str, int, Optional[str]]] = dict()
+        for _, version_dir in sorted(versions):
+            manifest = self.manifest(version_dir) or {}
+            for name, (size, last_modified) in manifest.get('files', {}).items():
+                files[name] = (os.path.join(version_dir, name), size, last_modified)
+        return files
+
+    def commit(self, temp_dir: str, version_dir: str, dataset_id: str, files: List[dict]):
+        """
+        Write the manifest and publish the version atomically
+        """
+        manifest = dict(dataset=dataset_id, key=os.path.basename(version_dir), createdAt=time.time(),
+                        size=sum([x.get('size') or 0 for x in files]),
+                        files={x['name']: [x.get('size'), x.get('lastModified')] for x in files})
+        with open(os.path.join(temp_dir, MANIFEST_NAME), 'w') as fh:
+            json.dump(manifest, fh)
+        os.rename(temp_dir, version_dir)
+
+    def use(self, version_dir: str):
+        """
+        Mark the version in use by this process until it uses another version of the dataset or exits,
+        the caller should hold the lock of the dataset
+        """
+        dataset_dir = os.path.dirname(version_dir)
+        with _in_use_lock:
+            previous = _in_use.get(dataset_dir)
+            if previous is not None and previous.path == self.lock(version_dir).path:
+                return
+            marker = FileLock(self.lock(version_dir).path, shared=True)
+            marker.acquire()
+            _in_use[dataset_dir] = marker
+            if previous is not None:
+                previous.release()
+
+    def versions(self) -> List[Tuple[float, int, str]]:
+        """
+        :return [(last used time, size, version directory)] of the complete versions
+        """
+        result = []
+        for scope in os.listdir(self.root) if os.path.isdir(self.root) else []:
+            scope_dir = os.path.join(self.root, scope)
+            if not os.path.isdir(scope_dir):
+                continue
+            for dataset in os.listdir(scope_dir):
+                dataset_dir = os.path.join(scope_dir, dataset)
+                if not os.path.isdir(dataset_dir):
+                    continue
+                for version in os.listdir(dataset_dir):
+                    version_dir = os.path.join(dataset_dir, version)
+                    manifest = self.manifest(version_dir)
+                    if manifest is not None:
+                        used = os.path.getmtime(os.path.join(version_dir, MANIFEST_NAME))
+                        result.append((used, manifest.get('size', 0), version_dir))
+        return result
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Remove the least recently used versions until the total size is within the budget,
+        the versions in use and the datasets being built are skipped
+
+        :return the removed version directories
+        """
+        removed = []
+        with self.lock(self.root):
+            versions = sorted(self.versions())
+            total = sum([x[1] for x in versions])
+            for _, size, version_dir in versions:
+                if total <= self.max_size:
+                    break
+                if version_dir == keep:
+                    continue
+                if self._remove(version_dir):
+                    total -= size
+                    removed.append(version_dir)
+                    logger.debug('evict %s', version_dir)
+        return removed
+
+    def _remove(self, version_dir: str) -> bool:
+        dataset_lock = self.lock(os.path.dirname(version_dir))
+        if not dataset_lock.acquire(blocking=False):
+            logger.debug('skip %s, the dataset is being built', version_dir)
+            return False
+        try:
+            marker = self.lock(version_dir)
+            if not marker.acquire(blocking=False):
+                logger.debug('skip %s, the version is in use', version_dir)
+                return False
+            try:
+                # unpublish the version before removing its files
+                os.remove(os.path.join(version_dir, MANIFEST_NAME))
+                shutil.rmtree(version_dir, ignore_errors=True)
+                os.remove(marker.path)
+            finally:
+                marker.release()
+            return True
+        finally:
+            dataset_lock.release()
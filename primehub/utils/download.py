@@ -0,0 +1,184 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Callable, List, Mapping, Optional, Tuple
+
+from primehub.utils import TransferVerificationException
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_PART_SIZE = 32 * 1024 * 1024
+
+_seek_lock = threading.Lock()
+
+
+class TransferProgress(object):
+    """
+    The progress of a file transfer, it is given to the progress callback after each chunk
+    """
+
+    def __init__(self, path: str, transferred: int, total: Optional[int], started: float):
+        self.path = path
+        self.transferred = transferred
+        self.total = total
+        self.elapsed = time.time() - started
+
+    @property
+    def rate(self) -> float:
+        """
+        The throughput in bytes per second
+        """
+        if self.elapsed <= 0:
+            return 0
+        return self.transferred / self.elapsed
+
+    def __repr__(self):
+        return f'<TransferProgress {self.path} {self.transferred}/{self.total} {self.rate:.0f} B/s>'
+
+
+ProgressCallback = Callable[[TransferProgress], None]
+
+
+def parse_checksum(checksum: str) -> Tuple[str, str]:
+    """
+    Parse a checksum in the form of <algorithm>:<hexdigest>, e.g., sha256:9f86d0...
+    """
+    if ':' not in checksum:
+        raise TransferVerificationException(f'Invalid checksum [{checksum}], it should be <algorithm>:<hexdigest>')
+    algorithm, digest = checksum.split(':', 1)
+    algorithm = algorithm.lower()
+    if algorithm not in hashlib.algorithms_available:
+        raise TransferVerificationException(f'Unsupported checksum algorithm [{algorithm}]')
+    return algorithm, digest.lower()
+
+
+def file_hasher(path: str, algorithm: str, length: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    A hash object which has been updated with the first `length` bytes of the file (the whole file if None)
+    """
+    hasher = hashlib.new(algorithm)
+    remaining = length
+    with open(path, 'rb') as fh:
+        while remaining is None or remaining > 0:
+            chunk = fh.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return hasher
+
+
+def content_total(headers: Mapping, offset: int) -> Optional[int]:
+    """
+    The total size of a remote file from the Content-Range or Content-Length of a (partial) response
+    """
+    content_range = headers.get('Content-Range', '')
+    matched = re.match(r'^bytes\s+(?:\d+-\d+|\*)/(\d+)$', content_range.strip())
+    if matched:
+        return int(matched.group(1))
+    if headers.get('Content-Length') is not None and not content_range:
+        return offset + int(headers['Content-Length'])
+    return None
+
+
+def response_validator(headers: Mapping) -> Optional[Tuple[str, str]]:
+    """
+    The validator of a remote file for an If-Range request, (header, value) of a strong ETag or the Last-Modified
+    """
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return 'ETag', etag
+    if headers.get('Last-Modified'):
+        return 'Last-Modified', headers['Last-Modified']
+    return None
+
+
+def read_validator(path: str) -> Optional[Tuple[str, str]]:
+    try:
+        with open(path) as fh:
+            header, value = fh.read().split('\n', 1)
+            return header, value
+    except (OSError, ValueError):
+        return None
+
+
+def write_validator(path: str, validator: Optional[Tuple[str, str]]):
+    """
+    Keep the validator of a partial file next to it, or remove the stale one when the server has no validator
+    """
+    if validator is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, 'w') as fh:
+        fh.write('\n'.join(validator))
+
+
+def split_ranges(total: int, part_size: int) -> List[Tuple[int, int]]:
+    """
+    Split a file into inclusive byte ranges of at most `part_size` bytes
+    """
+    return [(start, min(start + part_size, total) - 1) for start in range(0, total, part_size)]
+
+
+def preallocate(fd: int, size: int):
+    """
+    Allocate the file to its final size, so the ranges could be written in any order
+    """
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            # e.g., the file system does not support it
+            pass
+    os.ftruncate(fd, size)
+
+
+def write_at(fd: int, data: bytes, offset: int):
+    """
+    Write the data at the offset of the file without moving a shared file position
+    """
+    if hasattr(os, 'pwrite'):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+        return
+
+    # no positional writes (Windows), the file position is shared by the writers
+    with _seek_lock:
+        with open(fd, 'r+b', closefd=False) as fh:
+            fh.seek(offset)
+            fh.write(data)
+
+
+def verify_file(path: str, size: Optional[int] = None, expected_size: Optional[int] = None,
+                checksum: Optional[str] = None, digest: Optional[str] = None):
+    """
+    Verify the size and the checksum of a downloaded file, the file is removed when the verification failed
+
+    :type size: int
+    :param size: the size reported by the server
+
+    :type digest: str
+    :param digest: the hexdigest computed while downloading, the file is hashed again when it is not given
+    """
+    try:
+        actual_size = os.path.getsize(path)
+        for expected in [x for x in (size, expected_size) if x is not None]:
+            if actual_size != expected:
+                raise TransferVerificationException(
+                    f'Size mismatch for [{path}]: expected {expected} bytes but got {actual_size} bytes')
+        if checksum:
+            algorithm, expected_digest = parse_checksum(checksum)
+            if digest is None:
+                digest = file_hasher(path, algorithm).hexdigest()
+            if digest != expected_digest:
+                raise TransferVerificationException(
+                    f'Checksum mismatch for [{path}]: expected {expected_digest} but got {digest}')
+    except TransferVerificationException:
+        os.remove(path)
+        raise
@@ -0,0 +1,77 @@
+import fnmatch
+import re
+from typing import List, Optional, Pattern, Set
+
+WILDCARDS = re.compile(r'[*?\[]')
+RECURSIVE_WILDCARD = '**'
+
+
+def literal_prefix(pattern: str) -> str:
+    """
+    The longest directory prefix of a glob pattern without wildcards, e.g., 'runs/' of 'runs/**/metrics/*.json'
+
+    It is pushed down to the server as the phfsPrefix of a listing.
+    """
+    wildcard = WILDCARDS.search(pattern)
+    literal = pattern if wildcard is None else pattern[:wildcard.start()]
+    return literal[:literal.rfind('/') + 1]
+
+
+class GlobMatcher(object):
+    """
+    GlobMatcher matches relative paths with '/' as the separator against a glob pattern.
+
+    '*', '?' and '[...]' match within a path segment, a '**' segment matches any number of segments.
+    The segments are compiled once, a directory could be pruned when no file under it could match.
+    """
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern.strip('/')
+        self.prefix = literal_prefix(self.pattern)
+        self._segments: List[Optional[Pattern]] = [
+            None if x == RECURSIVE_WILDCARD else re.compile(fnmatch.translate(x)) for x in self.pattern.split('/')]
+
+    def __repr__(self):
+        return f'<GlobMatcher pattern={self.pattern}>'
+
+    def _closure(self, states: Set[int]) -> Set[int]:
+        # a '**' segment could match no segment
+        pending = list(states)
+        while pending:
+            state = pending.pop()
+            if state < len(self._segments) and self._segments[state] is None and state + 1 not in states:
+                states.add(state + 1)
+                pending.append(state + 1)
+        return states
+
+    def _advance(self, segments: List[str]) -> Set[int]:
+        states = self._closure({0})
+        for segment in segments:
+            following = set()
+            for state in states:
+                if state >= len(self._segments):
+                    continue
+                regex = self._segments[state]
+                if regex is None:
+                    following.add(state)
+                elif regex.match(segment):
+                    following.add(state + 1)
+            states = self._closure(following)
+            if not states:
+                break
+        return states
+
+    def match(self, path: str) -> bool:
+        """
+        Check whether the relative path of a file matches the pattern
+        """
+        return len(self._segments) in self._advance(path.strip('/').split('/'))
+
+    def could_contain(self, directory: str) -> bool:
+        """
+        Check whether the files under the relative directory could match the pattern
+        """
+        directory = directory.strip('/')
+        if not directory:
+            return True
+        return any([x < len(self._segments) for x in self._advance(directory.split('/'))])
@@ -0,0 +1,184 @@
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from primehub.utils import GraphQLException, PartialResultException
+
+
+class AliasedQuery(object):
+    """
+    AliasedQuery merges the same root field for many arguments into one GraphQL document with aliases:
+
+    query ($j0: PhJobWhereUniqueInput!, $j1: PhJobWhereUniqueInput!) {
+      j0: phJob(where: $j0) { ... }
+      j1: phJob(where: $j1) { ... }
+    }
+
+    The response is split back by the keys given to `execute`, errors are mapped to the keys by their alias paths.
+
+    The `extra_variables` {name: type} are other arguments given per alias, e.g., {'options': 'OptionInput'}
+    becomes `j0: field(where: $j0, options: $j0_options)`, then an argument of `execute` is a dict
+    of the argument name and the extra variables.
+    """
+
+    def __init__(self, operation: str, field: str, argument_name: str, argument_type: str, selection: str,
+                 prefix: str = 'a', fragments: str = '', extra_arguments: str = '',
+                 extra_variables: Optional[Dict[str, str]] = None):
+        self.operation = operation
+        self.field = field
+        self.argument_name = argument_name
+        self.argument_type = argument_type
+        self.selection = selection
+        self.prefix = prefix
+        self.fragments = fragments
+        self.extra_arguments = extra_arguments
+        self.extra_variables = extra_variables or dict()
+
+    def alias(self, index: int) -> str:
+        return f'{self.prefix}{index}'
+
+    def document(self, count: int) -> str:
+        variables = ', '.join([f'${self.alias(i)}: {self.argument_type}' +
+                               ''.join([f', ${self.alias(i)}_{k}: {v}' for k, v in self.extra_variables.items()])
+                               for i in range(count)])
+        fields = []
+        for i in range(count):
+            arguments = [f'{self.argument_name}: ${self.alias(i)}'] + \
+                        [f'{k}: ${self.alias(i)}_{k}' for k in self.extra_variables] + \
+                        ([self.extra_arguments] if self.extra_arguments else [])
+            fields.append(f'  {self.alias(i)}: {self.field}({", ".join(arguments)}) {self.selection}')
+        fields_document = '\n'.join(fields)
+        return f'{self.operation} ({variables}) {{\n{fields_document}\n}}\n{self.fragments}'
+
+    def variables(self, arguments: list) -> dict:
+        variables = dict()
+        for n, x in enumerate(arguments):
+            if not self.extra_variables:
+                variables[self.alias(n)] = x
+                continue
+            variables[self.alias(n)] = x[self.argument_name]
+            for k in self.extra_variables:
+                variables[f'{self.alias(n)}_{k}'] = x.get(k)
+        return variables
+
+    def split(self, result: dict, keys: list) -> Tuple[dict, Dict[str, list]]:
+        """
+        Split a response into {key: value} and {key: [errors]}
+
+        An error without an alias path belongs to the whole document, it raises GraphQLException
+        """
+        data = result.get('data') or {}
+        values = {key: data.get(self.alias(i)) for i, key in enumerate(keys)}
+
+        aliases = {self.alias(i): key for i, key in enumerate(keys)}
+        errors: Dict[str, list] = dict()
+        for error in result.get('errors', []):
+            path = error.get('path') or []
+            if not path or path[0] not in aliases:
+                raise GraphQLException(result)
+            key = aliases[path[0]]
+            values.pop(key, None)
+            errors.setdefault(key, []).append(error)
+        return values, errors
+
+    def execute(self, request: Callable, keys: list, arguments: list, batch_size: int = 50) \
+            -> Tuple[dict, Dict[str, list]]:
+        """
+        Request the arguments in documents with at most `batch_size` aliases
+
+        :return {key: value} for succeeded keys and {key: [errors]} for failed keys
+        """
+        values: dict = dict()
+        errors: Dict[str, list] = dict()
+        for i in range(0, len(keys), batch_size):
+            chunk_keys: List = keys[i:i + batch_size]
+            chunk_arguments = arguments[i:i + batch_size]
+            try:
+                result = request(self.variables(chunk_arguments), self.document(len(chunk_keys)))
+            except GraphQLException as e:
+                if not e.args or not isinstance(e.args[0], dict):
+                    raise e
+                result = e.args[0]
+            chunk_values, chunk_errors = self.split(result, chunk_keys)
+            values.update(chunk_values)
+            errors.update(chunk_errors)
+        return values, errors
+
+
+def raise_for_partial_errors(values: dict, errors: Dict[str, list]):
+    """
+    Raise PartialResultException(values, {key: [messages]}) when some keys failed
+    """
+    if errors:
+        raise PartialResultException(values, {k: [x.get('message') for x in v] for k, v in errors.items()})
+
+
+def operation_type(query: str) -> str:
+    """
+    The operation type of a GraphQL document: query, mutation or subscription
+    """
+    for line in query.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('{'):
+            return 'query'
+        word = re.split(r'[\s({]', line, 1)[0]
+        if word in ('query', 'mutation', 'subscription'):
+            return word
+    return 'query'
+
+
+def root_fields(query: str) -> List[str]:
+    """
+    The root field names (not aliases) selected by the first operation of a GraphQL document
+    """
+    fields: List[str] = []
+    depth = 0
+    parentheses = 0
+    in_string = False
+    pending_alias = False
+    token = ''
+    i = 0
+
+    def flush(next_char):
+        nonlocal token, pending_alias
+        if token and depth == 1 and parentheses == 0 and not token.startswith('...'):
+            if next_char == ':':
+                pending_alias = True
+            elif pending_alias:
+                pending_alias = False
+                fields.append(token)
+            else:
+                fields.append(token)
+        token = ''
+
+    while i < len(query):
+        c = query[i]
+        if in_string:
+            if c == '\\':
+                i += 1
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == '#':
+            while i < len(query) and query[i] != '\n':
+                i += 1
+        elif c.isalnum() or c in '_.':
+            token += c
+        else:
+            if token:
+                next_char = query[i:].lstrip()[:1]
+                flush(next_char)
+            if c == '(':
+                parentheses += 1
+            elif c == ')':
+                parentheses -= 1
+            elif c == '{' and parentheses == 0:
+                depth += 1
+            elif c == '}' and parentheses == 0:
+                depth -= 1
+                if depth == 0:
+                    break
+        i += 1
+    return fields
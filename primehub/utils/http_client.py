@@ -1,28 +1,148 @@
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from json import JSONDecodeError
-from typing import Iterator, Callable, Optional
+from typing import BinaryIO, Iterable, Iterator, Callable, Optional, List, Tuple
 
 import requests  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
 
 from primehub.utils import ResponseException, RequestException, GraphQLException, create_logger, \
-    ResourceNotFoundException
+    ResourceNotFoundException, PrimeHubException
+from primehub.utils.cache import ResponseCache
+from primehub.utils.download import DEFAULT_CHUNK_SIZE, DEFAULT_PART_SIZE, ProgressCallback, TransferProgress, \
+    content_total, file_hasher, parse_checksum, preallocate, read_validator, response_validator, split_ranges, \
+    verify_file, write_at, write_validator
+from primehub.utils.graphql import operation_type, root_fields
+from primehub.utils.retry import CircuitBreaker, RetryPolicy, TransientHTTPError
 
 logger = create_logger('http')
 
 
+class HttpTransport(object):
+    """
+    HttpTransport keeps a keep-alive connection pool for the PrimeHub endpoints.
+
+    A PrimeHub instance owns one transport and all clients created by it share the pool,
+    so the TCP and TLS handshakes are only paid once for each pooled connection.
+
+    pool_connections: the number of hosts to keep connection pools for
+    pool_maxsize: the maximum number of connections kept for each host
+    pool_block: wait for a free connection instead of opening an extra one when the pool is exhausted
+    circuit_breaker: fail fast after consecutive failures of the endpoint
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, pool_block: bool = False,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                self._session = self._create_session()
+            return self._session
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
 class Client(object):
 
-    def __init__(self, primehub_config):
+    def __init__(self, primehub_config, transport: Optional[HttpTransport] = None,
+                 cache: Optional[ResponseCache] = None):
         self.primehub_config = primehub_config
-        self.timeout = 10
+        self.transport = transport if transport is not None else HttpTransport()
+        self.cache = cache
+        self.timeout = getattr(primehub_config, 'timeout', 10)
+        self.timeouts: dict = getattr(primehub_config, 'timeouts', None) or {}
+        self.retry_policy: RetryPolicy = getattr(primehub_config, 'retry_policy', None) or RetryPolicy()
+
+    @property
+    def session(self) -> requests.Session:
+        return self.transport.session
 
     def request(self, variables: dict, query: str, error_handler: Optional[Callable] = None):
+        if self.cache is None:
+            return self._request(variables, query, error_handler)
+
+        if operation_type(query) == 'mutation':
+            try:
+                return self._request(variables, query, error_handler)
+            finally:
+                self.cache.invalidate(query)
+
+        fields = root_fields(query)
+        if self.cache.ttl_of(fields) <= 0:
+            return self._request(variables, query, error_handler)
+
+        key = self.cache.key(f'{self.primehub_config.endpoint}:{self.primehub_config.api_token}', variables, query)
+        result, is_fresh = self.cache.lookup(key)
+        if result is not None:
+            if not is_fresh:
+                self.cache.revalidate(key, lambda: self._request(variables, query), fields)
+            return result
+
+        result = self._request(variables, query, error_handler)
+        self.cache.store(key, result, fields)
+        return result
+
+    def timeout_for(self, queries: List[str]) -> float:
+        """
+        The timeout of the operations, the longest one of the per-operation timeouts or the default timeout
+        """
+        timeouts = [self.timeouts[x] for q in queries for x in root_fields(q) if x in self.timeouts]
+        return max(timeouts) if timeouts else self.timeout
+
+    def _post(self, queries: List[str], **kwargs) -> str:
+        """
+        POST to the GraphQL endpoint, the transient failures are retried by the retry policy
+        """
+        headers = {'authorization': 'Bearer {}'.format(self.primehub_config.api_token)}
+        timeout = self.timeout_for(queries)
+
+        def post():
+            response = self.session.post(self.primehub_config.endpoint, headers=headers, timeout=timeout, **kwargs)
+            if response.status_code in self.retry_policy.retry_statuses:
+                raise TransientHTTPError(response.status_code, response.text)
+            return response.text
+
+        retryable = all([self.retry_policy.is_retryable(x) for x in queries])
+        return self.retry_policy.call(post, retryable, self.transport.circuit_breaker)
+
+    def _request(self, variables: dict, query: str, error_handler: Optional[Callable] = None):
         request_body = dict(variables=json.dumps(variables), query=query)
         logger.debug('request body: {}'.format(request_body))
-        headers = {'authorization': 'Bearer {}'.format(self.primehub_config.api_token)}
         try:
-            content = requests.post(self.primehub_config.endpoint, data=request_body, headers=headers,
-                                    timeout=self.timeout).text
+            content = self._post([query], data=request_body)
             logger.debug('response: {}'.format(content))
             result = json.loads(content)
             if 'errors' in result:
@@ -36,8 +156,37 @@ class Client(object):
             raise e
         except GraphQLException as e:
             raise e
+        except RequestException as e:
+            raise e
+        except BaseException as e:
+            raise RequestException(e)
+
+    def request_batch(self, operations: List[Tuple[dict, str]]) -> list:
+        """
+        Send the operations as one batched GraphQL request (an array of operations)
+        and return the raw results in the same order
+        """
+        request_body = [dict(variables=variables, query=query) for variables, query in operations]
+        logger.debug('batch request body: {}'.format(request_body))
+        try:
+            content = self._post([query for _, query in operations], json=request_body)
+            logger.debug('batch response: {}'.format(content))
+            results = json.loads(content)
+        except JSONDecodeError:
+            raise ResponseException("Response is not valid JSON:\n{}".format(content))
+        except RequestException as e:
+            raise e
         except BaseException as e:
             raise RequestException(e)
+        finally:
+            if self.cache is not None:
+                for _, query in operations:
+                    if operation_type(query) == 'mutation':
+                        self.cache.invalidate(query)
+
+        if not isinstance(results, list) or len(results) != len(operations):
+            raise ResponseException("Response is not a batched result:\n{}".format(content))
+        return results
 
     def request_logs(self, endpoint, follow, tail) -> Iterator[bytes]:
         params = {'follow': 'false'}
@@ -47,23 +196,387 @@ class Client(object):
             params['tailLines'] = str(tail)
         headers = {'authorization': 'Bearer {}'.format(self.primehub_config.api_token)}
 
-        with requests.get(endpoint, headers=headers, params=params, stream=follow) as response:
+        with self.session.get(endpoint, headers=headers, params=params, stream=follow) as response:
             for chunk in response.iter_content(chunk_size=8192):
                 yield chunk
 
-    def request_file(self, endpoint, dest):
+    def request_file(self, endpoint: str, dest: str, expected_size: Optional[int] = None,
+                     checksum: Optional[str] = None, progress: Optional[ProgressCallback] = None,
+                     resume: bool = True, chunk_size: int = DEFAULT_CHUNK_SIZE, connections: int = 1,
+                     part_size: int = DEFAULT_PART_SIZE):
+        """
+        Download a file in chunks, the memory usage is bounded by `chunk_size`.
+
+        The content is written to `<dest>.part` and renamed to `dest` after it has been verified.
+        A partial file left by an interrupted download is resumed with an HTTP Range request,
+        the transient failures while downloading are resumed by the retry policy as well.
+        The ETag or Last-Modified of the remote file is kept in `<dest>.part.validator` and sent with If-Range,
+        so a changed file is downloaded from the start.
+
+        :type expected_size: int
+        :param expected_size: the expected size in bytes, the size reported by the server is always verified
+
+        :type checksum: str
+        :param checksum: the expected checksum in the form of <algorithm>:<hexdigest>, e.g., sha256:9f86d0...
+
+        :type progress: Callable
+        :param progress: a callback taking a TransferProgress after each chunk
+
+        :type connections: int
+        :param connections: download a large file in byte ranges of `part_size` over the connections concurrently
+        """
+        if connections > 1 and self._request_file_ranges(endpoint, dest, expected_size, checksum, progress,
+                                                         chunk_size, connections, part_size):
+            return
+
         headers = {'authorization': 'Bearer {}'.format(self.primehub_config.api_token)}
-        with requests.get(endpoint, headers=headers) as r:
-            with open(dest, 'wb') as f:
-                f.write(r.content)
-        return
+        part_path = dest + '.part'
+        validator_path = part_path + '.validator'
+        algorithm = parse_checksum(checksum)[0] if checksum else None
+        started = time.time()
+        state: dict = dict(total=None, hasher=None)
+
+        def start_over(status_code: int):
+            os.remove(part_path)
+            write_validator(validator_path, None)
+            raise TransientHTTPError(status_code, 'the remote file has been changed')
+
+        def fetch():
+            offset = os.path.getsize(part_path) if resume and os.path.isfile(part_path) else 0
+            validator = read_validator(validator_path) if offset else None
+            request_headers = dict(headers)
+            if offset:
+                request_headers['Range'] = 'bytes={}-'.format(offset)
+                if validator is not None:
+                    # the server sends the whole file when it has been changed
+                    request_headers['If-Range'] = validator[1]
+
+            with self.session.get(endpoint, headers=request_headers, stream=True, timeout=self.timeout) as r:
+                if r.status_code == 416 and offset:
+                    # the partial file is complete already, otherwise the remote file has been changed
+                    total = content_total(r.headers, offset)
+                    if total == offset:
+                        state.update(total=total, hasher=None)
+                        return
+                    start_over(r.status_code)
+                if r.status_code in self.retry_policy.retry_statuses:
+                    raise TransientHTTPError(r.status_code, r.text)
+                if r.status_code == 404:
+                    raise ResourceNotFoundException('file', endpoint, 'url')
+                if r.status_code >= 400:
+                    raise RequestException('Failed to download [{}]: HTTP {}'.format(endpoint, r.status_code))
+
+                if r.status_code != 206:
+                    # the server ignores the Range header or the file has been changed, start over
+                    offset = 0
+                elif validator is not None and response_validator(r.headers) not in (None, validator):
+                    # the server ignores the If-Range header
+                    start_over(r.status_code)
+                if not offset:
+                    write_validator(validator_path, response_validator(r.headers))
+                total = content_total(r.headers, offset)
+                hasher = file_hasher(part_path, algorithm, offset) if algorithm and offset else None
+                if algorithm and hasher is None:
+                    hasher = file_hasher(os.devnull, algorithm)
+                state.update(total=total, hasher=hasher)
+
+                with open(part_path, 'ab' if offset else 'wb') as fh:
+                    try:
+                        for chunk in r.iter_content(chunk_size=chunk_size):
+                            fh.write(chunk)
+                            if hasher is not None:
+                                hasher.update(chunk)
+                            offset += len(chunk)
+                            if progress:
+                                progress(TransferProgress(dest, offset, total, started))
+                    except requests.exceptions.ChunkedEncodingError as e:
+                        # a broken stream, resume it with the retry policy
+                        raise requests.ConnectionError(e)
+
+        self.retry_policy.call(fetch, True, self.transport.circuit_breaker)
+
+        hasher = state['hasher']
+        verify_file(part_path, state['total'], expected_size, checksum, hasher.hexdigest() if hasher else None)
+        os.replace(part_path, dest)
+        write_validator(validator_path, None)
+
+    def _request_file_ranges(self, endpoint: str, dest: str, expected_size: Optional[int], checksum: Optional[str],
+                             progress: Optional[ProgressCallback], chunk_size: int, connections: int,
+                             part_size: int) -> bool:
+        """
+        Download the byte ranges of a file concurrently and write them into a preallocated `<dest>.part`
+        with positional writes.
+
+        :return False when the file is too small or the server ignores the Range header,
+                the caller should download it in a single stream
+        """
+        headers = {'authorization': 'Bearer {}'.format(self.primehub_config.api_token)}
+        probe_headers = dict(headers, Range='bytes=0-0')
+        with self.session.get(endpoint, headers=probe_headers, stream=True, timeout=self.timeout) as r:
+            total = content_total(r.headers, 0) if r.status_code == 206 else None
+        if total is None or total < 2 * part_size:
+            return False
+
+        part_path = dest + '.part'
+        started = time.time()
+        lock = threading.Lock()
+        transferred = [0]
+
+        def fetch_range(fd: int, start: int, end: int):
+            position = [start]
+
+            def fetch():
+                if position[0] > end:
+                    return
+                range_headers = dict(headers, Range='bytes={}-{}'.format(position[0], end))
+                with self.session.get(endpoint, headers=range_headers, stream=True, timeout=self.timeout) as r:
+                    if r.status_code in self.retry_policy.retry_statuses:
+                        raise TransientHTTPError(r.status_code, r.text)
+                    if r.status_code != 206:
+                        raise RequestException('Failed to download the range {}-{} of [{}]: HTTP {}'.format(
+                            position[0], end, endpoint, r.status_code))
+                    try:
+                        for chunk in r.iter_content(chunk_size=chunk_size):
+                            chunk = chunk[:end + 1 - position[0]]
+                            write_at(fd, chunk, position[0])
+                            position[0] += len(chunk)
+                            with lock:
+                                transferred[0] += len(chunk)
+                                if progress:
+                                    progress(TransferProgress(dest, transferred[0], total, started))
+                    except requests.exceptions.ChunkedEncodingError as e:
+                        raise requests.ConnectionError(e)
+
+            self.retry_policy.call(fetch, True, self.transport.circuit_breaker)
+
+        fd = os.open(part_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            try:
+                preallocate(fd, total)
+                with ThreadPoolExecutor(max_workers=connections, thread_name_prefix='primehub-download') as executor:
+                    futures = [executor.submit(fetch_range, fd, start, end)
+                               for start, end in split_ranges(total, part_size)]
+                    for f in futures:
+                        f.result()
+            finally:
+                os.close(fd)
+        except BaseException:
+            # a preallocated file has the full size, it must not be taken as a partial download to resume
+            os.remove(part_path)
+            raise
+
+        if transferred[0] != total:
+            os.remove(part_path)
+            raise RequestException(
+                'Failed to download [{}]: got {} of {} bytes'.format(endpoint, transferred[0], total))
+        verify_file(part_path, total, expected_size, checksum)
+        os.replace(part_path, dest)
+        return True
+
+    def request_range(self, endpoint: str, start: int, end: int) -> bytes:
+        """
+        Read the bytes from `start` to `end` (inclusive) of a file with an HTTP Range request
+
+        :return the bytes, it is shorter than the range when the range exceeds the end of the file
+        """
+        if end < start:
+            return b''
+        buffer = bytearray(end - start + 1)
+        size = self.request_range_into(endpoint, start, buffer)
+        return bytes(memoryview(buffer)[:size])
+
+    def request_range_into(self, endpoint: str, start: int, buffer) -> int:
+        """
+        Read the bytes of a file from `start` into the writable buffer with an HTTP Range request,
+        the chunks are copied into the buffer without joining them.
+
+        :return the number of bytes read, it is less than the buffer size at the end of the file
+        """
+        view = memoryview(buffer).cast('B')
+        headers = {'authorization': 'Bearer {}'.format(self.primehub_config.api_token)}
+        filled = [0]
+
+        def fetch():
+            if filled[0] >= len(view):
+                return
+            position = start + filled[0]
+            range_headers = dict(headers, Range='bytes={}-{}'.format(position, start + len(view) - 1))
+            with self.session.get(endpoint, headers=range_headers, stream=True, timeout=self.timeout) as r:
+                if r.status_code == 416:
+                    return
+                if r.status_code in self.retry_policy.retry_statuses:
+                    raise TransientHTTPError(r.status_code, r.text)
+                if r.status_code == 404:
+                    raise ResourceNotFoundException('file', endpoint, 'url')
+                if r.status_code >= 400:
+                    raise RequestException('Failed to read the range from {} of [{}]: HTTP {}'.format(
+                        position, endpoint, r.status_code))
+
+                # the server ignores the Range header, skip the bytes before the position
+                skip = 0 if r.status_code == 206 else position
+                try:
+                    for chunk in r.iter_content(chunk_size=DEFAULT_CHUNK_SIZE):
+                        if skip >= len(chunk):
+                            skip -= len(chunk)
+                            continue
+                        size = min(len(chunk) - skip, len(view) - filled[0])
+                        view[filled[0]:filled[0] + size] = chunk[skip:skip + size]
+                        skip = 0
+                        filled[0] += size
+                        if filled[0] >= len(view):
+                            break
+                except requests.exceptions.ChunkedEncodingError as e:
+                    raise requests.ConnectionError(e)
+
+        self.retry_policy.call(fetch, True, self.transport.circuit_breaker)
+        return filled[0]
+
+    def stream_file(self, endpoint: str, out: BinaryIO) -> int:
+        """
+        Write the content of a file to the binary stream as the chunks arrive, a slow reader of the stream
+        slows down the download. A broken download is resumed from the written bytes with an HTTP Range request.
+
+        :return the number of bytes written
+        """
+        headers = {'authorization': 'Bearer {}'.format(self.primehub_config.api_token)}
+        written = [0]
+
+        def fetch():
+            request_headers = dict(headers)
+            if written[0]:
+                request_headers['Range'] = 'bytes={}-'.format(written[0])
+            with self.session.get(endpoint, headers=request_headers, stream=True, timeout=self.timeout) as r:
+                if r.status_code == 416 and written[0]:
+                    return
+                if r.status_code in self.retry_policy.retry_statuses:
+                    raise TransientHTTPError(r.status_code, r.text)
+                if r.status_code == 404:
+                    raise ResourceNotFoundException('file', endpoint, 'url')
+                if r.status_code >= 400:
+                    raise RequestException('Failed to download [{}]: HTTP {}'.format(endpoint, r.status_code))
+
+                # the server ignores the Range header, skip the written bytes
+                skip = written[0] if r.status_code != 206 else 0
+                try:
+                    for chunk in r.iter_content(chunk_size=DEFAULT_CHUNK_SIZE):
+                        if skip >= len(chunk):
+                            skip -= len(chunk)
+                            continue
+                        out.write(chunk[skip:])
+                        written[0] += len(chunk) - skip
+                        skip = 0
+                except requests.exceptions.ChunkedEncodingError as e:
+                    raise requests.ConnectionError(e)
+
+        self.retry_policy.call(fetch, True, self.transport.circuit_breaker)
+        return written[0]
+
+    def upload_stream(self, endpoint: str, chunks: Iterable[bytes]):
+        """
+        Upload the chunks in a request with the chunked transfer encoding, the size is not known in advance
+        """
+        headers = {'authorization': 'Bearer {}'.format(self.primehub_config.api_token)}
+        r = self.session.post(endpoint, headers=headers, data=chunks)
+        if r.status_code >= 400:
+            raise RequestException('Failed to upload [{}]: HTTP {}'.format(endpoint, r.status_code))
+        return r.json()
 
     def upload_file(self, endpoint, src):
         headers = {'authorization': 'Bearer {}'.format(self.primehub_config.api_token)}
         with open(src, 'rb') as f:
-            r = requests.post(endpoint, headers=headers, data=f)
+            r = self.session.post(endpoint, headers=headers, data=f)
         return r.json()
 
 
+class BatchResult(object):
+    """
+    The pending result of an operation in a GraphQLBatch, it is resolved after the batch executed
+    """
+
+    def __init__(self, variables: dict, query: str, error_handler: Optional[Callable] = None):
+        self.variables = variables
+        self.query = query
+        self.error_handler = error_handler
+        self._done = False
+        self._result: Optional[dict] = None
+        self._exception: Optional[BaseException] = None
+
+    def done(self) -> bool:
+        return self._done
+
+    def result(self):
+        if not self._done:
+            raise PrimeHubException('The batch has not been executed')
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self) -> Optional[BaseException]:
+        return self._exception
+
+    def resolve(self, result: dict):
+        try:
+            if 'errors' in result:
+                if self.error_handler:
+                    self.error_handler(result)
+                raise GraphQLException(result)
+            self._result = result
+        except BaseException as e:
+            self._exception = e
+        self._done = True
+
+    def fail(self, exception: BaseException):
+        self._exception = exception
+        self._done = True
+
+
+class GraphQLBatch(object):
+    """
+    GraphQLBatch collects GraphQL operations and ships them in batched HTTP requests.
+
+    with primehub.batch() as batch:
+        a = batch.request({'where': {'id': 'job-a'}}, query)
+        b = batch.request({'where': {'id': 'job-b'}}, query)
+    a.result(), b.result()
+
+    Operations are sent when leaving the `with` block or calling `execute()`,
+    at most `max_size` operations go into one HTTP request.
+
+    The scope is explicit: only the operations requested by `request` are collected,
+    Client.request is synchronous and is not deferred inside the scope.
+    """
+
+    def __init__(self, client_factory: Callable[[], Client], max_size: int = 50):
+        self.client_factory = client_factory
+        self.max_size = max_size
+        self.pending: List[BatchResult] = []
+
+    def request(self, variables: dict, query: str, error_handler: Optional[Callable] = None) -> BatchResult:
+        pending = BatchResult(variables, query, error_handler)
+        self.pending.append(pending)
+        return pending
+
+    def execute(self) -> List[BatchResult]:
+        executed, self.pending = self.pending, []
+        for i in range(0, len(executed), self.max_size):
+            chunk = executed[i:i + self.max_size]
+            try:
+                results = self.client_factory().request_batch([(x.variables, x.query) for x in chunk])
+            except BaseException as e:
+                for x in chunk:
+                    x.fail(e)
+                continue
+            for pending, result in zip(chunk, results):
+                pending.resolve(result)
+        return executed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.execute()
+
+
 if __name__ == '__main__':
     print(Client.__module__)
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import IO, Iterator, Optional, Set, Tuple
+
+# the journal of a download is kept in the destination directory
+DOWNLOAD_JOURNAL_NAME = '.primehub-journal'
+
+# the journals of uploads are kept locally since the destination is remote
+UPLOAD_JOURNAL_DIR = os.path.join('~', '.primehub', 'journals')
+
+FSYNC_INTERVAL = 100
+
+
+def upload_journal_path(scope: str, src: str, dst: str) -> str:
+    key = hashlib.sha1(json.dumps([scope, os.path.abspath(src), dst]).encode()).hexdigest()
+    return os.path.join(os.path.expanduser(UPLOAD_JOURNAL_DIR), f'upload-{key}.jsonl')
+
+
+class TransferJournal(object):
+    """
+    TransferJournal is an append-only record of a recursive transfer, a JSON object per line:
+
+    {"type": "plan", "src": "...", "dst": "..."}   a file to transfer
+    {"type": "planned"}                            all files have been planned
+    {"type": "done", "src": "...", "dst": "..."}   a file has been transferred
+
+    A resumed transfer replays the planned files which are not done. When the planning was interrupted,
+    the files are listed again and the done ones are skipped. The journal is removed after all files are done.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[Tuple[str, str]] = set()
+        self.planned = False
+        self._fh: Optional[IO] = None
+        self._lock = threading.Lock()
+        self._unsynced = 0
+
+    def open(self, resume: bool = False) -> 'TransferJournal':
+        """
+        Open the journal to append, the previous records are loaded when `resume`, otherwise they are discarded
+        """
+        self.done = set()
+        self.planned = False
+        if resume:
+            for record in self._records():
+                if record.get('type') == 'done':
+                    self.done.add((record['src'], record['dst']))
+                elif record.get('type') == 'planned':
+                    self.planned = True
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if self.planned:
+            self._fh = open(self.path, 'a')
+            if self._fh.tell() > 0 and not self._ends_with_newline():
+                # terminate a torn line, otherwise it corrupts the next record
+                self._fh.write('\n')
+            return self
+
+        # the files will be planned again, keep only the done records to avoid duplicated plans
+        self._fh = open(self.path, 'w')
+        for src, dst in sorted(self.done):
+            self._fh.write(json.dumps(dict(type='done', src=src, dst=dst)) + '\n')
+        return self
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as fh:
+            fh.seek(-1, os.SEEK_END)
+            return fh.read(1) == b'\n'
+
+    def is_done(self, src: str, dst: str) -> bool:
+        return (src, dst) in self.done
+
+    def pending(self) -> Iterator[Tuple[str, str]]:
+        """
+        The planned files which are not done, they are read from the journal lazily
+        """
+        for record in self._records():
+            if record.get('type') == 'plan' and not self.is_done(record['src'], record['dst']):
+                yield record['src'], record['dst']
+
+    def plan(self, src: str, dst: str):
+        self._append(dict(type='plan', src=src, dst=dst))
+
+    def finish_plan(self):
+        self._append(dict(type='planned'))
+
+    def finish(self, src: str, dst: str):
+        self._append(dict(type='done', src=src, dst=dst, time=time.time()))
+
+    def close(self, completed: bool = False):
+        """
+        Close the journal, it is removed when the transfer has completed
+        """
+        with self._lock:
+            if self._fh is not None:
+                self._sync()
+                self._fh.close()
+                self._fh = None
+        if completed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _append(self, record: dict):
+        with self._lock:
+            if self._fh is None:
+                return
+            self._fh.write(json.dumps(record) + '\n')
+            # flushed lines survive a killed process, fsync them periodically to survive a crashed node
+            self._fh.flush()
+            self._unsynced += 1
+            if self._unsynced >= FSYNC_INTERVAL:
+                self._sync()
+
+    def _sync(self):
+        if self._fh is not None:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+        self._unsynced = 0
+
+    def _records(self) -> Iterator[dict]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as fh:
+            for line in fh:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # a torn line written by an interrupted process
+                    continue
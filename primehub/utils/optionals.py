@@ -13,3 +13,8 @@ def file_flag(parser: ArgumentParser, name: str):
     if name != 'file':
         raise ValueError(f'name should be file, but it is {name}')
     parser.add_argument("--file", "-f", dest='file')
+
+
+def size_flag(parser: ArgumentParser, name: str):
+    from primehub.utils.shards import parse_size
+    parser.add_argument("--" + name, type=parse_size)
@@ -0,0 +1,69 @@
+import random
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+DEFAULT_PREFETCH = 4
+
+
+def shard(items: Iterable[T], rank: int = 0, world_size: int = 1) -> Iterator[T]:
+    """
+    The deterministic share of a worker from a stream in a stable order, the i-th item goes to the worker
+    of rank i % world_size, so no item is shared by two workers.
+    """
+    if world_size < 1 or not 0 <= rank < world_size:
+        raise ValueError(f'invalid rank {rank} of world size {world_size}')
+    return islice(items, rank, None, world_size)
+
+
+def prefetched(items: Iterable[T], func: Callable[[T], R], depth: int = DEFAULT_PREFETCH) \
+        -> Iterator[Tuple[T, R]]:
+    """
+    Yield (item, func(item)) in order while the next `depth` items are computed on a thread pool.
+    The pending work is cancelled when the generator is closed.
+    """
+    if depth <= 0:
+        for item in items:
+            yield item, func(item)
+        return
+
+    pending: Deque[Tuple[T, Future]] = deque()
+    iterator = iter(items)
+    with ThreadPoolExecutor(max_workers=depth, thread_name_prefix='primehub-prefetch') as executor:
+        try:
+            for item in iterator:
+                pending.append((item, executor.submit(func, item)))
+                if len(pending) > depth:
+                    head, future = pending.popleft()
+                    yield head, future.result()
+            while pending:
+                head, future = pending.popleft()
+                yield head, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def shuffled(items: Iterable[T], buffer_size: int, seed: Optional[int] = None) -> Iterator[T]:
+    """
+    Shuffle a stream with a buffer of `buffer_size` items, each item is swapped with a random one in the buffer
+    """
+    if buffer_size <= 1:
+        yield from items
+        return
+
+    rng = random.Random(seed)
+    buffer: List[Any] = []
+    for item in items:
+        if len(buffer) < buffer_size:
+            buffer.append(item)
+            continue
+        index = rng.randrange(buffer_size)
+        yield buffer[index]
+        buffer[index] = item
+    rng.shuffle(buffer)
+    yield from buffer
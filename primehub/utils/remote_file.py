@@ -0,0 +1,187 @@
+import io
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+
+from primehub.utils import RequestException
+from primehub.utils.download import DEFAULT_CHUNK_SIZE
+
+# the bytes read ahead by a buffered reader, a read larger than it goes into the caller's buffer directly
+DEFAULT_READAHEAD = 1024 * 1024
+
+# the number of chunks waiting to be uploaded, a writer blocks when the upload falls behind
+WRITE_QUEUE_SIZE = 4
+
+_ABORT = object()
+
+
+class RangeReader(io.RawIOBase):
+    """
+    A seekable raw reader of a remote file, each read is an HTTP Range request into the caller's buffer.
+
+    It is wrapped by io.BufferedReader, whose buffer size is the readahead window.
+    """
+
+    def __init__(self, name: str, size: int, read_into: Callable[[int, memoryview], int]):
+        """
+        :type name: str
+        :param name: The path of the remote file
+
+        :type size: int
+        :param size: The size of the remote file
+
+        :type read_into: Callable
+        :param read_into: A function taking the position and the buffer, it returns the number of bytes read
+        """
+        super(RangeReader, self).__init__()
+        self.name = name
+        self.size = size
+        self._read_into = read_into
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f'invalid whence ({whence})')
+        if position < 0:
+            raise ValueError(f'negative seek position {position}')
+        self._position = position
+        return position
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast('B')
+        size = min(len(view), self.size - self._position)
+        if size <= 0:
+            return 0
+        read = self._read_into(self._position, view[:size])
+        self._position += read
+        return read
+
+
+class StreamWriter(io.RawIOBase):
+    """
+    A raw writer of a remote file, the written chunks are piped into an upload request in a background thread,
+    so nothing is written to a temporary file. The upload completes when the writer is closed.
+    """
+
+    def __init__(self, name: str, upload: Callable[[Iterable[bytes]], dict]):
+        """
+        :type name: str
+        :param name: The path of the remote file
+
+        :type upload: Callable
+        :param upload: A function uploading the chunks of an iterable, it returns the response
+        """
+        super(StreamWriter, self).__init__()
+        self.name = name
+        self.response: Optional[dict] = None
+        self._upload = upload
+        self._queue: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        self._aborted = False
+
+    def writable(self) -> bool:
+        return True
+
+    def _chunks(self) -> Iterator[bytes]:
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            if chunk is _ABORT:
+                raise RequestException(f'The upload of {self.name} was aborted')
+            yield chunk
+
+    def _run(self):
+        try:
+            self.response = self._upload(self._chunks())
+        except BaseException as e:
+            self._error = e
+
+    def _put(self, item):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='primehub-upload', daemon=True)
+            self._thread.start()
+        while True:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    # the upload stopped before consuming all chunks
+                    self._raise_for_error()
+                    raise RequestException(f'The upload of {self.name} has stopped')
+
+    def _raise_for_error(self):
+        if self._error is not None:
+            raise self._error
+        if self.response is not None and self.response.get('success', True) is False:
+            raise RequestException(f'Failed to upload {self.name}: {self.response}')
+
+    def write(self, buffer) -> int:
+        if self.closed:
+            raise ValueError('write to closed file')
+        data = bytes(buffer)
+        if data:
+            self._put(data)
+        return len(data)
+
+    def abort(self):
+        """
+        Abort the upload, the remote file is not written
+        """
+        if self.closed or self._aborted:
+            return
+        self._aborted = True
+        if self._thread is not None:
+            self._put(_ABORT)
+            self._thread.join()
+        super(StreamWriter, self).close()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if not self._aborted:
+                # an empty file is uploaded as well
+                self._put(None)
+                self._thread.join()  # type: ignore
+                self._raise_for_error()
+        finally:
+            super(StreamWriter, self).close()
+
+
+class BufferedStreamWriter(io.BufferedWriter):
+    """
+    A buffered writer of a StreamWriter, the upload is aborted when leaving the `with` block by an exception
+    """
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.raw.abort()
+        return super(BufferedStreamWriter, self).__exit__(exc_type, exc_val, exc_tb)
+
+
+def open_reader(name: str, size: int, read_into: Callable[[int, memoryview], int],
+                readahead: int = DEFAULT_READAHEAD) -> io.BufferedReader:
+    return io.BufferedReader(RangeReader(name, size, read_into), buffer_size=max(readahead, 1))
+
+
+def open_writer(name: str, upload: Callable[[Iterable[bytes]], dict],
+                buffer_size: int = DEFAULT_CHUNK_SIZE) -> BufferedStreamWriter:
+    return BufferedStreamWriter(StreamWriter(name, upload), buffer_size=buffer_size)
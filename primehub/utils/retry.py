@@ -0,0 +1,156 @@
+import random
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+import requests  # type: ignore
+
+from primehub.utils import CircuitBreakerOpenException, create_logger
+from primehub.utils.graphql import operation_type, root_fields
+
+logger = create_logger('retry')
+
+
+class TransientHTTPError(Exception):
+    """
+    A response with a status code worth retrying, e.g., 502 Bad Gateway
+    """
+
+    def __init__(self, status_code: int, content: str):
+        super(TransientHTTPError, self).__init__(f'HTTP {status_code}: {content[:200]}')
+        self.status_code = status_code
+
+
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, TransientHTTPError)
+
+
+class CircuitBreaker(object):
+    """
+    CircuitBreaker fails fast after `failure_threshold` consecutive failed requests,
+    a request retried by the RetryPolicy is counted once.
+
+    When it is open, requests are rejected until `reset_timeout` seconds passed,
+    then only one trial request is allowed (half-open). A success closes the circuit again,
+    a failure opens it for another `reset_timeout` seconds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def before_request(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return
+            if state == 'half-open' and not self.probing:
+                # this request is the trial
+                self.probing = True
+                return
+        raise CircuitBreakerOpenException(
+            f'The circuit is open after {self.failures} consecutive failures, '
+            f'retry after {self.reset_timeout} seconds')
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or (self.failure_threshold and self.failures >= self.failure_threshold):
+                self.opened_at = time.time()
+            self.probing = False
+
+    def record_aborted(self):
+        """
+        A request ended with an error which is not a transient failure, it is not counted and
+        another trial is allowed
+        """
+        with self._lock:
+            self.probing = False
+
+
+class RetryPolicy(object):
+    """
+    RetryPolicy retries the transient failures (connection errors, timeouts and the `retry_statuses`)
+    with exponential backoff and full jitter, until `max_attempts` or the overall `deadline` in seconds.
+
+    Queries are always retryable. A mutation is only retried when all its root fields are in `safe_mutations`,
+    e.g., RetryPolicy(safe_mutations=['deleteFiles']).
+    """
+
+    def __init__(self, max_attempts: int = 4, backoff: float = 0.5, max_backoff: float = 8, deadline: float = 60,
+                 jitter: bool = True, retry_statuses: Iterable[int] = (429, 502, 503, 504),
+                 safe_mutations: Iterable[str] = ()):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.jitter = jitter
+        self.retry_statuses = set(retry_statuses)
+        self.safe_mutations = set(safe_mutations)
+
+    def is_retryable(self, query: str) -> bool:
+        if operation_type(query) != 'mutation':
+            return True
+        fields = root_fields(query)
+        return bool(fields) and all([x in self.safe_mutations for x in fields])
+
+    def delay(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff * (2 ** (attempt - 1)))
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
+
+    def call(self, func: Callable, retryable: bool, breaker: Optional[CircuitBreaker] = None):
+        """
+        Call the function and retry it on the transient errors, the breaker records the outcome of the call
+        """
+        if breaker is not None:
+            breaker.before_request()
+        try:
+            result = self._attempts(func, retryable)
+        except TRANSIENT_ERRORS:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.record_aborted()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+    def _attempts(self, func: Callable, retryable: bool):
+        deadline = time.time() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return func()
+            except TRANSIENT_ERRORS as e:
+                delay = self.delay(attempt)
+                if not retryable or attempt >= self.max_attempts or time.time() + delay > deadline:
+                    raise
+                logger.debug('retry in %.2f seconds (attempt %d): %s', delay, attempt, e)
+                time.sleep(delay)
@@ -0,0 +1,143 @@
+import json
+import re
+import tarfile
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+SHARD_MANIFEST_NAME = 'shards.jsonl'
+SHARD_NAME_FORMAT = 'shard-{:06d}.tar'
+SHARD_READAHEAD = 8 * 1024 * 1024
+
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# (local path, name in the shard, size)
+ShardMember = Tuple[str, str, int]
+
+
+def parse_size(value: Union[int, str]) -> int:
+    """
+    Parse a size in bytes with an optional binary unit, e.g., 1048576, '512K', '256MB' or '1GiB'
+    """
+    if isinstance(value, int):
+        return value
+    matched = re.fullmatch(r'\s*(\d+)\s*([KMGT]?)(?:I?B)?\s*', str(value).upper())
+    if not matched:
+        raise ValueError(f'invalid size: {value}')
+    return int(matched.group(1)) * SIZE_UNITS[matched.group(2)]
+
+
+def sample_key(name: str) -> str:
+    """
+    The key of the WebDataset sample of a member, the files of a sample share the path without extensions,
+    e.g., 'train/0001.jpg' and 'train/0001.cls' are the sample 'train/0001'
+    """
+    slash = name.rfind('/') + 1
+    dot = name.find('.', slash + 1)
+    return name if dot < 0 else name[:dot]
+
+
+def plan_shards(members: Iterable[ShardMember], shard_size: int) -> List[List[ShardMember]]:
+    """
+    Group the members sorted by name into shards of about `shard_size` bytes, a sample is never split
+    into two shards, so a shard could be larger than `shard_size` by the last sample.
+    """
+    shards: List[List[ShardMember]] = []
+    current: List[ShardMember] = []
+    size = 0
+    for member in sorted(members, key=lambda x: x[1]):
+        if current and size >= shard_size and sample_key(member[1]) != sample_key(current[-1][1]):
+            shards.append(current)
+            current, size = [], 0
+        current.append(member)
+        # the header and the padding of a tar entry
+        size += 512 + (member[2] + 511) // 512 * 512
+    if current:
+        shards.append(current)
+    return shards
+
+
+def write_shard(fileobj: IO[bytes], members: List[ShardMember]) -> List[dict]:
+    """
+    Write the members into a tar stream, the file object is written sequentially without seeking
+
+    :return the index of the members [{name, offset, size}], the offset is of the content in the tar
+    """
+    index = []
+    with tarfile.open(fileobj=fileobj, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+        for local_path, name, _ in members:
+            info = tar.gettarinfo(local_path, arcname=name)
+            with open(local_path, 'rb') as fh:
+                tar.addfile(info, fh)
+            padded = (info.size + 511) // 512 * 512
+            index.append(dict(name=name, offset=tar.offset - padded, size=info.size))
+    return index
+
+
+def iter_tar(fileobj: IO[bytes]) -> Iterator[Tuple[str, bytes]]:
+    """
+    Read the regular files of a tar stream sequentially
+    """
+    with tarfile.open(fileobj=fileobj, mode='r|') as tar:
+        for info in tar:
+            if not info.isfile():
+                continue
+            fh = tar.extractfile(info)
+            if fh is not None:
+                yield info.name, fh.read()
+
+
+class ShardReader(object):
+    """
+    ShardReader reads the tar shards written by the sharded upload
+
+    The shards are fetched one by one with sequential reads when iterating the members,
+    a single member is read with an HTTP Range request by the offset in the manifest.
+
+    reader = primehub.files.open_shards('/datasets/mnist/train')
+    for name, content in reader:
+        ...
+    label = reader.read('train/0001.cls')
+    """
+
+    def __init__(self, manifest: List[dict], open_file: Callable[[str], IO[bytes]],
+                 read_range: Callable[[str, int, int], bytes]):
+        """
+        :type manifest: list
+        :param manifest: The shards [{name, size, members: [{name, offset, size}]}]
+
+        :type open_file: Callable
+        :param open_file: A function opening a shard by name for sequential reads
+
+        :type read_range: Callable
+        :param read_range: A function reading the bytes [start, end) of a shard by name
+        """
+        self.shards = manifest
+        self._open_file = open_file
+        self._read_range = read_range
+        self._index: Optional[Dict[str, Tuple[str, int, int]]] = None
+
+    @staticmethod
+    def parse_manifest(content: bytes) -> List[dict]:
+        return [json.loads(x) for x in content.decode('utf-8').splitlines() if x.strip()]
+
+    def members(self) -> Iterator[dict]:
+        """
+        :return the members with the shard names [{name, offset, size, shard}]
+        """
+        for shard in self.shards:
+            for member in shard['members']:
+                yield dict(member, shard=shard['name'])
+
+    def __iter__(self) -> Iterator[Tuple[str, bytes]]:
+        for shard in self.shards:
+            with self._open_file(shard['name']) as fh:
+                yield from iter_tar(fh)
+
+    def read(self, name: str) -> bytes:
+        if self._index is None:
+            self._index = {x['name']: (x['shard'], x['offset'], x['size']) for x in self.members()}
+        if name not in self._index:
+            raise KeyError(name)
+        shard, offset, size = self._index[name]
+        if size == 0:
+            return b''
+        return self._read_range(shard, offset, offset + size)
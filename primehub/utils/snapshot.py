@@ -0,0 +1,83 @@
+import gzip
+import json
+import os
+from typing import Iterable, Iterator, Optional, Tuple
+
+from primehub.utils.sync import MTIME_TOLERANCE, FileMeta
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = '.snapshot.gz'
+
+ADDED = 'added'
+REMOVED = 'removed'
+MODIFIED = 'modified'
+
+Entry = Tuple[str, FileMeta]
+
+
+def write_snapshot(path: str, header: dict, entries: Iterable[Entry]) -> int:
+    """
+    Write a snapshot, a gzip-compressed JSON Lines file of a header and [name, size, mtime] sorted by name
+
+    :return the number of the entries
+    """
+    count = 0
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with gzip.open(temp_path, 'wt', encoding='utf-8') as fh:
+        fh.write(json.dumps(dict(header, version=SNAPSHOT_VERSION)) + '\n')
+        for name, meta in sorted(entries, key=lambda x: x[0]):
+            fh.write(json.dumps([name, meta.size, meta.mtime]) + '\n')
+            count += 1
+    os.replace(temp_path, path)
+    return count
+
+
+def read_snapshot_header(path: str) -> dict:
+    with gzip.open(path, 'rt', encoding='utf-8') as fh:
+        return json.loads(fh.readline())
+
+
+def read_snapshot(path: str) -> Iterator[Entry]:
+    """
+    Read the entries of a snapshot lazily in the order of names
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as fh:
+        header = json.loads(fh.readline())
+        if header.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f'unsupported snapshot version: {header.get("version")}')
+        for line in fh:
+            name, size, mtime = json.loads(line)
+            yield name, FileMeta(size, mtime)
+
+
+def is_modified(base: FileMeta, target: FileMeta) -> bool:
+    """
+    A file is modified when its size is changed or the target is newer than the base
+    """
+    if base.size != target.size:
+        return True
+    if base.mtime is None or target.mtime is None:
+        return False
+    return target.mtime - base.mtime > MTIME_TOLERANCE
+
+
+def diff_entries(base: Iterable[Entry], target: Iterable[Entry]) -> Iterator[Tuple[str, str]]:
+    """
+    Merge-join two streams of entries sorted by name in one pass
+
+    :return (name, 'added' | 'removed' | 'modified') in the order of names
+    """
+    base_iter, target_iter = iter(base), iter(target)
+    b: Optional[Entry] = next(base_iter, None)
+    t: Optional[Entry] = next(target_iter, None)
+    while b is not None or t is not None:
+        if t is None or (b is not None and b[0] < t[0]):
+            yield b[0], REMOVED  # type: ignore
+            b = next(base_iter, None)
+        elif b is None or t[0] < b[0]:
+            yield t[0], ADDED
+            t = next(target_iter, None)
+        else:
+            if is_modified(b[1], t[1]):
+                yield t[0], MODIFIED
+            b, t = next(base_iter, None), next(target_iter, None)
@@ -0,0 +1,101 @@
+import calendar
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from primehub.utils.walker import walk_files
+
+# the precision of the modification times compared by sync, some file systems keep only seconds
+MTIME_TOLERANCE = 1.0
+
+PHFS_SCHEME = 'phfs://'
+
+
+class FileMeta(object):
+    """
+    The size and the modification time (seconds since epoch) of a file to sync
+    """
+
+    def __init__(self, size: Optional[int], mtime: Optional[float]):
+        self.size = size
+        self.mtime = mtime
+
+    def __repr__(self):
+        return f'<FileMeta size={self.size} mtime={self.mtime}>'
+
+
+class SyncPlan(object):
+    """
+    The files to transfer and to delete, the paths are relative to the synced directories
+    """
+
+    def __init__(self):
+        self.transfers: List[Tuple[str, str]] = []
+        self.deletes: List[str] = []
+        self.unchanged = 0
+
+    def to_dict(self) -> dict:
+        return dict(transfers=[dict(path=p, reason=r) for p, r in self.transfers], deletes=list(self.deletes),
+                    unchanged=self.unchanged)
+
+
+def is_phfs_uri(path: str) -> bool:
+    return path.startswith(PHFS_SCHEME)
+
+
+def parse_last_modified(value) -> Optional[float]:
+    """
+    Parse the lastModified of a PHFS item, an ISO 8601 time in UTC or milliseconds since epoch
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        number = float(value)
+        # milliseconds since epoch
+        return number / 1000 if number > 1e11 else number
+
+    for fmt in ('%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ'):
+        try:
+            return calendar.timegm(time.strptime(value, fmt))
+        except ValueError:
+            continue
+    return None
+
+
+def local_files(root: str) -> Iterator[Tuple[str, FileMeta]]:
+    """
+    The files under a local directory, the paths are relative to the directory with '/' as the separator
+    """
+    for path, relative, st in walk_files(root):
+        yield relative, FileMeta(st.st_size, st.st_mtime)
+
+
+def plan_sync(source: Dict[str, FileMeta], target: Dict[str, FileMeta], delete: bool = False,
+              same_content: Optional[Callable[[str], bool]] = None) -> SyncPlan:
+    """
+    Plan a one-way sync from the source to the target.
+
+    A file is transferred when it is missing in the target, its size is different or the source is newer.
+    When `same_content` is given, files of the same size are compared by their content instead of their times.
+    With `delete`, the files only in the target are deleted.
+    """
+    plan = SyncPlan()
+    for path in sorted(source.keys()):
+        src = source[path]
+        dst = target.get(path)
+        if dst is None:
+            plan.transfers.append((path, 'missing'))
+        elif src.size != dst.size:
+            plan.transfers.append((path, 'size'))
+        elif same_content is not None:
+            if same_content(path):
+                plan.unchanged += 1
+            else:
+                plan.transfers.append((path, 'checksum'))
+        elif src.mtime is not None and (dst.mtime is None or src.mtime > dst.mtime + MTIME_TOLERANCE):
+            plan.transfers.append((path, 'newer'))
+        else:
+            plan.unchanged += 1
+
+    if delete:
+        plan.deletes = sorted([x for x in target.keys() if x not in source])
+    return plan
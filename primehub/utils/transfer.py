@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from primehub.utils import PrimeHubException, ResourceNotFoundException, SharedFileException, create_logger
+
+logger = create_logger('transfer')
+
+# the errors which are not worth retrying
+PERMANENT_ERRORS = (ResourceNotFoundException, SharedFileException)
+
+
+class TransferTask(object):
+    """
+    A file to transfer from `src` to `dst`, the transfer function could set the `size` in bytes
+    """
+
+    def __init__(self, src: str, dst: str, size: Optional[int] = None):
+        self.src = src
+        self.dst = dst
+        self.size = size
+
+    def __repr__(self):
+        return f'<TransferTask {self.src} -> {self.dst}>'
+
+
+class TransferReport(object):
+    """
+    The aggregated result of the transfers
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.failures: List[Tuple[TransferTask, BaseException]] = []
+        self.results: Dict[int, Any] = dict()
+        self.started = time.time()
+        self.finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def rate(self) -> float:
+        """
+        The throughput in bytes per second
+        """
+        if self.elapsed <= 0:
+            return 0
+        return self.bytes / self.elapsed
+
+    def ordered_results(self) -> list:
+        return [self.results[x] for x in sorted(self.results.keys())]
+
+    def to_dict(self) -> dict:
+        return dict(files=self.files, bytes=self.bytes, elapsed=round(self.elapsed, 3), rate=round(self.rate),
+                    failures=[dict(src=t.src, dst=t.dst, message=str(e)) for t, e in self.failures])
+
+
+class TransferManager(object):
+    """
+    TransferManager transfers files with a bounded worker pool.
+
+    The tasks are consumed from an iterable through a bounded work queue, so a large listing is never
+    materialized in memory. The failures are collected in the report instead of stopping the other transfers.
+
+    The requests of the client are retried by its RetryPolicy, so a task is attempted once by default,
+    `max_attempts` retries the functions which do not retry on their own. An unexpected error of a worker,
+    e.g., from the progress callback, is recorded and stops the remaining transfers.
+
+    with parallel=1, the tasks are transferred in the calling thread one by one.
+    """
+
+    def __init__(self, parallel: int = 1, max_attempts: int = 1, backoff: float = 0.5,
+                 progress: Optional[Callable[[TransferReport], None]] = None):
+        self.parallel = max(1, parallel or 1)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.progress = progress
+
+    def run(self, tasks: Iterable[TransferTask], func: Callable[[TransferTask], Any],
+            keep_results: bool = False) -> TransferReport:
+        """
+        Call the transfer function for each task
+
+        :type keep_results: bool
+        :param keep_results: keep the return values of the function in the report
+        """
+        report = TransferReport()
+        lock = threading.Lock()
+
+        def transfer(index: int, task: TransferTask):
+            outcome = self._transfer(task, func)
+            with lock:
+                if isinstance(outcome, BaseException):
+                    report.failures.append((task, outcome))
+                else:
+                    report.files += 1
+                    report.bytes += task.size or 0
+                if keep_results:
+                    report.results[index] = outcome
+                if self.progress:
+                    self.progress(report)
+
+        if self.parallel == 1:
+            for index, task in enumerate(tasks):
+                transfer(index, task)
+            report.finished = time.time()
+            return report
+
+        work_queue: queue.Queue = queue.Queue(maxsize=self.parallel * 2)
+        stop = threading.Event()
+
+        def worker():
+            while True:
+                item = work_queue.get()
+                try:
+                    if item is None:
+                        return
+                    if not stop.is_set():
+                        transfer(*item)
+                except BaseException as e:
+                    logger.debug('stop the transfers after %s failed: %s', item[1], e)
+                    stop.set()
+                    with lock:
+                        report.failures.append((item[1], e))
+                finally:
+                    work_queue.task_done()
+
+        workers = [threading.Thread(target=worker, name=f'primehub-transfer-{x}', daemon=True)
+                   for x in range(self.parallel)]
+        for w in workers:
+            w.start()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    work_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            for index, task in enumerate(tasks):
+                if not put((index, task)):
+                    break
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            for _ in workers:
+                work_queue.put(None)
+            for w in workers:
+                w.join()
+
+        report.finished = time.time()
+        return report
+
+    def _transfer(self, task: TransferTask, func: Callable[[TransferTask], Any]) -> Any:
+        """
+        :return the result of the function or the last error
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return func(task)
+            except (Exception, PrimeHubException) as e:
+                if isinstance(e, PERMANENT_ERRORS) or attempt >= self.max_attempts:
+                    logger.debug('failed to transfer %s: %s', task, e)
+                    return e
+                logger.debug('retry %s (attempt %d): %s', task, attempt, e)
+                time.sleep(self.backoff * attempt)
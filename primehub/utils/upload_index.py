@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from primehub.utils.download import file_hasher
+
+DEFAULT_INDEX_PATH = os.path.join('~', '.primehub', 'upload-index.db')
+HASH_ALGORITHM = 'sha256'
+
+
+def hash_file(path: str) -> str:
+    """
+    The hexdigest of a file, it is a module-level function to be pickled to the hashing processes
+    """
+    return file_hasher(path, HASH_ALGORITHM).hexdigest()
+
+
+class UploadIndex(object):
+    """
+    UploadIndex records the content hash, size and mtime of the last successful upload for each PHFS path.
+
+    The entries are scoped by the endpoint and the group, an upload of an unchanged file could be skipped:
+
+    * the size and mtime are unchanged: skip without hashing
+    * otherwise the file is hashed in a process pool, skip when the hash is unchanged
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, hash_workers: Optional[int] = None):
+        self.path = os.path.expanduser(path)
+        self.hash_workers = hash_workers
+        self._connection: Optional[sqlite3.Connection] = None
+        self._executor: Optional[Executor] = None
+        self._lock = threading.RLock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._connection is None:
+                os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+                self._connection = sqlite3.connect(self.path, check_same_thread=False)
+                self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS uploads (
+                  scope TEXT NOT NULL,
+                  path TEXT NOT NULL,
+                  digest TEXT NOT NULL,
+                  size INTEGER NOT NULL,
+                  mtime REAL NOT NULL,
+                  PRIMARY KEY (scope, path)
+                )
+                """)
+                self._connection.commit()
+            return self._connection
+
+    def lookup(self, scope: str, path: str) -> Optional[Tuple[str, int, float]]:
+        """
+        :return (digest, size, mtime) of the last upload or None
+        """
+        with self._lock:
+            row = self.connection.execute('SELECT digest, size, mtime FROM uploads WHERE scope = ? AND path = ?',
+                                          (scope, path)).fetchone()
+        return tuple(row) if row else None  # type: ignore
+
+    def record(self, scope: str, path: str, digest: str, size: int, mtime: float):
+        with self._lock:
+            self.connection.execute('INSERT OR REPLACE INTO uploads (scope, path, digest, size, mtime) '
+                                    'VALUES (?, ?, ?, ?, ?)', (scope, path, digest, size, mtime))
+            self.connection.commit()
+
+    def forget(self, scope: str, prefix: str):
+        """
+        Remove the entries of the path and the paths under it, e.g., after the remote files were deleted
+        """
+        if self._connection is None and not os.path.exists(self.path):
+            return
+        directory = prefix.rstrip('/') + '/'
+        pattern = directory.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        with self._lock:
+            self.connection.execute("DELETE FROM uploads WHERE scope = ? AND (path = ? OR path LIKE ? ESCAPE '\\')",
+                                    (scope, prefix, pattern))
+            self.connection.commit()
+
+    def hash(self, path: str) -> str:
+        """
+        Hash a local file in the process pool
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.hash_workers)
+            executor = self._executor
+        return executor.submit(hash_file, path).result()
+
+    def is_unchanged(self, scope: str, path: str, local_path: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check the local file against the last upload to the path
+
+        :return (is_unchanged, the digest of the local file if it has been hashed)
+        """
+        entry = self.lookup(scope, path)
+        if entry is None:
+            return False, None
+
+        digest, size, mtime = entry
+        st = os.stat(local_path)
+        if st.st_size != size:
+            return False, None
+        if st.st_mtime == mtime:
+            return True, digest
+
+        local_digest = self.hash(local_path)
+        if local_digest == digest:
+            # the file was touched only, keep the new mtime to skip hashing next time
+            self.record(scope, path, digest, size, st.st_mtime)
+            return True, digest
+        return False, local_digest
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,136 @@
+import fnmatch
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Pattern, Set, Tuple, Union
+
+from primehub.utils import create_logger
+from primehub.utils.journal import DOWNLOAD_JOURNAL_NAME
+
+logger = create_logger('walker')
+
+# follow the symbolic links to files only, like os.walk
+SYMLINKS_FILES = 'files'
+# follow the symbolic links to files and directories, a directory is visited once
+SYMLINKS_FOLLOW = 'follow'
+# skip all symbolic links
+SYMLINKS_SKIP = 'skip'
+SYMLINK_POLICIES = (SYMLINKS_FILES, SYMLINKS_FOLLOW, SYMLINKS_SKIP)
+
+# the files written by the sdk itself are never walked
+IGNORED_NAMES = (DOWNLOAD_JOURNAL_NAME,)
+
+
+class PathMatcher(object):
+    """
+    PathMatcher matches the relative paths against glob patterns, the patterns are compiled to a regex once.
+
+    A pattern without '/' matches the file name, e.g., '*.pyc', otherwise it matches the relative path,
+    e.g., 'logs/*.txt'.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = [x for x in patterns if x]
+        self._names = self._compile([x for x in self.patterns if '/' not in x])
+        self._paths = self._compile([x.strip('/') for x in self.patterns if '/' in x])
+
+    @staticmethod
+    def _compile(patterns: List[str]) -> Optional[Pattern]:
+        if not patterns:
+            return None
+        return re.compile('|'.join([fnmatch.translate(x) for x in patterns]))
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def match(self, relative: str) -> bool:
+        if self._names is not None and self._names.match(relative.rsplit('/', 1)[-1]):
+            return True
+        return self._paths is not None and self._paths.match(relative) is not None
+
+
+def to_patterns(value: Union[None, str, Iterable[str]]) -> List[str]:
+    """
+    The glob patterns of an option, a comma-separated string or a list
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [x.strip() for x in value if x.strip()]
+
+
+def walk_files(root: str, include=None, exclude=None, symlinks: str = SYMLINKS_FILES) \
+        -> Iterator[Tuple[str, str, os.stat_result]]:
+    """
+    Walk the files under a local directory lazily with os.scandir, the files are yielded while the walk
+    continues and only the directories to visit are kept in memory.
+
+    :type root: str
+    :param root: The directory to walk
+
+    :type include: str or list
+    :param include: The glob patterns of the files to yield, all files when it is empty
+
+    :type exclude: str or list
+    :param exclude: The glob patterns of the files and directories to skip
+
+    :type symlinks: str
+    :param symlinks: The symbolic link policy, 'files', 'follow' or 'skip'
+
+    :rtype: Iterator[Tuple[str, str, os.stat_result]]
+    :return (the path, the path relative to the root with '/' as the separator, the stat of the file)
+    """
+    if symlinks not in SYMLINK_POLICIES:
+        raise ValueError(f'symlinks should be one of {", ".join(SYMLINK_POLICIES)}, but it is {symlinks}')
+    includes = PathMatcher(to_patterns(include))
+    excludes = PathMatcher(to_patterns(exclude))
+
+    visited: Set[Tuple[int, int]] = set()
+    if symlinks == SYMLINKS_FOLLOW:
+        st = os.stat(root)
+        visited.add((st.st_dev, st.st_ino))
+
+    stack = [(root, '')]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            scanner = os.scandir(directory)
+        except OSError as e:
+            logger.warning(f'[Warning] skip directory: {directory} ({e})')
+            continue
+
+        subdirs = []
+        with scanner:
+            for entry in scanner:
+                relative = prefix + entry.name
+                if entry.name in IGNORED_NAMES or excludes.match(relative):
+                    continue
+
+                is_symlink = entry.is_symlink()
+                if is_symlink and symlinks == SYMLINKS_SKIP:
+                    continue
+
+                try:
+                    if entry.is_dir(follow_symlinks=symlinks == SYMLINKS_FOLLOW):
+                        if symlinks == SYMLINKS_FOLLOW:
+                            # a link could point to a visited directory or an ancestor
+                            st = entry.stat()
+                            if (st.st_dev, st.st_ino) in visited:
+                                continue
+                            visited.add((st.st_dev, st.st_ino))
+                        subdirs.append((entry.path, relative + '/'))
+                        continue
+                    if not entry.is_file():
+                        # a broken link, a socket or a fifo
+                        continue
+                    st = entry.stat()
+                except OSError as e:
+                    logger.warning(f'[Warning] skip path: {entry.path} ({e})')
+                    continue
+
+                if includes and not includes.match(relative):
+                    continue
+                yield entry.path, relative, st
+
+        # visit the subdirectories in the order of their names
+        stack.extend(sorted(subdirs, reverse=True))
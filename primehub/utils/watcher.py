@@ -0,0 +1,190 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from primehub.utils import create_logger
+from primehub.utils.walker import walk_files
+
+logger = create_logger('watcher')
+
+DEFAULT_INTERVAL = 2.0
+DEFAULT_DEBOUNCE = 1.0
+
+# (size, mtime) of a local file
+Signature = Tuple[int, float]
+
+
+def _failed(future: Future) -> bool:
+    # the done callbacks could run after the waiters are woken up
+    return future.done() and future.exception() is not None
+
+
+class UploadWatcher(object):
+    """
+    UploadWatcher polls a local directory and uploads the new or modified files on a worker pool.
+
+    A change is detected by the size and mtime of a file. A file is uploaded after it has been unchanged
+    for the debounce seconds, so a burst of writes to a file is coalesced into one upload.
+    A failed upload is retried at the next poll.
+
+    with UploadWatcher('./checkpoints', upload) as watcher:
+        for epoch in range(epochs):
+            train_and_save(epoch)
+            watcher.flush()
+    """
+
+    def __init__(self, root: str, upload: Callable[[str, str], None], interval: float = DEFAULT_INTERVAL,
+                 debounce: float = DEFAULT_DEBOUNCE, parallel: int = 2, include=None, exclude=None):
+        """
+        :type root: str
+        :param root: The local directory to watch
+
+        :type upload: Callable
+        :param upload: A function taking the local path and the path relative to the root, it raises on failures
+
+        :type interval: float
+        :param interval: The seconds between polls
+
+        :type debounce: float
+        :param debounce: The seconds a file should be unchanged before it is uploaded
+
+        :type parallel: int
+        :param parallel: The number of concurrent uploads
+        """
+        self.root = root
+        self.interval = interval
+        self.debounce = debounce
+        self.include = include
+        self.exclude = exclude
+        self._upload = upload
+        self._executor = ThreadPoolExecutor(max_workers=max(parallel, 1), thread_name_prefix='primehub-watch')
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # the signatures of the uploaded files
+        self.uploaded: Dict[str, Signature] = dict()
+        # the changed files and when they were seen changed last time
+        self._changed: Dict[str, Tuple[Signature, float]] = dict()
+        # the uploads in flight by relative path
+        self._inflight: Dict[str, Tuple[Signature, Future]] = dict()
+        self.errors: Dict[str, BaseException] = dict()
+
+    def poll(self, force: bool = False) -> List[Future]:
+        """
+        Scan the directory once and submit the uploads of the changed files
+
+        :type force: bool
+        :param force: Upload the changed files without waiting for the debounce
+
+        :return the futures of the submitted uploads
+        """
+        now = time.time()
+        submitted = []
+        with self._lock:
+            seen = set()
+            for path, relative, st in walk_files(self.root, self.include, self.exclude):
+                seen.add(relative)
+                signature = (st.st_size, st.st_mtime)
+                if self._is_current(relative, signature):
+                    self._changed.pop(relative, None)
+                    continue
+
+                changed = self._changed.get(relative)
+                if changed is None or changed[0] != signature:
+                    # a new change, wait for the debounce
+                    self._changed[relative] = (signature, now)
+                    if not force:
+                        continue
+                elif not force and now - changed[1] < self.debounce:
+                    continue
+
+                del self._changed[relative]
+                submitted.append(self._submit(path, relative, signature))
+
+            # forget the removed files
+            for relative in [x for x in self._changed if x not in seen]:
+                del self._changed[relative]
+        return submitted
+
+    def _is_current(self, relative: str, signature: Signature) -> bool:
+        inflight = self._inflight.get(relative)
+        if inflight is not None and not _failed(inflight[1]):
+            return inflight[0] == signature
+        return self.uploaded.get(relative) == signature
+
+    def _submit(self, path: str, relative: str, signature: Signature) -> Future:
+        future = self._executor.submit(self._upload, path, relative)
+        self._inflight[relative] = (signature, future)
+        future.add_done_callback(lambda f: self._done(relative, signature, f))
+        return future
+
+    def _done(self, relative: str, signature: Signature, future: Future):
+        with self._lock:
+            inflight = self._inflight.get(relative)
+            superseded = inflight is None or inflight[1] is not future
+            if not superseded:
+                del self._inflight[relative]
+            error = future.exception()
+            if error is not None:
+                if superseded:
+                    # the file has been resubmitted before this callback
+                    return
+                logger.warning(f'[Warning] failed to upload {relative}: {error}')
+                self.errors[relative] = error
+                return
+            self.errors.pop(relative, None)
+            self.uploaded[relative] = signature
+
+    def flush(self, timeout: Optional[float] = None):
+        """
+        Block until the files changed up to now have been uploaded, the debounce is skipped.
+
+        It raises the error of a failed upload, the file will be retried at the next poll.
+        """
+        with self._lock:
+            self.poll(force=True)
+            futures = [x[1] for x in self._inflight.values()]
+        done, not_done = wait(futures, timeout=timeout)
+        if not_done:
+            raise TimeoutError(f'{len(not_done)} uploads are not done in {timeout} seconds')
+        for f in done:
+            if f.exception() is not None:
+                raise f.exception()  # type: ignore
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except BaseException as e:
+                logger.warning(f'[Warning] failed to poll {self.root}: {e}')
+
+    def start(self) -> 'UploadWatcher':
+        """
+        Poll the directory in a background thread
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='primehub-watch-poll', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, flush: bool = True):
+        """
+        Stop polling, the changed files are uploaded before returning when `flush`
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            if flush:
+                self.flush()
+        finally:
+            self._executor.shutdown()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop(flush=exc_type is None)
@@ -22,7 +22,8 @@ setup(name='primehub-python-sdk',
       url='https://github.com/InfuseAI/primehub-python-sdk',
       entry_points={
           'console_scripts': ['primehub = primehub.cli:main', 'doc-primehub = primehub.extras.doc_generator:main',
-                              'auto-primehub = primehub.utils.completion:auto_complete']
+                              'auto-primehub = primehub.utils.completion:auto_complete'],
+          'fsspec.specs': ['phfs = primehub.filesystem.PrimeHubFileSystem']
       },
       python_requires=">=3.6",
       packages=find_packages(),
@@ -36,8 +37,10 @@ setup(name='primehub-python-sdk',
               'pytest-cov',
               'Jinja2', 'types-Jinja2',
               'twine',
-              'importlib-metadata<5'
+              'importlib-metadata<5',
+              'fsspec>=2021.4.0'
           ],
+          'fsspec': ['fsspec>=2021.4.0'],
       },
       project_urls={
           "Bug Tracker": "https://github.com/InfuseAI/primehub/issues",
@@ -0,0 +1,124 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    A keep-alive HTTP handler which answers with the routes registered to the StandInServer
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        server: StandInServer = self.server.stand_in  # type: ignore
+        server.connections.add(self.client_address)
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            body = self._read_chunked()
+            if body is None:
+                # the client aborted the request
+                self.close_connection = True
+                return
+        else:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+        server.requests.append((self.command, self.path, dict(self.headers), body))
+
+        status, headers, content = server.dispatch(self.command, self.path, self.headers, body)
+        if isinstance(content, (dict, list)):
+            content = json.dumps(content).encode()
+            headers.setdefault('Content-Type', 'application/json')
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(content)
+
+    def _read_chunked(self):
+        chunks = []
+        while True:
+            line = self.rfile.readline()
+            if not line.strip():
+                return None
+            size = int(line.split(b';')[0], 16)
+            chunk = self.rfile.read(size)
+            if len(chunk) < size or self.rfile.readline() != b'\r\n':
+                return None
+            if size == 0:
+                return b''.join(chunks)
+            chunks.append(chunk)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_PUT = _handle
+    do_HEAD = _handle
+
+
+class StandInServer(object):
+    """
+    A local HTTP server for tests, it records requests and client connections.
+
+    Register a route with a handler which takes (method, path, headers, body)
+    and returns (status, headers, content), content could be bytes or a JSON-able object.
+    """
+
+    def __init__(self):
+        self.routes = dict()
+        self.requests = []
+        self.connections = set()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stand_in = self  # type: ignore
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def route(self, path, handler):
+        self.routes[path] = handler
+
+    def dispatch(self, method, path, headers, body):
+        route = path.split('?')[0]
+        for prefix in sorted(self.routes.keys(), key=len, reverse=True):
+            if route.startswith(prefix):
+                return self.routes[prefix](method, path, headers, body)
+        return 404, {}, b'Not Found'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def file_handler(data: bytes, accept_ranges: bool = True, etag: Optional[str] = None, if_range: bool = True):
+    """
+    A handler serving the bytes, it answers Range requests with 206 Partial Content when `accept_ranges`,
+    the `etag` is sent with every response and the If-Range header is honoured when `if_range`
+    """
+
+    def handler(method, path, headers, body):
+        validators = {'ETag': etag} if etag else {}
+        content_range = headers.get('Range')
+        changed = if_range and headers.get('If-Range') not in (None, etag)
+        if not accept_ranges or not content_range or changed:
+            return 200, validators, data
+
+        start, end = content_range.replace('bytes=', '').split('-')
+        start = int(start)
+        end = int(end) if end else len(data) - 1
+        if start >= len(data):
+            return 416, {'Content-Range': f'bytes */{len(data)}', **validators}, b''
+        end = min(end, len(data) - 1)
+        return 206, {'Content-Range': f'bytes {start}-{end}/{len(data)}', **validators}, data[start:end + 1]
+
+    return handler
@@ -0,0 +1,82 @@
+import asyncio
+from unittest import mock
+
+from primehub.aio import AsyncPrimeHub
+from tests import BaseTestCase
+
+
+class TestAsyncPrimeHub(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestAsyncPrimeHub, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'group-id'}
+        self.async_sdk = AsyncPrimeHub(primehub=self.sdk, max_concurrency=4)
+
+    def tearDown(self) -> None:
+        super(TestAsyncPrimeHub, self).tearDown()
+        self.async_sdk.close()
+
+    def test_gather_get(self):
+        def request_side_effect(variables, query, error_handler=None):
+            return {'data': {'phJob': {'id': variables['where']['id'], 'schedule': None}}}
+
+        self.mock_request.side_effect = request_side_effect
+
+        async def get_jobs():
+            return await asyncio.gather(*[self.async_sdk.jobs.get(f'job-{x}') for x in range(20)])
+
+        jobs = asyncio.run(get_jobs())
+        self.assertEqual([f'job-{x}' for x in range(20)], [x['id'] for x in jobs])
+        self.assertEqual(20, self.mock_request.call_count)
+
+    def test_list_as_async_generator(self):
+        def request_side_effect(variables, query, error_handler=None):
+            if variables['page'] > 2:
+                return {'data': {'phJobsConnection': {'edges': []}}}
+            edges = [{'node': {'id': f'job-{variables["page"]}-{x}', 'schedule': None}} for x in range(3)]
+            return {'data': {'phJobsConnection': {'edges': edges}}}
+
+        self.mock_request.side_effect = request_side_effect
+
+        async def list_jobs():
+            return [x['id'] async for x in self.async_sdk.jobs.list()]
+
+        self.assertEqual(['job-1-0', 'job-1-1', 'job-1-2', 'job-2-0', 'job-2-1', 'job-2-2'], asyncio.run(list_jobs()))
+
+    def test_registered_command(self):
+        from primehub import Helpful, Module
+
+        class Echo(Helpful, Module):
+            def echo(self, value):
+                return value
+
+            def help_description(self):
+                return 'echo'
+
+        self.async_sdk.register_command('echo', Echo)
+        self.assertEqual('hello', asyncio.run(self.async_sdk.echo.echo('hello')))
+
+        with self.assertRaises(AttributeError):
+            self.async_sdk.not_a_command
+
+    def test_close_the_owned_primehub_only(self):
+        with mock.patch.object(self.sdk, 'close') as close:
+            AsyncPrimeHub(primehub=self.sdk).close()
+            close.assert_not_called()
+
+        owned = AsyncPrimeHub(self.sdk.primehub_config)
+        with mock.patch.object(owned.primehub, 'close') as close:
+            owned.close()
+            close.assert_called_once()
+
+    def test_leave_the_caller_transport(self):
+        transport = self.sdk.transport
+        self.sdk.primehub_config.pool_maxsize = 2
+        with mock.patch('primehub.aio.logger') as logger:
+            AsyncPrimeHub(primehub=self.sdk, max_concurrency=8).close()
+            logger.warning.assert_called_once()
+        self.assertIs(transport, self.sdk._transport)
+
+        owned = AsyncPrimeHub(self.sdk.primehub_config, max_concurrency=8)
+        self.assertEqual(8, owned.primehub._transport.pool_maxsize)
+        owned.close()
@@ -0,0 +1,176 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from primehub.utils import SharedFileException
+from primehub.utils.dataset_cache import MANIFEST_NAME, DatasetCache, FileLock
+from tests import BaseTestCase
+from tests.http_server import StandInServer
+from tests.test_files_sync import STORE_PATH, FakePHFS
+
+
+class FakeDatasetPHFS(FakePHFS):
+    """
+    A FakePHFS which answers the dataset queries as well, the updatedAt of a dataset is changed by `put`
+    """
+
+    def __init__(self):
+        super(FakeDatasetPHFS, self).__init__()
+        self.updated = dict()
+
+    def put(self, path: str, content: bytes, last_modified: float = None):
+        super(FakeDatasetPHFS, self).put(path, content, last_modified)
+        if path.startswith('/datasets/'):
+            self.updated[path.split('/')[2]] = time.time()
+
+    def request(self, variables, query, *args):
+        if 'createDatasetV2(' in query:
+            dataset_id = variables['payload']['id']
+            self.put(f'/datasets/{dataset_id}/.dataset', b'{}')
+            return {'data': {'createDatasetV2': {'id': dataset_id, 'name': dataset_id}}}
+        if 'deleteDatasetV2(' in query:
+            dataset_id = variables['where']['id']
+            self.updated.pop(dataset_id, None)
+            self.delete(f'/datasets/{dataset_id}/', True)
+            return {'data': {'deleteDatasetV2': {'id': dataset_id}}}
+        if 'datasetV2(' not in query:
+            return super(FakeDatasetPHFS, self).request(variables, query, *args)
+        dataset_id = variables['where']['id']
+        if dataset_id not in self.updated:
+            return {'data': {'datasetV2': None}}
+        prefix = f'/datasets/{dataset_id}/'
+        size = sum([len(v[0]) for k, v in self.objects.items() if k.startswith(prefix)])
+        return {'data': {'datasetV2': {'id': dataset_id, 'name': dataset_id, 'size': size,
+                                       'updatedAt': str(self.updated[dataset_id])}}}
+
+
+def use_version(cache_dir, version_dir, ready, done):
+    DatasetCache(cache_dir).use(version_dir)
+    ready.set()
+    done.wait(10)
+
+
+def hold_lock(path, ready, done):
+    with FileLock(path):
+        ready.set()
+        done.wait(10)
+
+
+class TestDatasetCache(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestDatasetCache, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakeDatasetPHFS()
+        self.mock_request.side_effect = self.phfs.request
+        self.phfs.put('/datasets/mnist/.dataset', b'{}')
+        self.phfs.put('/datasets/mnist/train/a.bin', b'a' * 100)
+        self.phfs.put('/datasets/mnist/train/b.bin', b'b' * 200)
+        self.phfs.put('/datasets/mnist/labels.csv', b'x,y\n')
+        self.cache_dir = tempfile.mkdtemp()
+
+    def downloads(self, server):
+        return sorted([x[1][len(STORE_PATH):] for x in server.requests if x[0] == 'GET'])
+
+    def test_materialize(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            path = self.sdk.datasets.materialize('mnist', cache_dir=self.cache_dir)
+            self.assertTrue(path.startswith(self.cache_dir))
+            self.assertEqual(b'b' * 200, open(os.path.join(path, 'train', 'b.bin'), 'rb').read())
+            self.assertFalse(os.path.exists(os.path.join(path, '.dataset')))
+            self.assertEqual(['/datasets/mnist/labels.csv', '/datasets/mnist/train/a.bin',
+                              '/datasets/mnist/train/b.bin'], self.downloads(server))
+
+            # the unchanged dataset is served from the cache
+            server.requests.clear()
+            self.assertEqual(path, self.sdk.datasets.materialize('mnist', cache_dir=self.cache_dir))
+            self.assertEqual([], self.downloads(server))
+
+            # only the changed files are downloaded for a new version
+            self.phfs.put('/datasets/mnist/train/a.bin', b'A' * 100, time.time() + 10)
+            new_path = self.sdk.datasets.materialize('mnist', cache_dir=self.cache_dir)
+            self.assertNotEqual(path, new_path)
+            self.assertEqual(['/datasets/mnist/train/a.bin'], self.downloads(server))
+            self.assertEqual(b'A' * 100, open(os.path.join(new_path, 'train', 'a.bin'), 'rb').read())
+            self.assertEqual(b'b' * 200, open(os.path.join(new_path, 'train', 'b.bin'), 'rb').read())
+
+            with self.assertRaises(SharedFileException):
+                self.sdk.datasets.materialize('no-such-dataset', cache_dir=self.cache_dir)
+
+    def test_eviction(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            old_path = self.sdk.datasets.materialize('mnist', cache_dir=self.cache_dir, cache_size=500)
+            self.phfs.put('/datasets/mnist/train/c.bin', b'c' * 300)
+            new_path = self.sdk.datasets.materialize('mnist', cache_dir=self.cache_dir, cache_size=500)
+
+            # the least recently used version is evicted, the current one is kept over the budget
+            self.assertFalse(os.path.exists(old_path))
+            self.assertTrue(os.path.exists(os.path.join(new_path, MANIFEST_NAME)))
+            self.assertEqual([new_path], [x[2] for x in DatasetCache(self.cache_dir).versions()])
+
+    def test_concurrent_materialize(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            paths = []
+
+            def materialize():
+                paths.append(self.sdk.datasets.materialize('mnist', cache_dir=self.cache_dir))
+
+            threads = [threading.Thread(target=materialize) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            # the processes share one copy
+            self.assertEqual(4, len(paths))
+            self.assertEqual(1, len(set(paths)))
+            self.assertEqual(3, len(self.downloads(server)))
+
+    def run_process(self, target, *args):
+        # a spawned process shares no descriptors with this one
+        context = multiprocessing.get_context('spawn')
+        ready, done = context.Event(), context.Event()
+        process = context.Process(target=target, args=args + (ready, done))
+        process.start()
+        self.assertTrue(ready.wait(10))
+        return process, done
+
+    def test_eviction_across_processes(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            old_path = self.sdk.datasets.materialize('mnist', cache_dir=self.cache_dir, cache_size=500)
+            process, done = self.run_process(use_version, self.cache_dir, old_path)
+            try:
+                # the version used by another process is kept over the budget
+                self.phfs.put('/datasets/mnist/train/c.bin', b'c' * 300)
+                new_path = self.sdk.datasets.materialize('mnist', cache_dir=self.cache_dir, cache_size=500)
+                self.assertTrue(os.path.exists(os.path.join(old_path, MANIFEST_NAME)))
+                self.assertTrue(os.path.exists(os.path.join(new_path, MANIFEST_NAME)))
+            finally:
+                done.set()
+                process.join()
+
+            # the versions of a dataset being built by another process are kept
+            cache = DatasetCache(self.cache_dir, 500)
+            process, done = self.run_process(hold_lock, os.path.dirname(old_path) + '.lock')
+            try:
+                self.assertEqual([], cache.evict(keep=new_path))
+            finally:
+                done.set()
+                process.join()
+
+            self.assertEqual([old_path], cache.evict(keep=new_path))
+            self.assertEqual([new_path], [x[2] for x in cache.versions()])
@@ -0,0 +1,109 @@
+import threading
+import time
+
+from primehub.utils import SharedFileException
+from primehub.utils.prefetch import prefetched, shard, shuffled
+from tests import BaseTestCase
+from tests.http_server import StandInServer
+from tests.test_dataset_cache import FakeDatasetPHFS
+from tests.test_files_sync import STORE_PATH
+
+
+class TestPrefetch(BaseTestCase):
+
+    def test_shard(self):
+        items = list(range(10))
+        shards = [list(shard(iter(items), rank, 3)) for rank in range(3)]
+        self.assertEqual([[0, 3, 6, 9], [1, 4, 7], [2, 5, 8]], shards)
+        with self.assertRaises(ValueError):
+            shard(items, 3, 3)
+
+    def test_shuffled(self):
+        items = list(range(100))
+        result = list(shuffled(iter(items), 10, seed=1))
+        self.assertEqual(items, sorted(result))
+        self.assertNotEqual(items, result)
+        self.assertEqual(result, list(shuffled(iter(items), 10, seed=1)))
+        self.assertEqual(items, list(shuffled(iter(items), 0)))
+
+    def test_prefetched(self):
+        started = []
+        release = threading.Event()
+
+        def func(x):
+            started.append(x)
+            if x > 0:
+                release.wait(5)
+            return x * 2
+
+        results = prefetched(range(10), func, depth=3)
+        self.assertEqual((0, 0), next(results))
+        # the next items are fetched before they are consumed
+        deadline = time.time() + 5
+        while len(started) < 4 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([0, 1, 2, 3], sorted(started))
+        release.set()
+        self.assertEqual([(x, x * 2) for x in range(1, 10)], list(results))
+
+        # the pending work is cancelled when the consumer stops
+        started.clear()
+        results = prefetched(range(100), func, depth=2)
+        next(results)
+        results.close()
+        self.assertLess(len(started), 10)
+
+
+class TestDatasetIterFiles(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestDatasetIterFiles, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakeDatasetPHFS()
+        self.mock_request.side_effect = self.phfs.request
+        self.phfs.put('/datasets/mnist/.dataset', b'{}')
+        for x in range(10):
+            self.phfs.put(f'/datasets/mnist/train/{x}.png', b'png-%d' % x)
+        self.phfs.put('/datasets/mnist/labels.csv', b'x,y\n')
+
+    def test_iter_files(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            files = dict(self.sdk.datasets.iter_files('mnist', prefetch=2))
+            self.assertEqual(11, len(files))
+            self.assertNotIn('.dataset', files)
+            self.assertEqual(b'png-3', files['train/3.png'])
+
+            names = [x for x, _ in self.sdk.datasets.iter_files('mnist', pattern='train/*.png')]
+            self.assertEqual(sorted([f'train/{x}.png' for x in range(10)]), names)
+
+            with self.assertRaises(SharedFileException):
+                list(self.sdk.datasets.iter_files('no-such-dataset'))
+
+    def test_sharding_and_shuffle(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            shards = [[x for x, _ in self.sdk.datasets.iter_files('mnist', rank=rank, world_size=3, shuffle=4, seed=7)]
+                      for rank in range(3)]
+            names = [x for s in shards for x in s]
+            self.assertEqual(11, len(names))
+            self.assertEqual(11, len(set(names)))
+
+            # the same seed gives the same order
+            again = [x for x, _ in self.sdk.datasets.iter_files('mnist', rank=0, world_size=3, shuffle=4, seed=7)]
+            self.assertEqual(shards[0], again)
+
+    def test_stream(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            for name, fh in self.sdk.datasets.iter_files('mnist', pattern='labels.csv', stream=True):
+                with fh:
+                    fh.seek(2)
+                    self.assertEqual(b'y\n', fh.read())
+            self.assertEqual('bytes=2-3', [x[2].get('Range') for x in server.requests if x[0] == 'GET'][-1])
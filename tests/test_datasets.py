@@ -1,6 +1,7 @@
 from primehub.datasets import validate_creation, validate_update, get_phfs_path, protect_metadata
 from primehub.utils import PrimeHubException, DatasetsException
 from tests import BaseTestCase
+from tests.test_dataset_cache import FakeDatasetPHFS
 
 
 class TestDatasets(BaseTestCase):
@@ -90,3 +91,49 @@ class TestDatasets(BaseTestCase):
         protect_metadata(dataset, get_phfs_path(dataset, '/dataset'))
         protect_metadata(dataset, get_phfs_path(dataset, '/.dataset.dataset'))
         protect_metadata(dataset, get_phfs_path(dataset, '/deep/.dataset'))
+
+
+class TestDatasetsMetadataCache(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestDatasetsMetadataCache, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakeDatasetPHFS()
+        self.mock_request.side_effect = self.phfs.request
+        self.phfs.put('/datasets/mnist/.dataset', b'{}')
+        self.phfs.put('/datasets/mnist/labels.csv', b'x,y\n')
+        self.phfs.put('/datasets/mnist/labels.csv.bak', b'x,y\n')
+        for x in range(3):
+            self.phfs.put(f'/datasets/mnist/train/{x}/a.bin', b'a')
+            self.phfs.put(f'/datasets/mnist/test/{x}.bin', b'a')
+
+    def queries(self, keyword):
+        return [x for x in self.mock_request.call_args_list if keyword in x[0][1]]
+
+    def test_existence_check_is_cached(self):
+        self.sdk.datasets.files_list('mnist', '/')
+        self.sdk.datasets.files_list('mnist', '/train')
+        self.assertEqual(1, len(self.queries(' datasetV2(')))
+
+        # a deleted dataset is checked again
+        self.sdk.datasets.delete('mnist')
+        self.sdk.datasets.files_list('mnist', '/')
+        self.assertEqual(2, len(self.queries(' datasetV2(')))
+
+        # a created dataset is known to exist
+        self.sdk.datasets.create({'id': 'cifar'})
+        self.sdk.datasets.files_list('cifar', '/')
+        self.assertEqual(2, len(self.queries(' datasetV2(')))
+
+    def test_delete_root_in_batch(self):
+        result = self.sdk.datasets.files_delete('mnist', '/', recursive=True)
+        self.assertEqual({'deleteFiles': 8}, result)
+        self.assertEqual(['/datasets/mnist/.dataset'], list(self.phfs.objects.keys()))
+
+        # the directories and the files are deleted by one mutation with the options of each alias
+        mutations = self.queries('deleteFiles')
+        self.assertEqual(1, len(mutations))
+        variables = mutations[0][0][0]
+        self.assertEqual(8, len(variables))
+        self.assertEqual([False, False, True, True],
+                         sorted([v['recursive'] for k, v in variables.items() if k.endswith('_options')]))
@@ -1,8 +1,12 @@
 import os
+import re
+import tempfile
+import time
 from unittest import mock
 
 from primehub.files import _normalize_user_input_path, _normalize_dest_path
 from tests import BaseTestCase
+from tests.test_files_sync import FakePHFS
 from primehub.utils import create_logger, SharedFileException
 
 logger = create_logger('primehub-test')
@@ -27,6 +31,17 @@ Current local directroy:
 
 
 def mock_request_side_effect(*args):
+    if 'directory' in args[0]:
+        # the aliased query of Files.stat
+        where = args[0]['where']
+        return {'data': {
+            'directory': mock_request_side_effect({'where': where, 'options': args[0]['directory']})['data']['files'],
+            'file': mock_request_side_effect({'where': where, 'options': args[0]['file']})['data']['files']}}
+    if 'where' not in args[0]:
+        # the aliased probes of the listing partitions
+        return {'data': {k: mock_request_side_effect({'where': v, 'options': {'recursive': True, 'limit': 1}})
+                         ['data']['files'] for k, v in args[0].items()}}
+
     phfs_files = ['/l0.csv', '/deep/l1.csv', '/deep/sub/l2.csv', '/deep/sub/path/l3.csv']
 
     prefix = args[0]['where']['phfsPrefix']
@@ -41,7 +56,7 @@ def mock_request_side_effect(*args):
             filter_files = [f[1:] for f in filter_files if f and f[0] == '/']
         filter_files = [f if f.find('/') == -1 else f[:f.find('/') + 1] for f in filter_files]
 
-    filter_files = list(set(filter_files))
+    filter_files = sorted(set(filter_files))
     filter_files = filter_files[: limit]
     items = [{'name': f} for f in filter_files]
     return {'data': {'files': {'items': items}}}
@@ -295,3 +310,120 @@ class TestCmdFiles(BaseTestCase):
         with self.assertRaises(SharedFileException) as e:
             generate_prefix('deep/sub/path/l3', recursive=False)
         self.assertEqual('No such file: /deep/sub/path/l3', str(e.exception))
+
+
+class TestFilesListing(BaseTestCase):
+    def setUp(self) -> None:
+        super(TestFilesListing, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.mock_request.side_effect = mock_request_side_effect
+
+    @mock.patch('primehub.files.LIST_PAGE_SIZE', 2)
+    def test_walk_truncated_listing(self):
+        expected = ['deep/l1.csv', 'deep/sub/l2.csv', 'deep/sub/path/l3.csv', 'l0.csv']
+        for parallel in [1, 4]:
+            items = self.sdk.files._walk('/', parallel)
+            self.assertFalse(isinstance(items, list))
+            items = list(items)
+            self.assertEqual(expected, sorted([x['name'] for x in items]))
+            self.assertIn('phfs:///deep/sub/path/l3.csv', [x['phfsUri'] for x in items])
+
+        items = list(self.sdk.files._walk('/deep/sub/'))
+        self.assertEqual(['l2.csv', 'path/l3.csv'], sorted([x['name'] for x in items]))
+
+    @mock.patch('primehub.files.LIST_PAGE_SIZE', 1)
+    def test_list_truncated_directory(self):
+        self.assertEqual(['deep/', 'l0.csv'], sorted([x['name'] for x in self.sdk.files.list('/')]))
+
+    @mock.patch('primehub.files.LIST_PAGE_SIZE', 2)
+    def test_download_list_of_truncated_listing(self):
+        actual = self.sdk.files._generate_download_list('/deep', tempfile.mkdtemp(), recursive=True)
+        self.assertEqual(['/deep/l1.csv', '/deep/sub/l2.csv', '/deep/sub/path/l3.csv'], sorted([x[0] for x in actual]))
+
+    @mock.patch('primehub.files.LIST_PAGE_SIZE', 3)
+    def test_list_large_flat_directory(self):
+        phfs = FakePHFS()
+        names = [f'{x:02d}.csv' for x in range(20)]
+        names += ['sub/a.csv', 'sub/b.csv', 'sub/c.csv', 'sub/報.csv', 'z.csv', 'é.csv', '報告.csv']
+        for name in names:
+            phfs.put('/flat/' + name, b'x')
+        limits = []
+
+        def request(variables, query, *args):
+            limits.extend([x['limit'] for x in variables.values() if isinstance(x, dict) and 'limit' in x])
+            limits.extend([int(x) for x in re.findall(r'limit: (\d+)', query)])
+            return phfs.request(variables, query, *args)
+
+        self.mock_request.side_effect = request
+        items = self.sdk.files.list('/flat')
+        self.assertEqual(sorted(names[:20]) + ['sub/', 'z.csv', 'é.csv', '報告.csv'], [x['name'] for x in items])
+        self.assertEqual('phfs:///flat/報告.csv', items[-1]['phfsUri'])
+
+        # the pages are bounded, a listing of one more child verifies the partitions of each pass
+        self.assertEqual([23, 24, 25], [x for x in limits if x > 3])
+
+        limits.clear()
+        for parallel in [1, 3]:
+            self.assertEqual(sorted(names), sorted([x['name'] for x in self.sdk.files._walk('/flat/', parallel)]))
+
+    @mock.patch('primehub.files.LIST_PAGE_SIZE', 2)
+    def test_walk_bounds_listings_in_flight(self):
+        phfs = FakePHFS()
+        for x in range(20):
+            phfs.put(f'/many/{x:02d}/a.csv', b'x')
+        self.mock_request.side_effect = phfs.request
+
+        listed = []
+        list_prefix = self.sdk.files._list_prefix
+
+        def recorded(prefix, relative):
+            listed.append(prefix)
+            return list_prefix(prefix, relative)
+
+        with mock.patch.object(self.sdk.files, '_list_prefix', side_effect=recorded):
+            items = self.sdk.files._walk('/many/', 2)
+            next(items)
+            time.sleep(0.2)
+            # the directories wait until the consumer asks for more
+            self.assertLessEqual(len(listed), 1 + 2 * 2)
+            self.assertEqual(19, len(list(items)))
+        self.assertEqual(21, len(listed))
+
+
+class TestFilesStat(BaseTestCase):
+    def setUp(self) -> None:
+        super(TestFilesStat, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.mock_request.side_effect = mock_request_side_effect
+
+    def test_stat(self):
+        self.assertEqual('directory', self.sdk.files.stat('/deep')['type'])
+        self.assertEqual('directory', self.sdk.files.stat('deep/sub/')['type'])
+        self.assertEqual({'path': '/l0.csv', 'type': 'file', 'size': None, 'lastModified': None,
+                          'phfsUri': 'phfs:///l0.csv'}, self.sdk.files.stat('l0.csv'))
+
+        with self.assertRaises(SharedFileException) as e:
+            self.sdk.files.stat('/l0')
+        self.assertEqual('No such file or directory: /l0', str(e.exception))
+
+    def test_classification_is_cached(self):
+        self.sdk.files.list('/deep')
+        self.assertEqual(2, self.mock_request.call_count)
+
+        # the path has been classified, only the listing is requested
+        self.sdk.files.list('/deep')
+        self.sdk.files._generate_download_list('/deep', tempfile.mkdtemp(), recursive=True)
+        self.sdk.files.get_phfs_uri('/deep')
+        self.assertEqual(3, self.mock_request.call_count)
+
+        # a mutation invalidates the cache
+        def delete_side_effect(*args):
+            if 'deleteFiles' in args[1]:
+                return {'data': {'deleteFiles': 3}}
+            return mock_request_side_effect(*args)
+
+        self.mock_request.side_effect = delete_side_effect
+        self.sdk.files.delete('/deep', recursive=True)
+        self.assertEqual(4, self.mock_request.call_count)
+        self.sdk.files.stat('/deep')
+        self.assertEqual(5, self.mock_request.call_count)
@@ -0,0 +1,98 @@
+import os
+import tempfile
+from unittest import mock
+
+from primehub.utils import SharedFileException
+from primehub.utils.globs import GlobMatcher, literal_prefix
+from tests import BaseTestCase
+from tests.http_server import StandInServer
+from tests.test_files_sync import STORE_PATH, FakePHFS
+
+
+class TestGlobMatcher(BaseTestCase):
+
+    def test_literal_prefix(self):
+        self.assertEqual('runs/', literal_prefix('runs/**/metrics/*.json'))
+        self.assertEqual('runs/exp/', literal_prefix('runs/exp/model-[0-9].pt'))
+        self.assertEqual('', literal_prefix('*.csv'))
+        self.assertEqual('a/b/', literal_prefix('a/b/c.txt'))
+
+    def test_match(self):
+        matcher = GlobMatcher('runs/**/metrics/*.json')
+        self.assertTrue(matcher.match('runs/metrics/a.json'))
+        self.assertTrue(matcher.match('runs/1/2/metrics/a.json'))
+        self.assertFalse(matcher.match('runs/1/metrics/sub/a.json'))
+        self.assertFalse(matcher.match('runs/1/metrics/a.csv'))
+        self.assertFalse(matcher.match('other/metrics/a.json'))
+
+        matcher = GlobMatcher('*/m?.csv')
+        self.assertTrue(matcher.match('a/m1.csv'))
+        self.assertFalse(matcher.match('a/b/m1.csv'))
+        self.assertTrue(GlobMatcher('**').match('a/b/c'))
+
+    def test_could_contain(self):
+        matcher = GlobMatcher('runs/*/metrics/*.json')
+        self.assertTrue(matcher.could_contain(''))
+        self.assertTrue(matcher.could_contain('runs/'))
+        self.assertTrue(matcher.could_contain('runs/1/metrics/'))
+        self.assertFalse(matcher.could_contain('runs/1/logs/'))
+        self.assertFalse(matcher.could_contain('runs/1/metrics/sub/'))
+        self.assertFalse(matcher.could_contain('other/'))
+        self.assertTrue(GlobMatcher('runs/**/*.json').could_contain('runs/1/logs/'))
+
+
+class TestFilesGlob(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestFilesGlob, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakePHFS()
+        self.prefixes = []
+
+        def request(variables, query, *args):
+            if 'options' in variables:
+                self.prefixes.append((variables['where']['phfsPrefix'], variables['options']['recursive']))
+            return self.phfs.request(variables, query, *args)
+
+        self.mock_request.side_effect = request
+        for path in ['/runs/a/metrics/1.json', '/runs/a/logs/1.json', '/runs/a/logs/2.json',
+                     '/runs/b/metrics/2.json', '/runs/b/metrics/3.csv', '/other/3.json']:
+            self.phfs.put(path, path.encode())
+
+    def test_list(self):
+        items = self.sdk.files.list('/', glob='runs/**/*.json')
+        self.assertEqual(['runs/a/logs/1.json', 'runs/a/logs/2.json', 'runs/a/metrics/1.json',
+                          'runs/b/metrics/2.json'], sorted([x['name'] for x in items]))
+        self.assertEqual('phfs:///runs/b/metrics/2.json', [x for x in items if '2.json' in x['name']][-1]['phfsUri'])
+
+        # the literal prefix is pushed down
+        self.assertEqual([('/runs/', True)], self.prefixes)
+
+        items = self.sdk.files.list('/runs', glob='*/metrics/*')
+        self.assertEqual(['a/metrics/1.json', 'b/metrics/2.json', 'b/metrics/3.csv'],
+                         sorted([x['name'] for x in items]))
+
+        with self.assertRaises(SharedFileException):
+            self.sdk.files.list('/runs/a/metrics/1.json', glob='*')
+
+    @mock.patch('primehub.files.LIST_PAGE_SIZE', 2)
+    def test_prune_sub_prefixes(self):
+        for parallel in [1, 4]:
+            self.prefixes.clear()
+            items = self.sdk.files.list('/', glob='runs/*/metrics/*.json', parallel=parallel)
+            self.assertEqual(['runs/a/metrics/1.json', 'runs/b/metrics/2.json'], sorted([x['name'] for x in items]))
+            listed = [x[0] for x in self.prefixes]
+            self.assertNotIn('/other/', listed)
+            self.assertNotIn('/runs/a/logs/', listed)
+
+    def test_download(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            dest = tempfile.mkdtemp()
+            report = self.sdk.files.download('/runs', dest, glob='**/metrics/*.json')
+            self.assertEqual(2, report['files'])
+            self.assertEqual(2, len(server.requests))
+            self.assertTrue(os.path.exists(os.path.join(dest, 'runs', 'a', 'metrics', '1.json')))
+            self.assertTrue(os.path.exists(os.path.join(dest, 'runs', 'b', 'metrics', '2.json')))
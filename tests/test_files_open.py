@@ -0,0 +1,91 @@
+import io
+import os
+
+from primehub.utils import RequestException, SharedFileException
+from tests import BaseTestCase
+from tests.http_server import StandInServer
+from tests.test_files_sync import STORE_PATH, FakePHFS
+
+
+class TestFilesOpen(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestFilesOpen, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakePHFS()
+        self.mock_request.side_effect = self.phfs.request
+        self.content = b''.join([b'%08d' % x for x in range(100000)])
+        self.phfs.put('/data/large.bin', self.content)
+        self.phfs.put('/data/text.txt', 'héllo\nworld\n'.encode())
+
+    def ranges(self, server):
+        return [x[2].get('Range') for x in server.requests if x[0] == 'GET']
+
+    def test_read(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            with self.sdk.files.open('/data/large.bin', readahead=1024) as fh:
+                self.assertTrue(fh.seekable())
+                fh.seek(-8, os.SEEK_END)
+                self.assertEqual(self.content[-8:], fh.read())
+                self.assertEqual(['bytes=799992-799999'], self.ranges(server))
+
+                # small reads are served from the readahead window
+                fh.seek(100)
+                self.assertEqual(self.content[100:110], fh.read(10))
+                self.assertEqual(self.content[110:120], fh.read(10))
+                self.assertEqual('bytes=100-1123', self.ranges(server)[-1])
+                self.assertEqual(2, len(self.ranges(server)))
+
+                # a large read goes into the caller's buffer
+                buffer = bytearray(4096)
+                fh.seek(5000)
+                self.assertEqual(4096, fh.readinto(buffer))
+                self.assertEqual(self.content[5000:9096], bytes(buffer))
+                self.assertEqual('bytes=5000-9095', self.ranges(server)[-1])
+
+            with self.sdk.files.open('data/text.txt', 'r', encoding='utf-8') as fh:
+                self.assertEqual(['héllo\n', 'world\n'], fh.readlines())
+
+            with self.assertRaises(SharedFileException):
+                self.sdk.files.open('/data')
+            with self.assertRaises(SharedFileException):
+                self.sdk.files.open('/data/missing.bin')
+            with self.assertRaises(ValueError):
+                self.sdk.files.open('/data/large.bin', 'a')
+
+    def test_write(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            with self.sdk.files.open('/data/new.bin', 'wb') as fh:
+                for x in range(1000):
+                    fh.write(b'%08d' % x)
+            self.assertEqual(self.content[:8000], self.phfs.objects['/data/new.bin'][0])
+            self.assertEqual('chunked', server.requests[-1][2]['Transfer-Encoding'])
+
+            with self.sdk.files.open('/data/new.txt', 'w', encoding='utf-8') as fh:
+                fh.write('héllo')
+            self.assertEqual('héllo'.encode(), self.phfs.objects['/data/new.txt'][0])
+            self.assertEqual(6, self.sdk.files.stat('/data/new.txt')['size'])
+
+            # the upload is aborted by an exception
+            with self.assertRaises(KeyError):
+                with self.sdk.files.open('/data/aborted.bin', 'wb') as fh:
+                    fh.write(b'x' * (2 * 1024 * 1024))
+                    raise KeyError()
+            self.assertNotIn('/data/aborted.bin', self.phfs.objects)
+
+    def test_write_failure(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, lambda *args: (500, {}, b'error'))
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            fh = self.sdk.files.open('/data/new.bin', 'wb')
+            self.assertIsInstance(fh, io.BufferedWriter)
+            fh.write(b'content')
+            with self.assertRaises(RequestException):
+                fh.close()
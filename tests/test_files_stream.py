@@ -0,0 +1,68 @@
+import io
+import os
+import tempfile
+
+from primehub.utils import SharedFileException
+from tests import BaseTestCase
+from tests.http_server import StandInServer
+from tests.test_files_sync import STORE_PATH, FakePHFS
+
+
+class TestFilesStream(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestFilesStream, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakePHFS()
+        self.mock_request.side_effect = self.phfs.request
+        self.content = os.urandom(3 * 1024 * 1024 + 7)
+        self.phfs.put('/data/blob.bin', self.content)
+
+    def test_cat(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            self.sdk.stdout = io.BytesIO()
+            self.assertIsNone(self.sdk.files.cat('/data/blob.bin'))
+            self.assertEqual(self.content, self.sdk.stdout.getvalue())
+
+            with self.assertRaises(SharedFileException):
+                self.sdk.files.cat('/data')
+
+    def test_cat_retries_transient_failures(self):
+        with StandInServer() as server:
+            failures = [1]
+
+            def handler(method, path, headers, body):
+                if failures[0]:
+                    failures[0] -= 1
+                    return 503, {}, b'Service Unavailable'
+                return self.phfs.handler(method, path, headers, body)
+
+            server.route(STORE_PATH, handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            self.sdk.stdout = io.BytesIO()
+            self.sdk.files.cat('/data/blob.bin')
+            self.assertEqual(self.content, self.sdk.stdout.getvalue())
+            self.assertEqual(2, len(server.requests))
+
+    def test_put(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            self.sdk.stdin = io.BytesIO(self.content)
+            result = self.sdk.files.put('/data/from-stdin.bin', '-')
+            self.assertEqual(dict(success=True, phfs='/data/from-stdin.bin', size=len(self.content)), result)
+            self.assertEqual(self.content, self.phfs.objects['/data/from-stdin.bin'][0])
+
+            fd, src = tempfile.mkstemp()
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(b'local')
+            self.sdk.files.put('data/from-file.txt', src)
+            self.assertEqual(b'local', self.phfs.objects['/data/from-file.txt'][0])
+
+            with self.assertRaises(SharedFileException):
+                self.sdk.files.put('/data/x', os.path.dirname(src))
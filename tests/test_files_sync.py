@@ -0,0 +1,200 @@
+import os
+import re
+import tempfile
+import time
+from urllib.parse import unquote
+
+from primehub.utils import SharedFileException
+from primehub.utils.sync import FileMeta, parse_last_modified, plan_sync
+from tests import BaseTestCase
+from tests.http_server import StandInServer, file_handler
+
+STORE_PATH = '/api/files/groups/phusers'
+
+
+class FakePHFS(object):
+    """
+    An in-memory PHFS, it answers the files queries and the deleteFiles mutation,
+    and serves the store endpoint with a StandInServer route
+    """
+
+    def __init__(self):
+        self.objects = dict()
+
+    def put(self, path: str, content: bytes, last_modified: float = None):
+        self.objects[path] = (content, last_modified if last_modified is not None else time.time())
+
+    def list(self, prefix: str, recursive: bool, limit: int):
+        names = [x[len(prefix):] for x in sorted(self.objects.keys()) if x.startswith(prefix)]
+        if not recursive:
+            names = [x[1:] for x in names if x.startswith('/')] if prefix != '/' else names
+            names = sorted(set([x if '/' not in x else x[:x.index('/') + 1] for x in names]))
+        items = []
+        parent = prefix if recursive else prefix.rstrip('/') + '/'
+        for name in names[:limit]:
+            content, last_modified = self.objects.get(parent + name, (b'', None))
+            items.append({'name': name, 'size': len(content),
+                          'lastModified': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(last_modified))
+                          if last_modified else None})
+        return {'items': items}
+
+    def delete(self, prefix: str, recursive: bool) -> int:
+        deleted = [x for x in self.objects.keys() if (x.startswith(prefix) if recursive else x == prefix)]
+        for x in deleted:
+            del self.objects[x]
+        return len(deleted)
+
+    def request(self, variables, query, *args):
+        if 'where' not in variables:
+            # aliased deleteFiles fields with their own options, or files fields with inline options
+            if 'deleteFiles' in query:
+                return {'data': {k: self.delete('/' + v['phfsPrefix'], variables[f'{k}_options']['recursive'])
+                                 for k, v in variables.items() if not k.endswith('_options')}}
+            recursive = 'recursive: true' in query
+            limit = int(re.search(r'limit: (\d+)', query).group(1))
+            return {'data': {k: self.list(v['phfsPrefix'], recursive, limit) for k, v in variables.items()}}
+        where = variables['where']
+        if 'deleteFiles' in query:
+            return {'data': {'deleteFiles': self.delete('/' + where['phfsPrefix'], variables['options']['recursive'])}}
+        if 'directory' in variables:
+            return {'data': {'directory': self.list(where['phfsPrefix'], False, 1),
+                             'file': self.list(where['phfsPrefix'], True, 1)}}
+        options = variables['options']
+        return {'data': {'files': self.list(where['phfsPrefix'], options['recursive'], options['limit'])}}
+
+    def handler(self, method, path, headers, body):
+        path = unquote(path[len(STORE_PATH):])
+        if method == 'POST':
+            self.put(path, body)
+            return 200, {}, {'success': True}
+        if path not in self.objects:
+            return 404, {}, b'Not Found'
+        return file_handler(self.objects[path][0])(method, path, headers, body)
+
+
+class TestPlanSync(BaseTestCase):
+
+    def test_plan(self):
+        source = dict(a=FileMeta(1, 100), b=FileMeta(1, 100), c=FileMeta(2, 100), d=FileMeta(1, 200))
+        target = dict(b=FileMeta(1, 100), c=FileMeta(1, 100), d=FileMeta(1, 100), e=FileMeta(1, 100))
+
+        plan = plan_sync(source, target)
+        self.assertEqual([('a', 'missing'), ('c', 'size'), ('d', 'newer')], plan.transfers)
+        self.assertEqual(1, plan.unchanged)
+        self.assertEqual([], plan.deletes)
+
+        plan = plan_sync(source, target, delete=True, same_content=lambda x: x == 'b')
+        self.assertEqual([('a', 'missing'), ('c', 'size'), ('d', 'checksum')], plan.transfers)
+        self.assertEqual(['e'], plan.deletes)
+
+    def test_parse_last_modified(self):
+        self.assertEqual(1627547910, parse_last_modified('2021-07-29T08:38:30.000Z'))
+        self.assertEqual(1627547910, parse_last_modified('2021-07-29T08:38:30Z'))
+        self.assertEqual(1627547910, parse_last_modified(1627547910000))
+        self.assertIsNone(parse_last_modified(None))
+        self.assertIsNone(parse_last_modified('yesterday'))
+
+
+class TestFilesSync(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestFilesSync, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakePHFS()
+        self.mock_request.side_effect = self.phfs.request
+
+        self.local = tempfile.mkdtemp()
+        for name in ['a.txt', 'sub/b.txt', 'sub/c.txt']:
+            self.write(name, name)
+
+    def write(self, name, content, mtime=None):
+        path = os.path.join(self.local, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as fh:
+            fh.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def read(self, name):
+        with open(os.path.join(self.local, name)) as fh:
+            return fh.read()
+
+    def test_sync_to_phfs(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            result = self.sdk.files.sync(self.local, 'phfs:///ckpt')
+            self.assertEqual(3, result['files'])
+            self.assertEqual(['/ckpt/a.txt', '/ckpt/sub/b.txt', '/ckpt/sub/c.txt'], sorted(self.phfs.objects.keys()))
+
+            # only the changed files are uploaded
+            self.write('sub/b.txt', 'changed')
+            self.write('d.txt', 'new')
+            os.remove(os.path.join(self.local, 'a.txt'))
+            self.phfs.put('/ckpt/other', b'other', time.time() + 60)
+
+            result = self.sdk.files.sync(self.local, 'phfs:///ckpt', delete=True, dry_run=True)
+            self.assertEqual([dict(path='d.txt', reason='missing'), dict(path='sub/b.txt', reason='size')],
+                             result['transfers'])
+            self.assertEqual(['a.txt', 'other'], result['deletes'])
+            self.assertTrue('/ckpt/a.txt' in self.phfs.objects)
+
+            requests = len(server.requests)
+            self.mock_request.reset_mock()
+            result = self.sdk.files.sync(self.local, 'phfs:///ckpt', delete=True)
+            self.assertEqual(2, result['files'])
+            self.assertEqual(2, len(server.requests) - requests)
+            # the deletes are sent in one mutation
+            self.assertEqual(1, len([x for x in self.mock_request.call_args_list if 'deleteFiles' in x[0][1]]))
+            self.assertEqual(['/ckpt/d.txt', '/ckpt/sub/b.txt', '/ckpt/sub/c.txt'], sorted(self.phfs.objects.keys()))
+            self.assertEqual(b'changed', self.phfs.objects['/ckpt/sub/b.txt'][0])
+
+    def test_sync_from_phfs(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+            now = int(time.time())
+            self.phfs.put('/ckpt/a.txt', b'remote a', now - 60)
+            self.phfs.put('/ckpt/x/y.txt', b'remote y', now - 60)
+
+            dest = tempfile.mkdtemp()
+            result = self.sdk.files.sync('phfs:///ckpt', dest)
+            self.assertEqual(2, result['files'])
+            self.assertEqual(now - 60, os.path.getmtime(os.path.join(dest, 'x', 'y.txt')))
+
+            # nothing changed
+            result = self.sdk.files.sync('phfs:///ckpt', dest)
+            self.assertEqual(0, result['files'])
+            self.assertEqual(2, result['unchanged'])
+
+            # a newer remote file and a local file to delete
+            self.phfs.put('/ckpt/a.txt', b'remote b', now)
+            self.local = dest
+            self.write('extra.txt', 'extra')
+            result = self.sdk.files.sync('phfs:///ckpt', dest, delete=True)
+            self.assertEqual([dict(path='a.txt', reason='newer')], result['transfers'])
+            self.assertEqual('remote b', self.read('a.txt'))
+            self.assertFalse(os.path.exists(os.path.join(dest, 'extra.txt')))
+
+    def test_sync_with_checksum(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+            self.phfs.put('/ckpt/a.txt', b'a.txt', time.time() - 3600)
+            self.phfs.put('/ckpt/sub/b.txt', b'X' * len('sub/b.txt'), time.time() + 3600)
+
+            result = self.sdk.files.sync(self.local, 'phfs:///ckpt', checksum=True, dry_run=True)
+            self.assertEqual([dict(path='sub/b.txt', reason='checksum'), dict(path='sub/c.txt', reason='missing')],
+                             result['transfers'])
+            self.assertEqual(1, result['unchanged'])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(SharedFileException):
+            self.sdk.files.sync(self.local, self.local)
+
+        with self.assertRaises(SharedFileException):
+            self.sdk.files.sync('phfs:///a', 'phfs:///b')
+
+        with self.assertRaises(SharedFileException):
+            self.sdk.files.sync('phfs:///not-exist', self.local)
@@ -0,0 +1,100 @@
+import unittest
+
+from tests import BaseTestCase
+from tests.http_server import StandInServer
+from tests.test_files_sync import STORE_PATH, FakePHFS
+
+try:
+    import fsspec
+    from primehub.filesystem import PrimeHubFileSystem, ReadaheadBlockCache
+except ImportError:
+    fsspec = None
+
+
+class TestReadaheadBlockCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if fsspec is None:
+            self.skipTest('fsspec is not installed')
+        self.data = bytes(range(256)) * 4
+        self.fetches = []
+
+        def fetcher(start, end):
+            self.fetches.append((start, end))
+            return self.data[start:end]
+
+        self.fetcher = fetcher
+
+    def test_random_reads(self):
+        cache = ReadaheadBlockCache(100, self.fetcher, len(self.data), maxblocks=4, readahead=2)
+        self.assertEqual(self.data[950:1024], cache._fetch(950, 2000))
+        # the second block is a sequential read
+        self.assertEqual(self.data[150:250], cache._fetch(150, 250))
+        self.assertEqual([(900, 1000), (1000, 1024), (100, 200), (200, 500)], self.fetches)
+
+        # cached
+        self.assertEqual(self.data[160:240], cache._fetch(160, 240))
+        self.assertEqual(4, len(self.fetches))
+
+    def test_sequential_reads(self):
+        cache = ReadaheadBlockCache(100, self.fetcher, len(self.data), maxblocks=4, readahead=2)
+        data = b''.join([cache._fetch(x, x + 50) for x in range(0, len(self.data), 50)])
+        self.assertEqual(self.data, data)
+        # the blocks are read ahead after the first sequential miss
+        self.assertEqual([(0, 100), (100, 400), (400, 700), (700, 1000), (1000, 1024)], self.fetches)
+        self.assertEqual(4, len(cache.blocks))
+
+
+class TestPrimeHubFileSystem(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestPrimeHubFileSystem, self).setUp()
+        if fsspec is None:
+            self.skipTest('fsspec is not installed')
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakePHFS()
+        self.mock_request.side_effect = self.phfs.request
+        self.content = b''.join([b'%08d' % x for x in range(1000)])
+        self.phfs.put('/data/big.bin', self.content, 1627547910)
+        self.phfs.put('/data/sub/a.txt', b'a')
+        self.fs = PrimeHubFileSystem(self.sdk, block_size=1000, skip_instance_cache=True)
+
+    def test_protocol(self):
+        self.assertEqual('/data/a', PrimeHubFileSystem._strip_protocol('phfs:///data/a/'))
+        self.assertEqual('/data/a', PrimeHubFileSystem._strip_protocol('phfs://data/a'))
+        self.assertEqual('/', PrimeHubFileSystem._strip_protocol('phfs://'))
+
+    def test_ls_and_info(self):
+        self.assertEqual([dict(name='/data/big.bin', size=8000, type='file', mtime=1627547910),
+                          dict(name='/data/sub', size=0, type='directory')], self.fs.ls('phfs:///data'))
+        self.assertEqual(['/data/sub/a.txt'], self.fs.ls('/data/sub/a.txt', detail=False))
+        self.assertEqual('directory', self.fs.info('/data/sub')['type'])
+        self.assertEqual(8000, self.fs.size('phfs:///data/big.bin'))
+        self.assertTrue(self.fs.exists('/data/sub/a.txt'))
+        self.assertFalse(self.fs.exists('/data/missing'))
+        with self.assertRaises(FileNotFoundError):
+            self.fs.ls('/data/missing')
+
+    def test_ranged_reads(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            with self.fs.open('phfs:///data/big.bin') as fh:
+                fh.seek(7000)
+                self.assertEqual(self.content[7000:7016], fh.read(16))
+                self.assertEqual(1, len(server.requests))
+                self.assertEqual('bytes=7000-7999', server.requests[-1][2]['Range'])
+
+                fh.seek(100)
+                self.assertEqual(self.content[100:200], fh.read(100))
+                self.assertEqual(2, len(server.requests))
+
+            self.assertEqual(b'a', self.fs.cat_file('/data/sub/a.txt'))
+
+            # the protocol is registered by the fsspec.specs entry point of the package
+            fsspec.register_implementation('phfs', PrimeHubFileSystem, clobber=True)
+            with fsspec.open('phfs:///data/sub/a.txt', primehub=self.sdk, skip_instance_cache=True) as fh:
+                self.assertEqual(b'a', fh.read())
+            with self.assertRaises(NotImplementedError):
+                self.fs.open('/data/new.txt', 'wb')
@@ -109,6 +109,13 @@ def source_contents():
 
 class GraphQLLint(TestCase):
 
+    def test_queries_are_not_formatted_strings(self):
+        # the formatter checks the string literal of a query, an f-string would be skipped silently
+        for filename, c in source_contents():
+            for node in ast.walk(ast.parse(c)):
+                if isinstance(node, ast.Assign) and getattr(node.targets[0], 'id', None) == 'query':
+                    self.assertNotIsInstance(node.value, ast.JoinedStr, f'{filename}:{node.lineno}')
+
     def test_graphql_lint(self):
         if not is_formatter_available():
             print("GRAPHQL FORMATTER NOT AVAILABLE. (please install prettier first)")
@@ -1,7 +1,18 @@
+import hashlib
+import json
+import os
 from types import GeneratorType
 
-from primehub import Client
+from primehub import Client, PrimeHub, PrimeHubConfig
+from primehub.utils import ResourceNotFoundException, GraphQLException, ResponseException, RequestException, \
+    CircuitBreakerOpenException, TransferVerificationException
+from primehub.utils.download import write_validator
+from primehub.utils.retry import CircuitBreaker, RetryPolicy
 from tests import BaseTestCase
+from tests.http_server import StandInServer, file_handler
+
+# BaseTestCase mocks Client.request, keep the real one to test the request path
+client_request = Client.request
 
 
 class TestHttpRequestLogs(BaseTestCase):
@@ -28,3 +39,374 @@ class TestHttpRequestLogs(BaseTestCase):
         for x in g:
             count = count + 1
         self.assertTrue(count > 1, 'Generator gives lots of lines')
+
+
+class TestHttpTransport(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestHttpTransport, self).setUp()
+
+    def test_connections_are_reused_by_modules(self):
+        with StandInServer() as server:
+            server.route('/api/files', lambda *args: (200, {}, b'content'))
+            dest = self.tempfile()
+
+            self.sdk.files.request_file(server.url + '/api/files/a', dest)
+            self.sdk.jobs.request_file(server.url + '/api/files/b', dest)
+            self.sdk.request_file(server.url + '/api/files/c', dest)
+
+            self.assertEqual(3, len(server.requests))
+            self.assertEqual(1, len(server.connections))
+
+            with open(dest, 'rb') as fh:
+                self.assertEqual(b'content', fh.read())
+
+    def test_close_transport(self):
+        with StandInServer() as server:
+            server.route('/', lambda *args: (200, {}, b''))
+            dest = self.tempfile()
+
+            with self.sdk as sdk:
+                sdk.request_file(server.url + '/a', dest)
+                self.assertFalse(sdk.transport.closed)
+            self.assertTrue(self.sdk.transport.closed)
+
+            # a closed transport opens a new pool for the next request
+            self.sdk.request_file(server.url + '/b', dest)
+            self.assertEqual(2, len(server.connections))
+            self.sdk.close()
+
+    def test_pool_size_from_config(self):
+        cfg = PrimeHubConfig(pool_connections=2, pool_maxsize=32)
+        sdk = PrimeHub(cfg)
+        self.assertEqual(2, sdk.transport.pool_connections)
+        self.assertEqual(32, sdk.transport.pool_maxsize)
+        self.assertIs(sdk.transport, sdk.admin.transport)
+
+
+def graphql_batch_handler(method, path, headers, body):
+    results = []
+    for operation in json.loads(body):
+        job_id = operation['variables']['where']['id']
+        if job_id == 'not-found':
+            results.append({'errors': [{'message': f'phjobs.primehub.io "{job_id}" not found'}]})
+        else:
+            results.append({'data': {'phJob': {'id': job_id}}})
+    return 200, {}, results
+
+
+class TestGraphQLBatch(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestGraphQLBatch, self).setUp()
+        self.query = 'query ($where: PhJobWhereUniqueInput!) { phJob(where: $where) { id } }'
+
+    def test_batch_scope(self):
+        with StandInServer() as server:
+            server.route('/api/graphql', graphql_batch_handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            with self.sdk.batch(max_size=20) as batch:
+                pending = [batch.request({'where': {'id': f'job-{x}'}}, self.query) for x in range(50)]
+                self.assertFalse(pending[0].done())
+
+            self.assertEqual([f'job-{x}' for x in range(50)], [x.result()['data']['phJob']['id'] for x in pending])
+            self.assertEqual(3, len(server.requests))
+            self.assertEqual(1, len(server.connections))
+
+    def test_batch_request_with_error_handler(self):
+        from primehub.jobs import _error_handler
+
+        with StandInServer() as server:
+            server.route('/api/graphql', graphql_batch_handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            results = self.sdk.batch_request([({'where': {'id': 'a'}}, self.query),
+                                              ({'where': {'id': 'b'}}, self.query, _error_handler)])
+            self.assertEqual(['a', 'b'], [x['data']['phJob']['id'] for x in results])
+
+            with self.assertRaises(ResourceNotFoundException):
+                self.sdk.batch_request([({'where': {'id': 'a'}}, self.query),
+                                        ({'where': {'id': 'not-found'}}, self.query, _error_handler)])
+
+            with self.sdk.batch() as batch:
+                ok = batch.request({'where': {'id': 'a'}}, self.query)
+                failed = batch.request({'where': {'id': 'not-found'}}, self.query)
+            self.assertEqual('a', ok.result()['data']['phJob']['id'])
+            self.assertIsInstance(failed.exception(), GraphQLException)
+            self.assertEqual(3, len(server.requests))
+
+    def test_server_without_batch_support(self):
+        with StandInServer() as server:
+            server.route('/api/graphql', lambda *args: (400, {}, {'errors': [{'message': 'bad request'}]}))
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            with self.assertRaises(ResponseException):
+                self.sdk.batch_request([({'where': {'id': 'a'}}, self.query)])
+
+
+def flaky_handler(failures: int):
+    calls = []
+
+    def handler(method, path, headers, body):
+        calls.append(body)
+        if len(calls) <= failures:
+            return 502, {}, b'Bad Gateway'
+        return 200, {}, {'data': {'calls': len(calls)}}
+
+    return handler
+
+
+class TestRetryPolicy(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestRetryPolicy, self).setUp()
+        Client.request = client_request
+        self.query = '{ me { id } }'
+        self.mutation = 'mutation ($data: PhJobCreateInput!) { createPhJob(data: $data) { id } }'
+
+    def create_sdk(self, server, **kwargs):
+        kwargs.setdefault('retry_policy', RetryPolicy(backoff=0.01, max_backoff=0.02))
+        sdk = PrimeHub(PrimeHubConfig(endpoint=server.url + '/api/graphql', **kwargs))
+        return sdk
+
+    def test_retry_queries(self):
+        with StandInServer() as server:
+            server.route('/api/graphql', flaky_handler(2))
+            sdk = self.create_sdk(server)
+            self.assertEqual({'data': {'calls': 3}}, sdk.request({}, self.query))
+
+    def test_give_up_after_max_attempts(self):
+        with StandInServer() as server:
+            server.route('/api/graphql', flaky_handler(10))
+            sdk = self.create_sdk(server, retry_policy=RetryPolicy(max_attempts=3, backoff=0.01))
+            with self.assertRaises(RequestException):
+                sdk.request({}, self.query)
+            self.assertEqual(3, len(server.requests))
+
+    def test_mutations_are_retried_only_when_marked_safe(self):
+        with StandInServer() as server:
+            server.route('/api/graphql', flaky_handler(1))
+            sdk = self.create_sdk(server)
+            with self.assertRaises(RequestException):
+                sdk.request({'data': {}}, self.mutation)
+            self.assertEqual(1, len(server.requests))
+
+        with StandInServer() as server:
+            server.route('/api/graphql', flaky_handler(1))
+            sdk = self.create_sdk(server, retry_policy=RetryPolicy(backoff=0.01, safe_mutations=['createPhJob']))
+            self.assertEqual({'data': {'calls': 2}}, sdk.request({'data': {}}, self.mutation))
+
+    def test_circuit_breaker(self):
+        with StandInServer() as server:
+            server.route('/api/graphql', flaky_handler(100))
+            sdk = self.create_sdk(server, retry_policy=RetryPolicy(max_attempts=1), circuit_breaker_threshold=2,
+                                  circuit_breaker_reset=60)
+            for _ in range(2):
+                with self.assertRaises(RequestException):
+                    sdk.request({}, self.query)
+
+            with self.assertRaises(CircuitBreakerOpenException):
+                sdk.request({}, self.query)
+            self.assertEqual(2, len(server.requests))
+
+            # a success closes the circuit
+            breaker = sdk.transport.circuit_breaker
+            breaker.reset_timeout = 0
+            server.route('/api/graphql', lambda *args: (200, {}, {'data': {}}))
+            sdk.request({}, self.query)
+            self.assertEqual('closed', breaker.state)
+
+    def test_circuit_breaker_counts_requests(self):
+        with StandInServer() as server:
+            server.route('/api/graphql', flaky_handler(100))
+            sdk = self.create_sdk(server, retry_policy=RetryPolicy(max_attempts=3, backoff=0.01),
+                                  circuit_breaker_threshold=2, circuit_breaker_reset=60)
+            with self.assertRaises(RequestException):
+                sdk.request({}, self.query)
+            # the retries of a request are one failure
+            self.assertEqual(3, len(server.requests))
+            self.assertEqual('closed', sdk.transport.circuit_breaker.state)
+
+    def test_circuit_breaker_single_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertEqual('half-open', breaker.state)
+
+        # only one trial request is allowed while half-open
+        breaker.before_request()
+        with self.assertRaises(CircuitBreakerOpenException):
+            breaker.before_request()
+
+        # a failed trial opens the circuit again
+        breaker.reset_timeout = 60
+        breaker.record_failure()
+        self.assertEqual('open', breaker.state)
+        breaker.reset_timeout = 0
+        breaker.before_request()
+        breaker.record_success()
+        self.assertEqual('closed', breaker.state)
+
+    def test_per_operation_timeout(self):
+        cfg = PrimeHubConfig(timeout=5, timeouts={'files': 120})
+        client = Client(cfg)
+        self.assertEqual(5, client.timeout_for(['{ me { id } }']))
+        self.assertEqual(120, client.timeout_for(['query { files(where: {}) { items { name } } }']))
+
+
+class TestRequestFile(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestRequestFile, self).setUp()
+        self.data = os.urandom(100 * 1024)
+
+    def read(self, path):
+        with open(path, 'rb') as fh:
+            return fh.read()
+
+    def test_stream_in_chunks(self):
+        with StandInServer() as server:
+            server.route('/file', file_handler(self.data))
+            dest = self.tempfile()
+            progresses = []
+
+            self.sdk.request_file(server.url + '/file', dest, chunk_size=8192, progress=progresses.append)
+            self.assertEqual(self.data, self.read(dest))
+            self.assertFalse(os.path.exists(dest + '.part'))
+
+            self.assertEqual(len(self.data) // 8192 + 1, len(progresses))
+            self.assertEqual(len(self.data), progresses[-1].transferred)
+            self.assertEqual(len(self.data), progresses[-1].total)
+
+    def test_resume_partial_file(self):
+        with StandInServer() as server:
+            server.route('/file', file_handler(self.data))
+            dest = self.tempfile()
+            with open(dest + '.part', 'wb') as fh:
+                fh.write(self.data[:30000])
+
+            checksum = 'sha256:' + hashlib.sha256(self.data).hexdigest()
+            self.sdk.request_file(server.url + '/file', dest, checksum=checksum, expected_size=len(self.data))
+            self.assertEqual(self.data, self.read(dest))
+            self.assertEqual('bytes=30000-', server.requests[0][2]['Range'])
+
+    def test_resume_complete_file(self):
+        with StandInServer() as server:
+            server.route('/file', file_handler(self.data))
+            dest = self.tempfile()
+            with open(dest + '.part', 'wb') as fh:
+                fh.write(self.data)
+
+            self.sdk.request_file(server.url + '/file', dest)
+            self.assertEqual(self.data, self.read(dest))
+
+    def test_resume_validated_file(self):
+        with StandInServer() as server:
+            server.route('/file', file_handler(self.data, etag='"v1"'))
+            dest = self.tempfile()
+            with open(dest + '.part', 'wb') as fh:
+                fh.write(self.data[:30000])
+            write_validator(dest + '.part.validator', ('ETag', '"v1"'))
+
+            self.sdk.request_file(server.url + '/file', dest)
+            self.assertEqual(self.data, self.read(dest))
+            self.assertEqual('"v1"', server.requests[0][2]['If-Range'])
+            self.assertEqual(1, len(server.requests))
+            self.assertFalse(os.path.exists(dest + '.part.validator'))
+
+    def test_resume_changed_file(self):
+        # the remote file is replaced by one of the same size, with or without If-Range support
+        changed = os.urandom(len(self.data))
+        for if_range in (True, False):
+            with StandInServer() as server:
+                server.route('/file', file_handler(changed, etag='"v2"', if_range=if_range))
+                dest = self.tempfile()
+                with open(dest + '.part', 'wb') as fh:
+                    fh.write(self.data[:30000])
+                write_validator(dest + '.part.validator', ('ETag', '"v1"'))
+
+                self.sdk.request_file(server.url + '/file', dest)
+                self.assertEqual(changed, self.read(dest))
+                self.assertEqual('"v1"', server.requests[0][2]['If-Range'])
+                self.assertFalse(os.path.exists(dest + '.part.validator'))
+
+    def test_server_ignores_range(self):
+        with StandInServer() as server:
+            server.route('/file', file_handler(self.data, accept_ranges=False))
+            dest = self.tempfile()
+            with open(dest + '.part', 'wb') as fh:
+                fh.write(b'x' * 30000)
+
+            self.sdk.request_file(server.url + '/file', dest)
+            self.assertEqual(self.data, self.read(dest))
+
+    def test_verification(self):
+        with StandInServer() as server:
+            server.route('/file', file_handler(self.data))
+            dest = self.tempfile()
+            os.remove(dest)
+
+            with self.assertRaises(TransferVerificationException):
+                self.sdk.request_file(server.url + '/file', dest, checksum='sha256:' + '0' * 64)
+            self.assertFalse(os.path.exists(dest))
+            self.assertFalse(os.path.exists(dest + '.part'))
+
+            with self.assertRaises(TransferVerificationException):
+                self.sdk.request_file(server.url + '/file', dest, expected_size=1)
+
+    def test_not_found(self):
+        with StandInServer() as server:
+            dest = self.tempfile()
+            with self.assertRaises(ResourceNotFoundException):
+                self.sdk.request_file(server.url + '/file', dest)
+
+    def test_parallel_ranges(self):
+        with StandInServer() as server:
+            server.route('/file', file_handler(self.data))
+            dest = self.tempfile()
+            progresses = []
+
+            checksum = 'sha256:' + hashlib.sha256(self.data).hexdigest()
+            self.sdk.request_file(server.url + '/file', dest, checksum=checksum, connections=4, part_size=16 * 1024,
+                                  progress=progresses.append)
+            self.assertEqual(self.data, self.read(dest))
+            self.assertFalse(os.path.exists(dest + '.part'))
+            self.assertEqual(len(self.data), progresses[-1].transferred)
+
+            # a probe and 7 ranges
+            ranges = sorted([x[2]['Range'] for x in server.requests])
+            self.assertEqual(8, len(ranges))
+            self.assertIn('bytes=0-0', ranges)
+            self.assertIn('bytes=98304-102399', ranges)
+
+    def test_parallel_ranges_fallback(self):
+        with StandInServer() as server:
+            server.route('/file', file_handler(self.data, accept_ranges=False))
+            dest = self.tempfile()
+            self.sdk.request_file(server.url + '/file', dest, connections=4, part_size=16 * 1024)
+            self.assertEqual(self.data, self.read(dest))
+            self.assertEqual(2, len(server.requests))
+
+        with StandInServer() as server:
+            # a small file is downloaded in a single stream
+            server.route('/file', file_handler(self.data))
+            self.sdk.request_file(server.url + '/file', dest, connections=4)
+            self.assertEqual(self.data, self.read(dest))
+            self.assertEqual(2, len(server.requests))
+
+    def test_parallel_ranges_failure(self):
+        with StandInServer() as server:
+            handler = file_handler(self.data)
+
+            def flaky(method, path, headers, body):
+                if headers.get('Range') == 'bytes=32768-49151':
+                    return 500, {}, b'error'
+                return handler(method, path, headers, body)
+
+            server.route('/file', flaky)
+            dest = self.tempfile()
+            os.remove(dest)
+            with self.assertRaises(RequestException):
+                self.sdk.request_file(server.url + '/file', dest, connections=4, part_size=16 * 1024)
+            self.assertFalse(os.path.exists(dest))
+            self.assertFalse(os.path.exists(dest + '.part'))
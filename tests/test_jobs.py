@@ -1,6 +1,6 @@
 from primehub.jobs import verify_basic_field, verify_timeout
 from primehub.jobs import invalid_config
-from primehub.utils import PrimeHubException
+from primehub.utils import PrimeHubException, GraphQLException, PartialResultException
 from tests import BaseTestCase
 
 
@@ -56,3 +56,79 @@ class TestJobs(BaseTestCase):
                              verify_timeout)
 
         verify_timeout({'activeDeadlineSeconds': 86400})
+
+
+def aliased_request_side_effect(variables, query, error_handler=None):
+    # answer the aliased documents, a job with the id "missing" does not exist, the job "gone" is null
+    data, errors = dict(), []
+    for alias, where in variables.items():
+        if where['id'] == 'gone':
+            data[alias] = None
+        elif where['id'] == 'missing':
+            data[alias] = None
+            errors.append({'message': 'phjobs.primehub.io "missing" not found', 'path': [alias]})
+        elif alias.startswith('c'):
+            data[alias] = {'id': where['id']}
+        else:
+            data[alias] = {'id': where['id'], 'phase': 'Cancelled', 'schedule': None}
+    result = {'data': data}
+    if errors:
+        result['errors'] = errors
+        raise GraphQLException(result)
+    return result
+
+
+class TestJobsMultiGet(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestJobsMultiGet, self).setUp()
+        self.mock_request.side_effect = aliased_request_side_effect
+
+    def test_get_many(self):
+        ids = [f'job-{x}' for x in range(120)]
+        jobs = self.sdk.jobs.get_many(ids)
+
+        self.assertEqual(ids, list(jobs.keys()))
+        self.assertNotIn('schedule', jobs['job-7'])
+        self.assertEqual(3, self.mock_request.call_count)
+
+        variables, query = self.mock_request.call_args[0][:2]
+        self.assertIn('j19: phJob(where: $j19)', query)
+        self.assertEqual({'id': 'job-119'}, variables['j19'])
+
+    def test_get_many_with_partial_errors(self):
+        with self.assertRaises(PartialResultException) as e:
+            self.sdk.jobs.get_many(['job-a', 'missing', 'job-b'])
+
+        jobs, errors = e.exception.args
+        self.assertEqual(['job-a', 'job-b'], list(jobs.keys()))
+        self.assertEqual({'missing': ['phjobs.primehub.io "missing" not found']}, errors)
+
+    def test_get_many_with_null_results(self):
+        for get_many in [self.sdk.jobs.get_many, self.sdk.deployments.get_many]:
+            with self.assertRaises(PartialResultException) as e:
+                get_many(['job-a', 'gone'])
+
+            items, errors = e.exception.args
+            self.assertEqual(['job-a'], list(items.keys()))
+            self.assertEqual(['gone'], list(errors.keys()))
+            self.assertIn('Cannot find', errors['gone'][0])
+
+    def test_cancel_many(self):
+        jobs = self.sdk.jobs.cancel_many(['job-a', 'job-b'])
+        self.assertEqual(['Cancelled', 'Cancelled'], [x['phase'] for x in jobs.values()])
+        self.assertEqual(2, self.mock_request.call_count)
+        self.assertIn('c1: cancelPhJob(where: $c1)', self.mock_request.call_args_list[0][0][1])
+
+        with self.assertRaises(PartialResultException) as e:
+            self.sdk.jobs.cancel_many(['job-a', 'missing'])
+        self.assertEqual(['job-a'], list(e.exception.args[0].keys()))
+        self.assertEqual(['missing'], list(e.exception.args[1].keys()))
+
+    def test_errors_without_alias_path(self):
+        def side_effect(variables, query, error_handler=None):
+            raise GraphQLException({'errors': [{'message': 'Syntax Error'}]})
+
+        self.mock_request.side_effect = side_effect
+        with self.assertRaises(GraphQLException):
+            self.sdk.jobs.get_many(['job-a'])
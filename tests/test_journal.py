@@ -0,0 +1,158 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from primehub.utils import PartialResultException
+from primehub.utils.journal import DOWNLOAD_JOURNAL_NAME, TransferJournal, upload_journal_path
+from tests import BaseTestCase
+from tests.http_server import StandInServer
+from tests.test_files_sync import STORE_PATH, FakePHFS
+
+
+class TestTransferJournal(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestTransferJournal, self).setUp()
+        self.path = os.path.join(tempfile.mkdtemp(), 'journal')
+
+    def records(self):
+        with open(self.path) as fh:
+            return [json.loads(x) for x in fh]
+
+    def test_replay_pending_files(self):
+        journal = TransferJournal(self.path).open()
+        for x in 'abc':
+            journal.plan(x, x.upper())
+        journal.finish_plan()
+        journal.finish('b', 'B')
+        journal.close()
+
+        journal = TransferJournal(self.path).open(resume=True)
+        self.assertTrue(journal.planned)
+        self.assertEqual([('a', 'A'), ('c', 'C')], list(journal.pending()))
+        journal.finish('a', 'A')
+        journal.finish('c', 'C')
+        journal.close(completed=True)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_interrupted_planning(self):
+        journal = TransferJournal(self.path).open()
+        journal.plan('a', 'A')
+        journal.plan('b', 'B')
+        journal.finish('a', 'A')
+        journal.close()
+
+        # the files will be listed again, only the done records are kept
+        journal = TransferJournal(self.path).open(resume=True)
+        self.assertFalse(journal.planned)
+        self.assertTrue(journal.is_done('a', 'A'))
+        journal.close()
+        self.assertEqual([dict(type='done', src='a', dst='A')], self.records())
+
+    def test_torn_line(self):
+        journal = TransferJournal(self.path).open()
+        journal.plan('a', 'A')
+        journal.plan('b', 'B')
+        journal.finish_plan()
+        journal.close()
+        with open(self.path, 'a') as fh:
+            fh.write('{"type": "done", "src": "a", ')
+
+        journal = TransferJournal(self.path).open(resume=True)
+        journal.finish('b', 'B')
+        journal.close()
+
+        journal = TransferJournal(self.path).open(resume=True)
+        self.assertEqual([('a', 'A')], list(journal.pending()))
+        journal.close()
+
+    def test_start_over_without_resume(self):
+        journal = TransferJournal(self.path).open()
+        journal.plan('a', 'A')
+        journal.finish_plan()
+        journal.close()
+
+        journal = TransferJournal(self.path).open()
+        self.assertFalse(journal.planned)
+        journal.close()
+        self.assertEqual([], self.records())
+
+
+class TestResumeTransfers(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestResumeTransfers, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakePHFS()
+        self.mock_request.side_effect = self.phfs.request
+        for x in range(5):
+            self.phfs.put(f'/data/{x}.txt', str(x).encode())
+
+    def test_resume_download(self):
+        with StandInServer() as server:
+            broken = set(['/data/1.txt', '/data/3.txt'])
+
+            def handler(method, path, headers, body):
+                if path[len(STORE_PATH):] in broken:
+                    return 403, {}, b'Forbidden'
+                return self.phfs.handler(method, path, headers, body)
+
+            server.route(STORE_PATH, handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            dest = tempfile.mkdtemp()
+            with self.assertRaises(PartialResultException):
+                self.sdk.files.download('/data', dest, recursive=True)
+            journal_path = os.path.join(dest, DOWNLOAD_JOURNAL_NAME)
+            self.assertTrue(os.path.exists(journal_path))
+
+            # the planned files are replayed without listing again
+            broken.clear()
+            requests = len(server.requests)
+            queries = self.mock_request.call_count
+            report = self.sdk.files.download('/data', dest, recursive=True, resume=True)
+            self.assertEqual(2, report['files'])
+            self.assertEqual(2, len(server.requests) - requests)
+            self.assertEqual(queries, self.mock_request.call_count)
+            self.assertFalse(os.path.exists(journal_path))
+            self.assertEqual(['0.txt', '1.txt', '2.txt', '3.txt', '4.txt'],
+                             sorted(os.listdir(os.path.join(dest, 'data'))))
+
+    def test_download_single_file_recursively(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            dest = os.path.join(tempfile.mkdtemp(), 'out.txt')
+            report = self.sdk.files.download('/data/1.txt', dest, recursive=True)
+            self.assertEqual(1, report['files'])
+            self.assertTrue(os.path.isfile(dest))
+            with open(dest) as fh:
+                self.assertEqual('1', fh.read())
+
+    @mock.patch('primehub.utils.journal.UPLOAD_JOURNAL_DIR', tempfile.mkdtemp())
+    def test_resume_upload(self):
+        src = tempfile.mkdtemp()
+        for x in range(4):
+            with open(os.path.join(src, f'{x}.txt'), 'w') as fh:
+                fh.write(str(x))
+
+        with StandInServer() as server:
+            server.route(STORE_PATH, lambda *args: (200, {}, {'success': True}))
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            # an interrupted upload: the journal has planned all files and finished one
+            scope = self.sdk.files._upload_index_scope()
+            dst = os.path.join('/up', os.path.basename(src))
+            journal = TransferJournal(upload_journal_path(scope, src, '/up')).open()
+            for x in range(4):
+                journal.plan(os.path.join(src, f'{x}.txt'), f'{dst}/{x}.txt')
+            journal.finish_plan()
+            journal.finish(os.path.join(src, '0.txt'), f'{dst}/0.txt')
+            journal.close()
+
+            result = self.sdk.files.upload(src, '/up', recursive=True, resume=True)
+            self.assertEqual(3, len(result))
+            self.assertEqual(3, len(server.requests))
+            self.assertFalse(os.path.exists(journal.path))
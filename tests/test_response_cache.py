@@ -0,0 +1,149 @@
+import tempfile
+import time
+from unittest import mock
+
+from primehub import PrimeHub, PrimeHubConfig
+from primehub.utils.cache import ResponseCache, mutation_entity
+from primehub.utils.graphql import root_fields
+from primehub.utils.http_client import Client
+from tests import BaseTestCase
+
+# BaseTestCase mocks Client.request, keep the real one to test the cache in the request path
+client_request = Client.request
+
+me_query = """
+{
+  me {
+    effectiveGroups {
+      name
+    }
+  }
+}
+"""
+
+job_query = """
+query ($where: PhJobWhereUniqueInput!) {
+  phJob(where: $where) {
+    id
+  }
+}
+"""
+
+
+class TestResponseCache(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestResponseCache, self).setUp()
+        Client.request = client_request
+        self.counter = 0
+
+        def fake_request(variables, query, error_handler=None):
+            self.counter = self.counter + 1
+            return {'data': {'counter': self.counter}}
+
+        self.patcher = mock.patch.object(Client, '_request', side_effect=fake_request)
+        self.mock_send = self.patcher.start()
+
+    def tearDown(self) -> None:
+        super(TestResponseCache, self).tearDown()
+        self.patcher.stop()
+
+    def test_cache_is_opt_in(self):
+        self.sdk.request({}, me_query)
+        self.sdk.request({}, me_query)
+        self.assertEqual(2, self.mock_send.call_count)
+
+    def test_memory_cache(self):
+        cache = self.sdk.enable_response_cache()
+
+        self.assertEqual(1, self.sdk.request({}, me_query)['data']['counter'])
+        self.assertEqual(1, self.sdk.request({}, me_query)['data']['counter'])
+        self.assertEqual(1, self.mock_send.call_count)
+
+        # the query without a ttl is not cached
+        self.sdk.request({'where': {'id': 'a'}}, job_query)
+        self.sdk.request({'where': {'id': 'a'}}, job_query)
+        self.assertEqual(3, self.mock_send.call_count)
+        self.assertEqual(1, cache.stats['hits'])
+        self.assertEqual(1, cache.stats['misses'])
+
+        # the results are copies
+        result = self.sdk.request({}, me_query)
+        result['data']['counter'] = 'changed'
+        self.assertEqual(1, self.sdk.request({}, me_query)['data']['counter'])
+
+    def test_per_operation_ttl_and_lru(self):
+        cache = self.sdk.enable_response_cache(ttls={'phJob': 60}, max_entries=2)
+        for job_id in ['a', 'b', 'c', 'a']:
+            self.sdk.request({'where': {'id': job_id}}, job_query)
+
+        # the me query has no ttl and "a" was evicted by "c"
+        self.assertEqual(4, self.mock_send.call_count)
+        self.assertEqual(2, cache.stats['evictions'])
+
+    def test_mutation_invalidates_affected_entries(self):
+        cache = self.sdk.enable_response_cache(ttls={'me': 60, 'phJob': 60})
+        self.sdk.request({}, me_query)
+        self.sdk.request({'where': {'id': 'a'}}, job_query)
+
+        self.sdk.request({'where': {'id': 'a'}}, 'mutation ($where: PhJobWhereUniqueInput!) { '
+                                                 'cancelPhJob(where: $where) { id } }')
+        self.assertEqual(1, cache.stats['invalidations'])
+
+        self.sdk.request({}, me_query)
+        self.assertEqual(1, cache.stats['hits'])
+
+        self.sdk.request({}, 'mutation { updateImage(where: {id: "a"}, data: {}) { id } }')
+        self.assertEqual(0, cache.stats['entries'])
+
+    def test_batched_mutation_invalidates_affected_entries(self):
+        cache = self.sdk.enable_response_cache(ttls={'me': 60, 'phJob': 60})
+        self.sdk.request({'where': {'id': 'a'}}, job_query)
+        self.assertEqual(1, cache.stats['entries'])
+
+        mutation = 'mutation ($where: PhJobWhereUniqueInput!) { cancelPhJob(where: $where) { id } }'
+        with mock.patch.object(Client, '_post', return_value='[{"data": {}}, {"data": {}}]'):
+            with self.sdk.batch() as batch:
+                batch.request({}, me_query)
+                batch.request({'where': {'id': 'a'}}, mutation)
+        self.assertEqual(1, cache.stats['invalidations'])
+        self.assertEqual(0, cache.stats['entries'])
+
+    def test_stale_while_revalidate(self):
+        cache = self.sdk.enable_response_cache(ttls={'me': 0.05}, stale_ttl=60)
+        self.assertEqual(1, self.sdk.request({}, me_query)['data']['counter'])
+        time.sleep(0.1)
+
+        # serve the stale result and refresh it in the background
+        self.assertEqual(1, self.sdk.request({}, me_query)['data']['counter'])
+        for _ in range(100):
+            if self.mock_send.call_count == 2 and not cache._revalidating:
+                break
+            time.sleep(0.01)
+        self.assertEqual(2, self.sdk.request({}, me_query)['data']['counter'])
+        self.assertEqual(1, cache.stats['stale_hits'])
+
+    def test_disk_cache_shared_by_processes(self):
+        cache_dir = tempfile.mkdtemp()
+        self.sdk.enable_response_cache(cache_dir=cache_dir)
+        self.sdk.request({}, me_query)
+
+        another = PrimeHub(PrimeHubConfig())
+        another_cache = another.enable_response_cache(cache_dir=cache_dir)
+        self.assertEqual(1, another.request({}, me_query)['data']['counter'])
+        self.assertEqual(1, self.mock_send.call_count)
+        self.assertEqual(1, another_cache.stats['hits'])
+
+        # the invalidation also removes the disk entries
+        another.request({}, 'mutation { createGroup(data: {}) { id } }')
+        third = PrimeHub(PrimeHubConfig())
+        third.enable_response_cache(cache_dir=cache_dir)
+        third.request({}, me_query)
+        self.assertEqual(3, self.mock_send.call_count)
+
+    def test_helpers(self):
+        self.assertEqual(['me'], root_fields(me_query))
+        self.assertEqual('phjob', mutation_entity('cancelPhJob'))
+        self.assertEqual('file', mutation_entity('deleteFiles'))
+        self.assertEqual(ResponseCache.key('s', {'a': 1}, 'query { a }'),
+                         ResponseCache.key('s', {'a': 1}, 'query {\n  a\n}'))
@@ -0,0 +1,111 @@
+import io
+import os
+import tempfile
+
+from primehub.utils import SharedFileException
+from primehub.utils.shards import ShardReader, parse_size, plan_shards, sample_key, write_shard
+from tests import BaseTestCase
+from tests.http_server import StandInServer
+from tests.test_dataset_cache import FakeDatasetPHFS
+from tests.test_files_sync import STORE_PATH
+
+
+class TestShards(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestShards, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakeDatasetPHFS()
+        self.mock_request.side_effect = self.phfs.request
+        self.phfs.put('/datasets/mnist/.dataset', b'{}')
+
+        self.src = os.path.join(tempfile.mkdtemp(), 'train')
+        os.makedirs(os.path.join(self.src, 'sub'))
+        self.contents = dict()
+        for x in range(20):
+            for ext, content in (('jpg', os.urandom(300 + x)), ('cls', b'%d' % (x % 10))):
+                name = f'{x:04d}.{ext}' if x % 2 else f'sub/{x:04d}.{ext}'
+                self.contents[name] = content
+                with open(os.path.join(self.src, name), 'wb') as fh:
+                    fh.write(content)
+
+    def test_parse_size(self):
+        self.assertEqual(100, parse_size(100))
+        self.assertEqual(100, parse_size('100'))
+        self.assertEqual(512 * 1024, parse_size('512K'))
+        self.assertEqual(256 * 1024 * 1024, parse_size('256MB'))
+        self.assertEqual(1024 ** 3, parse_size('1GiB'))
+        with self.assertRaises(ValueError):
+            parse_size('1PB')
+
+    def test_plan_shards(self):
+        self.assertEqual('train/0001', sample_key('train/0001.seg.png'))
+        self.assertEqual('a.b/.hidden', sample_key('a.b/.hidden'))
+
+        members = [('/x/' + n, n, 1000) for n in ['b.jpg', 'a.jpg', 'a.cls', 'c.jpg', 'b.cls']]
+        shards = plan_shards(members, 1000)
+        # the files of a sample stay in one shard
+        self.assertEqual([['a.cls', 'a.jpg'], ['b.cls', 'b.jpg'], ['c.jpg']], [[x[1] for x in s] for s in shards])
+        self.assertEqual(1, len(plan_shards(members, 1024 * 1024)))
+
+    def test_write_shard(self):
+        members = [(os.path.join(self.src, n), n, len(c)) for n, c in sorted(self.contents.items())]
+        buffer = io.BytesIO()
+        index = write_shard(buffer, members)
+        data = buffer.getvalue()
+        for item in index:
+            self.assertEqual(self.contents[item['name']], data[item['offset']:item['offset'] + item['size']])
+
+    def test_upload_and_read(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            result = self.sdk.datasets.files_upload('mnist', self.src, '/', recursive=True, shard_size='8K')
+            uploads = [x[1][len(STORE_PATH):] for x in server.requests if x[0] == 'POST']
+            self.assertEqual(len(result), len(uploads))
+            self.assertEqual('/datasets/mnist/train/shards.jsonl', uploads[-1])
+            self.assertLess(len(uploads), len(self.contents) / 4)
+
+            reader = self.sdk.datasets.open_shards('mnist', '/train')
+            self.assertEqual(sorted(self.contents.keys()), sorted([x['name'] for x in reader.members()]))
+            self.assertEqual(self.contents, dict(reader))
+
+            # a member is read with a range request
+            server.requests.clear()
+            self.assertEqual(self.contents['sub/0004.jpg'], reader.read('sub/0004.jpg'))
+            self.assertEqual(1, len(server.requests))
+            with self.assertRaises(KeyError):
+                reader.read('missing')
+
+            with self.assertRaises(SharedFileException) as e:
+                self.sdk.datasets.open_shards('mnist', '/sub')
+            self.assertEqual('No shards in /sub', str(e.exception))
+
+            with self.assertRaises(SharedFileException):
+                self.sdk.files.upload(os.path.join(self.src, '0001.jpg'), '/x', shard_size=100)
+
+    def test_upload_with_filter(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            skipped = []
+
+            def filter_func(target: str):
+                if target.startswith('/datasets/mnist/train/sub/'):
+                    skipped.append(target)
+                    return True
+                return False
+
+            self.sdk.files.upload(self.src, '/datasets/mnist', recursive=True, shard_size='8K', filter_func=filter_func)
+            self.assertEqual(len([x for x in self.contents if x.startswith('sub/')]), len(skipped))
+
+            reader = self.sdk.datasets.open_shards('mnist', '/train')
+            self.assertEqual(sorted([x for x in self.contents if not x.startswith('sub/')]),
+                             sorted([x['name'] for x in reader.members()]))
+
+    def test_manifest(self):
+        content = b'{"name": "shard-000000.tar", "size": 1, "members": []}\n\n'
+        self.assertEqual([{'name': 'shard-000000.tar', 'size': 1, 'members': []}],
+                         ShardReader.parse_manifest(content))
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import time
+
+from primehub.utils import SharedFileException
+from primehub.utils.snapshot import diff_entries, read_snapshot, read_snapshot_header, write_snapshot
+from primehub.utils.sync import FileMeta
+from tests import BaseTestCase
+from tests.test_dataset_cache import FakeDatasetPHFS
+
+
+class TestSnapshot(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestSnapshot, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakeDatasetPHFS()
+        self.mock_request.side_effect = self.phfs.request
+        self.now = int(time.time())
+        self.phfs.put('/datasets/mnist/.dataset', b'{}')
+        self.phfs.put('/datasets/mnist/train/a.bin', b'a' * 10, self.now)
+        self.phfs.put('/datasets/mnist/train/b.bin', b'b' * 20, self.now)
+        self.phfs.put('/datasets/mnist/labels.csv', b'x,y\n', self.now)
+        self.workdir = tempfile.mkdtemp()
+
+    def test_diff_entries(self):
+        base = [('a', FileMeta(1, 100)), ('b', FileMeta(1, 100)), ('c', FileMeta(1, 100)), ('d', FileMeta(1, 100))]
+        target = [('b', FileMeta(2, 100)), ('c', FileMeta(1, 100.5)), ('d', FileMeta(1, 200)), ('e', FileMeta(1, 100))]
+        self.assertEqual([('a', 'removed'), ('b', 'modified'), ('d', 'modified'), ('e', 'added')],
+                         list(diff_entries(iter(base), iter(target))))
+        self.assertEqual([], list(diff_entries([], [])))
+
+    def test_write_and_read(self):
+        path = os.path.join(self.workdir, 'x.snapshot.gz')
+        entries = [('b', FileMeta(2, 1.5)), ('a', FileMeta(1, None))]
+        self.assertEqual(2, write_snapshot(path, dict(dataset='x'), entries))
+        self.assertEqual('x', read_snapshot_header(path)['dataset'])
+        self.assertEqual([('a', 1, None), ('b', 2, 1.5)], [(n, m.size, m.mtime) for n, m in read_snapshot(path)])
+
+    def test_snapshot_and_diff(self):
+        first = os.path.join(self.workdir, 'first.snapshot.gz')
+        result = self.sdk.datasets.snapshot('mnist', output=first)
+        self.assertEqual(3, result['files'])
+        self.assertEqual(first, result['path'])
+        self.assertEqual(['labels.csv', 'train/a.bin', 'train/b.bin'], [x[0] for x in read_snapshot(first)])
+
+        self.phfs.put('/datasets/mnist/train/a.bin', b'A' * 10, self.now + 60)
+        self.phfs.put('/datasets/mnist/train/c.bin', b'c', self.now)
+        del self.phfs.objects['/datasets/mnist/labels.csv']
+        second = os.path.join(self.workdir, 'second.snapshot.gz')
+        self.sdk.datasets.snapshot('mnist', output=second)
+
+        self.assertEqual({'added': ['train/c.bin'], 'removed': ['labels.csv'], 'modified': ['train/a.bin']},
+                         self.sdk.datasets.diff(first, second))
+
+        # a snapshot against a local directory
+        local = os.path.join(self.workdir, 'local')
+        os.makedirs(os.path.join(local, 'train'))
+        for name, content in (('train/a.bin', b'a' * 10), ('train/b.bin', b'b' * 21), ('new.txt', b'')):
+            with open(os.path.join(local, name), 'wb') as fh:
+                fh.write(content)
+            os.utime(os.path.join(local, name), (self.now, self.now))
+        self.assertEqual({'added': ['new.txt'], 'removed': ['labels.csv'], 'modified': ['train/b.bin']},
+                         self.sdk.datasets.diff(first, local))
+
+        with self.assertRaises(SharedFileException):
+            self.sdk.datasets.diff(first, os.path.join(self.workdir, 'missing'))
+        with self.assertRaises(SharedFileException):
+            self.sdk.datasets.snapshot('no-such-dataset')
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import threading
+
+from primehub.utils import PartialResultException, RequestException, ResourceNotFoundException
+from primehub.utils.transfer import TransferManager, TransferTask
+from tests import BaseTestCase
+from tests.http_server import StandInServer
+from tests.test_files import mock_request_side_effect
+
+
+class TestTransferManager(BaseTestCase):
+
+    def tasks(self, count):
+        return [TransferTask(f'/src/{x}', f'/dst/{x}', size=x) for x in range(count)]
+
+    def test_transfer_concurrently(self):
+        threads = set()
+        lock = threading.Lock()
+
+        def func(task):
+            with lock:
+                threads.add(threading.current_thread().name)
+            return task.src
+
+        report = TransferManager(parallel=4).run(self.tasks(100), func, keep_results=True)
+        self.assertEqual(100, report.files)
+        self.assertEqual(sum(range(100)), report.bytes)
+        self.assertEqual([f'/src/{x}' for x in range(100)], report.ordered_results())
+        self.assertTrue(len(threads) > 1)
+        self.assertTrue(all([x.startswith('primehub-transfer') for x in threads]))
+
+    def test_consume_tasks_lazily(self):
+        lock = threading.Lock()
+        counter = dict(produced=0, finished=0, max_pending=0)
+
+        def tasks():
+            for task in self.tasks(50):
+                with lock:
+                    counter['produced'] += 1
+                    counter['max_pending'] = max(counter['max_pending'], counter['produced'] - counter['finished'])
+                yield task
+
+        def func(task):
+            with lock:
+                counter['finished'] += 1
+
+        TransferManager(parallel=2).run(tasks(), func)
+        # the work queue holds at most parallel * 2 tasks, plus the one taken by each worker and the one put next
+        self.assertTrue(counter['max_pending'] <= 2 * 2 + 2 + 1)
+
+    def test_retries_and_failures(self):
+        attempts = dict()
+
+        def func(task):
+            attempts[task.src] = attempts.get(task.src, 0) + 1
+            if task.src == '/src/1' and attempts[task.src] < 3:
+                raise RequestException('flaky')
+            if task.src == '/src/2':
+                raise RequestException('broken')
+            if task.src == '/src/3':
+                raise ResourceNotFoundException('file', task.src, 'path')
+
+        report = TransferManager(parallel=2, max_attempts=3, backoff=0).run(self.tasks(5), func)
+        self.assertEqual(3, report.files)
+        self.assertEqual(3, attempts['/src/1'])
+        self.assertEqual(3, attempts['/src/2'])
+        self.assertEqual(1, attempts['/src/3'])
+        self.assertEqual(['/src/2', '/src/3'], sorted([t.src for t, e in report.failures]))
+
+        failures = report.to_dict()['failures']
+        self.assertEqual(2, len(failures))
+        self.assertIn('broken', [x['message'] for x in failures])
+
+        # the client retries the requests, a task is attempted once by default
+        attempts.clear()
+        TransferManager(parallel=2).run(self.tasks(3), func)
+        self.assertEqual(1, attempts['/src/2'])
+
+    def test_worker_errors_stop_the_transfers(self):
+        transferred = []
+
+        def progress(report):
+            if report.files == 3:
+                raise KeyboardInterrupt()
+
+        report = TransferManager(parallel=2, progress=progress).run(self.tasks(1000), transferred.append)
+        self.assertEqual(1, len([e for t, e in report.failures if isinstance(e, KeyboardInterrupt)]))
+        # the producer stops instead of blocking on the full queue
+        self.assertLess(len(transferred), 100)
+
+
+class TestFilesTransfer(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestFilesTransfer, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.mock_request.side_effect = mock_request_side_effect
+
+    def test_download_in_parallel(self):
+        with StandInServer() as server:
+            server.route('/api/files/groups/phusers', lambda m, path, h, b: (200, {}, path.encode()))
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            dest = tempfile.mkdtemp()
+            report = self.sdk.files.download('/deep', dest, recursive=True, parallel=3)
+            self.assertEqual(3, report['files'])
+            self.assertEqual([], report['failures'])
+
+            with open(os.path.join(dest, 'deep', 'sub', 'path', 'l3.csv')) as fh:
+                self.assertEqual('/api/files/groups/phusers/deep/sub/path/l3.csv', fh.read())
+
+    def test_download_failures(self):
+        with StandInServer() as server:
+            def handler(method, path, headers, body):
+                if path.endswith('l1.csv'):
+                    return 403, {}, b'Forbidden'
+                return 200, {}, b'content'
+
+            server.route('/api/files/groups/phusers', handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            dest = tempfile.mkdtemp()
+            with self.assertRaises(PartialResultException) as e:
+                self.sdk.files.download('/deep', dest, recursive=True, parallel=2)
+            report, errors = e.exception.args
+            self.assertEqual(2, report['files'])
+            self.assertEqual(['/deep/l1.csv'], list(errors.keys()))
+
+            # a single file raises its own error
+            with self.assertRaises(RequestException):
+                self.sdk.files.download('/deep/l1.csv', dest)
+
+    def test_upload_in_parallel(self):
+        src = tempfile.mkdtemp()
+        for x in range(10):
+            with open(os.path.join(src, f'{x}.txt'), 'w') as fh:
+                fh.write(str(x))
+
+        with StandInServer() as server:
+            server.route('/api/files/groups/phusers', lambda *args: (200, {}, {'success': True}))
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            result = self.sdk.files.upload(src, '/data', recursive=True, parallel=4)
+            self.assertEqual(10, len(result))
+            self.assertTrue(all([x['success'] for x in result]))
+            self.assertEqual(10, len([x for x in server.requests if x[0] == 'POST']))
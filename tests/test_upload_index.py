@@ -0,0 +1,108 @@
+import os
+import tempfile
+import time
+
+from primehub.utils.upload_index import UploadIndex, hash_file
+from tests import BaseTestCase
+from tests.http_server import StandInServer
+from tests.test_files_sync import STORE_PATH, FakePHFS
+
+
+class TestUploadIndex(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestUploadIndex, self).setUp()
+        self.index = UploadIndex(os.path.join(tempfile.mkdtemp(), 'sub', 'index.db'), hash_workers=1)
+
+    def tearDown(self) -> None:
+        super(TestUploadIndex, self).tearDown()
+        self.index.close()
+
+    def test_record_and_forget(self):
+        self.assertIsNone(self.index.lookup('s', '/a'))
+        for path in ['/a', '/a/b', '/a/c/d', '/a_b', '/ab']:
+            self.index.record('s', path, 'digest', 1, 2.0)
+        self.index.record('other', '/a/b', 'digest', 1, 2.0)
+        self.assertEqual(('digest', 1, 2.0), self.index.lookup('s', '/a/b'))
+
+        # a directory prefix keeps the object with the same name
+        self.index.forget('s', '/a/')
+        paths = ['/a', '/a/b', '/a/c/d', '/a_b', '/ab']
+        self.assertEqual(['/a', '/a_b', '/ab'], [x for x in paths if self.index.lookup('s', x)])
+        self.assertIsNotNone(self.index.lookup('other', '/a/b'))
+
+        self.index.forget('s', '/a')
+        self.assertIsNone(self.index.lookup('s', '/a'))
+        self.assertIsNotNone(self.index.lookup('s', '/ab'))
+
+        self.index.forget('s', '/')
+        self.assertIsNone(self.index.lookup('s', '/ab'))
+
+    def test_is_unchanged(self):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as fh:
+            fh.write('content')
+        st = os.stat(path)
+
+        self.assertEqual((False, None), self.index.is_unchanged('s', '/a', path))
+        self.index.record('s', '/a', hash_file(path), st.st_size, st.st_mtime)
+        self.assertEqual((True, hash_file(path)), self.index.is_unchanged('s', '/a', path))
+
+        # touched only
+        os.utime(path, (st.st_mtime + 10, st.st_mtime + 10))
+        self.assertTrue(self.index.is_unchanged('s', '/a', path)[0])
+        self.assertEqual(st.st_mtime + 10, self.index.lookup('s', '/a')[2])
+
+        # same size, different content
+        with open(path, 'w') as fh:
+            fh.write('CONTENT')
+        unchanged, digest = self.index.is_unchanged('s', '/a', path)
+        self.assertFalse(unchanged)
+        self.assertEqual(hash_file(path), digest)
+
+
+class TestUploadSkipUnchanged(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestUploadSkipUnchanged, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakePHFS()
+        self.mock_request.side_effect = self.phfs.request
+        self.sdk.files.upload_index = UploadIndex(os.path.join(tempfile.mkdtemp(), 'index.db'), hash_workers=1)
+
+        self.src = tempfile.mkdtemp()
+        for name in ['a.txt', 'b.txt']:
+            with open(os.path.join(self.src, name), 'w') as fh:
+                fh.write(name)
+
+    def posts(self, server):
+        return len([x for x in server.requests if x[0] == 'POST'])
+
+    def test_skip_unchanged(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            self.sdk.files.upload(self.src, '/data', recursive=True, skip_unchanged=True)
+            self.assertEqual(2, self.posts(server))
+
+            result = self.sdk.files.upload(self.src, '/data', recursive=True, skip_unchanged=True)
+            self.assertEqual(2, self.posts(server))
+            self.assertTrue(all([x['skipped'] for x in result]))
+
+            # a changed file is uploaded again
+            with open(os.path.join(self.src, 'a.txt'), 'w') as fh:
+                fh.write('changed')
+            future = time.time() + 10
+            os.utime(os.path.join(self.src, 'b.txt'), (future, future))
+            self.sdk.files.upload(self.src, '/data', recursive=True, skip_unchanged=True)
+            self.assertEqual(3, self.posts(server))
+
+            # the index is not consulted without the flag
+            self.sdk.files.upload(self.src, '/data', recursive=True)
+            self.assertEqual(5, self.posts(server))
+
+            # deleting the remote files invalidates the index
+            self.sdk.files.delete('/data', recursive=True)
+            self.sdk.files.upload(self.src, '/data', recursive=True, skip_unchanged=True)
+            self.assertEqual(7, self.posts(server))
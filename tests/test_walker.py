@@ -0,0 +1,112 @@
+import os
+import tempfile
+from unittest import mock
+
+from primehub.utils import SharedFileException
+from primehub.utils.journal import DOWNLOAD_JOURNAL_NAME
+from primehub.utils.walker import PathMatcher, walk_files
+from tests import BaseTestCase
+from tests.http_server import StandInServer
+from tests.test_files_sync import STORE_PATH, FakePHFS
+
+
+def make_tree(root, paths):
+    for path in paths:
+        path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as fh:
+            fh.write(path)
+
+
+class TestWalkFiles(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestWalkFiles, self).setUp()
+        self.root = tempfile.mkdtemp()
+        make_tree(self.root, ['a.txt', 'b.csv', 'logs/1.txt', 'logs/old/2.txt', 'src/c.pyc', DOWNLOAD_JOURNAL_NAME])
+
+    def walk(self, **kwargs):
+        return [x[1] for x in walk_files(self.root, **kwargs)]
+
+    def test_walk(self):
+        self.assertEqual(['a.txt', 'b.csv', 'logs/1.txt', 'logs/old/2.txt', 'src/c.pyc'], sorted(self.walk()))
+        for path, relative, st in walk_files(self.root):
+            self.assertEqual(os.path.join(self.root, relative), path)
+            self.assertEqual(len(path), st.st_size)
+
+    def test_include_and_exclude(self):
+        self.assertEqual(['a.txt', 'logs/1.txt', 'logs/old/2.txt'], sorted(self.walk(include='*.txt')))
+        self.assertEqual(['a.txt', 'b.csv'], sorted(self.walk(include=['*.txt', '*.csv'], exclude='logs')))
+        self.assertEqual(['a.txt', 'logs/1.txt', 'src/c.pyc'], sorted(self.walk(exclude='*.csv, logs/old')))
+
+    def test_symlinks(self):
+        os.symlink(os.path.join(self.root, 'a.txt'), os.path.join(self.root, 'link.txt'))
+        os.symlink(os.path.join(self.root, 'logs'), os.path.join(self.root, 'linked-logs'))
+        os.symlink(os.path.join(self.root, 'missing'), os.path.join(self.root, 'broken'))
+        # a loop back to the root
+        os.symlink(self.root, os.path.join(self.root, 'src', 'loop'))
+
+        files = ['a.txt', 'b.csv', 'logs/1.txt', 'logs/old/2.txt', 'src/c.pyc']
+        self.assertEqual(sorted(files + ['link.txt']), sorted(self.walk()))
+        self.assertEqual(files, sorted(self.walk(symlinks='skip')))
+        followed = self.walk(symlinks='follow')
+        self.assertEqual(len(followed), len(set(followed)))
+        self.assertIn('link.txt', followed)
+        # the linked logs are the same directory as logs, it is walked once
+        self.assertEqual(6, len(followed))
+        with self.assertRaises(ValueError):
+            self.walk(symlinks='any')
+
+    def test_path_matcher(self):
+        matcher = PathMatcher(['*.txt', 'logs/*'])
+        self.assertTrue(matcher.match('a/b.txt'))
+        self.assertTrue(matcher.match('logs/x.csv'))
+        self.assertFalse(matcher.match('a/logs/x.csv'))
+        self.assertFalse(PathMatcher([]))
+
+
+class TestUploadWalker(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestUploadWalker, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakePHFS()
+        self.mock_request.side_effect = self.phfs.request
+        self.src = tempfile.mkdtemp()
+        make_tree(self.src, ['a.txt', 'b.csv', 'sub/c.txt'])
+
+    def test_upload_with_patterns(self):
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            result = self.sdk.files.upload(self.src + '/', '/data', recursive=True, include='*.txt')
+            self.assertEqual(['/data/a.txt', '/data/sub/c.txt'], sorted([x['phfs'] for x in result]))
+
+            result = self.sdk.files.upload(self.src + '/', '/data', recursive=True, exclude='sub')
+            self.assertEqual(['/data/a.txt', '/data/b.csv'], sorted([x['phfs'] for x in result]))
+
+            with self.assertRaises(SharedFileException):
+                self.sdk.files.upload(self.src, '/data', recursive=True, symlinks='any')
+
+    def test_upload_while_walking(self):
+        walked = []
+        uploaded = []
+
+        def walk(*args):
+            for x in walk_files(*args):
+                walked.append(x[1])
+                yield x
+
+        def execute_upload(endpoint, src, path):
+            uploaded.append(len(walked))
+            return {'success': True}
+
+        self.sdk.primehub_config.endpoint = 'http://localhost/api/graphql'
+        self.sdk.files._execute_upload = execute_upload
+        with mock.patch('primehub.files.walk_files', walk):
+            self.sdk.files.upload(self.src, '/data', recursive=True)
+
+        # the first file is uploaded before the walk has finished
+        self.assertEqual(3, len(walked))
+        self.assertEqual(1, uploaded[0])
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import threading
+import time
+
+from primehub.utils.watcher import UploadWatcher
+from tests import BaseTestCase
+from tests.http_server import StandInServer
+from tests.test_files_sync import STORE_PATH, FakePHFS
+
+
+class TestUploadWatcher(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestUploadWatcher, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.uploads = []
+        self.failures = set()
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as fh:
+            fh.write(content)
+
+    def upload(self, path, relative):
+        if relative in self.failures:
+            raise IOError(f'cannot upload {relative}')
+        with open(path) as fh:
+            self.uploads.append((relative, fh.read()))
+
+    def test_debounce_and_coalesce(self):
+        watcher = UploadWatcher(self.root, self.upload, debounce=60, parallel=1)
+        self.write('a.txt', '1')
+        self.assertEqual([], watcher.poll())
+        self.write('a.txt', '12')
+        self.assertEqual([], watcher.poll())
+
+        # the burst is uploaded once
+        watcher.debounce = 0
+        for f in watcher.poll():
+            f.result()
+        self.assertEqual([('a.txt', '12')], self.uploads)
+
+        # unchanged files are not uploaded again
+        self.assertEqual([], watcher.poll())
+        watcher.stop()
+
+    def test_flush(self):
+        watcher = UploadWatcher(self.root, self.upload, interval=60, debounce=60)
+        self.write('a.txt', 'a')
+        self.write('sub/b.txt', 'b')
+        watcher.flush()
+        self.assertEqual([('a.txt', 'a'), ('sub/b.txt', 'b')], sorted(self.uploads))
+
+        # only the deltas are uploaded
+        self.write('a.txt', 'aa')
+        watcher.flush()
+        self.assertEqual(('a.txt', 'aa'), self.uploads[-1])
+        self.assertEqual(3, len(self.uploads))
+
+        # a failed upload is raised by flush and retried
+        self.failures.add('c.txt')
+        self.write('c.txt', 'c')
+        with self.assertRaises(IOError):
+            watcher.flush()
+        self.failures.clear()
+        watcher.stop()
+        self.assertEqual(('c.txt', 'c'), self.uploads[-1])
+
+    def test_background_polling(self):
+        uploaded = threading.Event()
+
+        def upload(path, relative):
+            uploaded.set()
+
+        with UploadWatcher(self.root, upload, interval=0.05, debounce=0.05):
+            self.write('a.txt', 'a')
+            self.assertTrue(uploaded.wait(5))
+
+
+class TestFilesWatch(BaseTestCase):
+
+    def setUp(self) -> None:
+        super(TestFilesWatch, self).setUp()
+        self.sdk.primehub_config.group_info = {'name': 'phusers', 'id': 'any-id'}
+        self.phfs = FakePHFS()
+        self.mock_request.side_effect = self.phfs.request
+
+    def test_watch(self):
+        src = tempfile.mkdtemp()
+        with StandInServer() as server:
+            server.route(STORE_PATH, self.phfs.handler)
+            self.sdk.primehub_config.endpoint = server.url + '/api/graphql'
+
+            watcher = self.sdk.files.watch(src, '/checkpoints', interval=60)
+            with open(os.path.join(src, 'epoch-1.ckpt'), 'wb') as fh:
+                fh.write(b'weights')
+            watcher.flush()
+            self.assertEqual(b'weights', self.phfs.objects['/checkpoints/epoch-1.ckpt'][0])
+
+            time.sleep(0.01)
+            with open(os.path.join(src, 'epoch-1.ckpt'), 'wb') as fh:
+                fh.write(b'better weights')
+            watcher.stop()
+            self.assertEqual(b'better weights', self.phfs.objects['/checkpoints/epoch-1.ckpt'][0])
+            self.assertEqual(2, len(server.requests))